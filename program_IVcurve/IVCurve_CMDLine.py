@@ -7,7 +7,16 @@ Created: 2016-02-09
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-import visa # pyvisa, essential for communicating with the Keithley
+import instrument_sim # Simulated instruments, enabled with RESISTIVITY_SIM=1
+import instrument_trace # Instrument traffic, RESISTIVITY_RECORD=file / RESISTIVITY_REPLAY=file
+if instrument_trace.REPLAY:
+    visa = instrument_trace.visa
+elif instrument_sim.ENABLED:
+    visa = instrument_sim.visa
+else:
+    import visa # pyvisa, essential for communicating with the Keithley
+#end if
+visa = instrument_trace.record_visa(visa)
 import time
 from datetime import datetime # for getting the current date and time
 import exceptions
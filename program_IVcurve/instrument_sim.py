@@ -0,0 +1,769 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : instrument_sim
+Description:
+    Simulated stand-ins for the pyvisa, minimalmodbus and omegacn7500 modules
+    so the measurement programs can run (and be timed) without the rig.
+
+    The simulation models:
+        - a 4-contact van der Pauw sample (rA, rB, temperature coefficient,
+          contact resistance, thermal EMF offset and drift, reading noise),
+          and further samples wired to other rows with add_sample()
+        - the 7708 matrix card relay state behind the Keithley 2700
+        - the Keithley 2400 source and the Keithley 2182 nanovoltmeter
+        - a first-order thermal plant with dead time behind the CN7500 PID
+        - the 2400 source list and the 2182 buffer linked over Trigger Link
+        - a configurable latency for every GPIB and Modbus transaction
+
+Comments:
+    Set the environment variable RESISTIVITY_SIM=1 before starting a program
+    to swap the real drivers for these. Rig parameters can be given as a comma
+    separated list of key=value pairs, e.g.
+
+        RESISTIVITY_SIM=1 RESISTIVITY_SIM_OPTIONS="rA=0.8,rB=1.3,time_scale=20"
+
+    time_scale speeds up the thermal plant relative to the wall clock so a
+    full temperature sweep can be walked through on a laptop.
+"""
+import os
+import re
+import math
+import random
+import types
+import threading
+import time
+from collections import deque
+
+#==============================================================================
+ENABLED = os.environ.get('RESISTIVITY_SIM', '') not in ('', '0')
+
+# Matrix card wiring (7708 card behind the k2700):
+# current rows route the k2400 across a contact pair, voltage rows route the
+# k2182 across a contact pair, four rows of each per sample in the pair order
+# of relay_sequencer.sample_configurations
+PAIRS = ((1, 2), (3, 4), (1, 3), (2, 4))
+CURRENT_ROWS = (117, 118, 119, 120) # first sample
+VOLTAGE_ROWS = (125, 126, 127, 128)
+
+# GPIB primary address -> instrument model
+GPIB_ADDRESSES = {16: '2700', 24: '2400', 7: '2182'}
+
+###############################################################################
+class SimVisaIOError(IOError):
+    ''' Raised for unknown resources, mirrors visa.VisaIOError '''
+    pass
+#end class
+###############################################################################
+
+###############################################################################
+class RealClock:
+    ''' Wall clock used by default '''
+    #--------------------------------------------------------------------------
+    def time(self):
+        return time.time()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class VirtualClock:
+    ''' Clock that only advances when somebody sleeps on it '''
+    #--------------------------------------------------------------------------
+    def __init__(self, start=0.0):
+        self.now = float(start)
+        self.lock = threading.Lock()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def time(self):
+        return self.now
+    #end def
+
+    #--------------------------------------------------------------------------
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self.lock:
+                self.now += seconds
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class ThermalPlant:
+    """
+    First-order furnace with dead time, driven by a heating-only PID loop
+    that stands in for the CN7500 auto-tuned control.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, ambient=25.0, tau=900.0, gain=8.0, dead_time=20.0,
+                 kp=1.0, ki=0.0012, kd=0.0, step=0.5, pv_noise=0.05):
+        self.ambient = ambient
+        self.tau = tau # (s) time constant of the furnace
+        self.gain = gain # (C per % output) steady state rise above ambient
+        self.dead_time = dead_time # (s) transport delay heater -> thermocouple
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.step = step # (s) integration step
+        self.pv_noise = pv_noise # (C) thermocouple noise
+
+        self.temp = ambient
+        self.setpoint = ambient
+        self.output = 0.0 # (%) heater output
+        self.running = True
+        self.t = 0.0
+        self.integral = 0.0
+        self.last_error = 0.0
+        self.history = deque([(0.0, 0.0)])
+    #end init
+
+    #--------------------------------------------------------------------------
+    def advance(self, t):
+        ''' Integrate the plant forward to plant time t (s) '''
+        while self.t < t:
+            dt = min(self.step, t - self.t)
+            self.t += dt
+
+            # PID, heating only, with a clamped integrator for anti-windup
+            error = self.setpoint - self.temp
+            if self.running:
+                self.integral = min(max(self.integral + error*dt, 0.0), 100.0/max(self.ki, 1e-12))
+                derivative = (error - self.last_error)/dt
+                self.output = min(max(self.kp*error + self.ki*self.integral + self.kd*derivative, 0.0), 100.0)
+            else:
+                self.output = 0.0
+            self.last_error = error
+            self.history.append((self.t, self.output))
+
+            # heater output reaches the thermocouple after the dead time
+            while len(self.history) > 1 and self.history[1][0] <= self.t - self.dead_time:
+                self.history.popleft()
+            delayed = self.history[0][1]
+
+            self.temp += dt/self.tau*(self.ambient + self.gain*delayed - self.temp)
+        #end while
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read_pv(self):
+        return self.temp + random.gauss(0, self.pv_noise)
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class SimRig:
+    """
+    Shared state of the simulated rig. All simulated instruments opened from
+    the same rig see the same sample, relays, source and furnace.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, rA=1.0, rB=1.0, tcr=0.0, contact=5.0, emf=5e-6,
+                 emf_drift=1e-9, noise=20e-9, settle_tau=0.03, settle_per_ohm=0.005,
+                 gpib_latency=0.005, modbus_latency=0.03, relay_time=0.003,
+                 time_scale=1.0, clock=None, seed=None, **plant_options):
+        self.tcr = tcr # (1/C) temperature coefficient of resistance
+        self.contact = contact # (Ohm) resistance of each contact
+        self.emf = emf # (V) thermal EMF offset in the voltage path
+        self.emf_drift = emf_drift # (V/s) drift of the thermal EMF
+        self.noise = noise # (V) rms noise of a 2182 reading
+        self.settle_tau = settle_tau # (s) base settling time constant
+        self.settle_per_ohm = settle_per_ohm # (s/Ohm) extra settling per Ohm
+        self.gpib_latency = gpib_latency # (s) per GPIB transaction
+        self.modbus_latency = modbus_latency # (s) per Modbus register access
+        self.relay_time = relay_time # (s) per relay actuation
+        self.time_scale = time_scale # plant seconds per clock second
+
+        self.clock = clock or RealClock()
+        self.lock = threading.RLock()
+        if seed is not None:
+            random.seed(seed)
+
+        self.plant = ThermalPlant(**plant_options)
+        self.t0 = self.clock.time()
+
+        # samples on the card, [rA, rB] each (Ohm, r_12,34 and r_13,24 at 25 C),
+        # and row -> (sample, contact pair)
+        self.samples = []
+        self.current_rows = {}
+        self.voltage_rows = {}
+        self.add_sample(CURRENT_ROWS, VOLTAGE_ROWS, rA, rB)
+
+        # instrument state
+        self.closed = set()
+        self.output = False
+        self.source_function = 'CURR'
+        self.source_current = 0.0
+        self.source_voltage = 0.0
+        self.nplc = 5.0
+
+        # source list and Trigger Link to the 2182 buffer
+        self.source_mode = 'FIX'
+        self.source_list = []
+        self.source_delay = 0.0
+        self.trigger_source = 'IMM' # 2182 trigger source
+        self.armed = False
+        self.buffer = []
+
+        # settling of the 2182 input after any change
+        self.v_from = 0.0
+        self.t_change = 0.0
+        self.v_target = 0.0
+        self.tau = settle_tau
+
+        self.stats = {'gpib_writes': 0, 'gpib_queries': 0, 'modbus_reads': 0,
+                      'modbus_writes': 0, 'relay_actuations': 0, 'readings': 0}
+    #end init
+
+    #--------------------------------------------------------------------------
+    def elapsed(self):
+        return self.clock.time() - self.t0
+    #end def
+
+    #--------------------------------------------------------------------------
+    def temperature(self):
+        with self.lock:
+            self.plant.advance(self.elapsed()*self.time_scale)
+            return self.plant.temp
+    #end def
+
+    #--------------------------------------------------------------------------
+    def wait(self, seconds):
+        self.clock.sleep(seconds)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+    #end def
+
+    #--------------------------------------------------------------------------
+    def add_sample(self, current, voltage, rA=None, rB=None):
+        """
+        Wire a sample to four current and four voltage rows (pairs 1-2, 3-4,
+        1-3, 2-4). rA and rB (Ohm at 25 C) default to those of the first
+        sample times 1.5, 2, ... for the second, third, ... sample. Rows
+        already wired are taken over by the new sample.
+        """
+        with self.lock:
+            index = len(self.samples)
+            if index:
+                rA = rA or self.samples[0][0]*(1 + 0.5*index)
+                rB = rB or self.samples[0][1]*(1 + 0.5*index)
+            #end if
+            self.samples.append([rA, rB])
+            for row, pair in zip(current, PAIRS):
+                self.current_rows[row] = (index, pair)
+            for row, pair in zip(voltage, PAIRS):
+                self.voltage_rows[row] = (index, pair)
+        #end with
+        return index
+    #end def
+
+    #--------------------------------------------------------------------------
+    def sample_resistances(self, index):
+        ''' (rA, rB) of a sample at the present temperature '''
+        scale = 1 + self.tcr*(self.temperature() - 25.0)
+        rA, rB = self.samples[index]
+        return rA*scale, rB*scale
+    #end def
+
+    #--------------------------------------------------------------------------
+    def resistance(self, crow, vrow):
+        ''' Transresistance seen for a current row and a voltage row '''
+        isample, ipair = self.current_rows[crow]
+        vsample, vpair = self.voltage_rows[vrow]
+        if isample != vsample:
+            # current through one sample, voltage across another
+            return 0.0
+        rA, rB = self.sample_resistances(isample)
+        if set(ipair) == set(vpair):
+            # two-wire through the same contacts
+            return 2*self.contact + (rA + rB)/2
+        elif not set(ipair) & set(vpair):
+            if set((ipair, vpair)) == set(((1, 2), (3, 4))):
+                return rA
+            else:
+                return rB
+        else:
+            # shared contact, adjacent configuration
+            return (rA + rB)/4
+    #end def
+
+    #--------------------------------------------------------------------------
+    def two_wire(self, crow):
+        ''' Resistance seen by the k2400 across a current row '''
+        rA, rB = self.sample_resistances(self.current_rows[crow][0])
+        return 2*self.contact + (rA + rB)/2
+    #end def
+
+    #--------------------------------------------------------------------------
+    def target_voltage(self):
+        crows = [c for c in self.closed if c in self.current_rows]
+        vrows = [v for v in self.closed if v in self.voltage_rows]
+        if len(crows) != 1 or len(vrows) != 1:
+            # card shorted or open, only the offset is seen
+            return 0.0, 0.0
+        r = self.resistance(crows[0], vrows[0])
+        if self.output and self.source_function == 'CURR':
+            return self.source_current*r, r
+        return 0.0, r
+    #end def
+
+    #--------------------------------------------------------------------------
+    def changed(self):
+        ''' Called after anything that changes the 2182 input '''
+        with self.lock:
+            now = self.elapsed()
+            self.v_from = self.settled_voltage(now)
+            self.v_target, r = self.target_voltage()
+            self.t_change = now
+            self.tau = self.settle_tau + self.settle_per_ohm*r
+    #end def
+
+    #--------------------------------------------------------------------------
+    def settled_voltage(self, now):
+        if now <= self.t_change:
+            return self.v_from
+        return self.v_target + (self.v_from - self.v_target)*math.exp(-(now - self.t_change)/self.tau)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read_voltage(self):
+        ''' One integrated 2182 reading in volts '''
+        self.wait(self.nplc/60.0)
+        with self.lock:
+            now = self.elapsed()
+            self.count('readings')
+            v = self.settled_voltage(now)
+            v += self.emf + self.emf_drift*now + random.gauss(0, self.noise)
+            return v
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read_current(self):
+        ''' k2400 :READ? while sourcing voltage (IV check) '''
+        with self.lock:
+            crows = [c for c in self.closed if c in self.current_rows]
+            vrows = [v for v in self.closed if v in self.voltage_rows]
+            if not self.output or len(crows) != 1:
+                return 0.0
+            if vrows:
+                # voltage rows closed short the source path
+                return 0.1
+            return self.source_voltage/self.two_wire(crows[0]) + random.gauss(0, 1e-9)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def run_source_list(self):
+        """
+        k2400 :INIT in list mode. Each source step waits the source delay and
+        then pulses the Trigger Link; an armed 2182 takes one reading into its
+        buffer per pulse. The sequence runs inside the write that starts it.
+        """
+        for current in self.source_list:
+            with self.lock:
+                self.source_current = current
+            self.changed()
+            self.wait(self.source_delay)
+            if self.armed and self.trigger_source == 'EXT':
+                v = self.read_voltage()
+                with self.lock:
+                    self.buffer.append(v)
+        #end for
+        self.armed = False
+    #end def
+
+    #--------------------------------------------------------------------------
+    def route(self, close=(), opened=()):
+        with self.lock:
+            before = set(self.closed)
+            self.closed |= set(close)
+            self.closed -= set(opened)
+            actuations = len(before ^ self.closed)
+            self.count('relay_actuations', actuations)
+        self.wait(actuations*self.relay_time)
+        self.changed()
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+def parse_channels(text):
+    ''' "(@ 117, 125:128)" -> [117, 125, 126, 127, 128] '''
+    channels = []
+    for item in text.replace('(', '').replace(')', '').replace('@', '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if ':' in item:
+            first, last = item.split(':')
+            channels.extend(range(int(first), int(last) + 1))
+        else:
+            channels.append(int(item))
+    return channels
+#end def
+
+#--------------------------------------------------------------------------
+def short_form(node):
+    ''' SCPI short form of a header node, e.g. SEQuence1 -> SEQ '''
+    node = node.upper().rstrip('0123456789')
+    if len(node) > 4:
+        node = node[:3] if node[3] in 'AEIOU' else node[:4]
+    return node
+#end def
+
+#--------------------------------------------------------------------------
+def split_commands(message):
+    """
+    Split a (possibly compound) SCPI message into (header, argument) pairs
+    with headers expanded to absolute short-form node paths.
+    """
+    commands = []
+    prefix = []
+    for segment in message.split(';'):
+        segment = segment.strip()
+        if not segment:
+            continue
+        parts = segment.split(None, 1)
+        header = parts[0]
+        argument = parts[1].strip() if len(parts) > 1 else ''
+        if header.startswith('*'):
+            commands.append((header.upper(), argument))
+            continue
+        query = header.endswith('?')
+        nodes = [short_form(n) for n in header.rstrip('?').strip(':').split(':')]
+        if not header.startswith(':') and commands:
+            nodes = prefix + nodes
+        prefix = nodes[:-1]
+
+        # drop optional nodes so long and short spellings compare equal
+        nodes = [n for n in nodes if n not in ('IMM', 'AMPL')]
+        if nodes and nodes[0] == 'SENS':
+            nodes = nodes[1:]
+        if nodes[-1:] == ['STAT'] and nodes[-2:-1] == ['OUTP']:
+            nodes = nodes[:-1]
+        if nodes[:2] == ['TRIG', 'SEQ']:
+            nodes = nodes[:1] + nodes[2:]
+        commands.append((':'.join(nodes) + ('?' if query else ''), argument))
+    #end for
+    return commands
+#end def
+
+###############################################################################
+class SimResource:
+    """
+    Simulated GPIB resource with the write/query/read interface of a pyvisa
+    resource. Each call is one bus transaction.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, rig, model, address):
+        self.rig = rig
+        self.model = model
+        self.resource_name = address
+        self.timeout = 2000
+        self.pending = ''
+        self.transactions = 0
+    #end init
+
+    #--------------------------------------------------------------------------
+    def write(self, message):
+        self.transactions += 1
+        self.rig.count('gpib_writes')
+        self.rig.wait(self.rig.gpib_latency)
+        responses = self.execute(message)
+        if responses:
+            self.pending = ';'.join(responses)
+        return len(message)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read(self):
+        response = self.pending
+        self.pending = ''
+        return response
+    #end def
+
+    #--------------------------------------------------------------------------
+    def query(self, message):
+        self.transactions += 1
+        self.rig.count('gpib_queries')
+        self.rig.wait(self.rig.gpib_latency)
+        return ';'.join(self.execute(message))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        pass
+    #end def
+
+    #--------------------------------------------------------------------------
+    def execute(self, message):
+        responses = []
+        for header, argument in split_commands(message):
+            response = getattr(self, 'do_' + self.model)(header, argument)
+            if header.endswith('?'):
+                responses.append(response if response is not None else '0')
+        return responses
+    #end def
+
+    #--------------------------------------------------------------------------
+    def common(self, header, argument):
+        if header == '*IDN?':
+            return 'KEITHLEY INSTRUMENTS INC.,MODEL %s,SIMULATED,1.0' % self.model
+        elif header == '*OPC?':
+            return '1'
+        return None
+    #end def
+
+    #--------------------------------------------------------------------------
+    def do_2700(self, header, argument):
+        rig = self.rig
+        if header.startswith('*'):
+            return self.common(header, argument)
+        elif header == 'ROUT:MULT:CLOS':
+            rig.route(close=parse_channels(argument))
+        elif header == 'ROUT:MULT:OPEN':
+            rig.route(opened=parse_channels(argument))
+        elif header == 'ROUT:OPEN:ALL':
+            rig.route(opened=list(rig.closed))
+        elif header == 'ROUT:MULT:CLOS?':
+            return '(@' + ','.join(str(c) for c in sorted(rig.closed)) + ')'
+        return None
+    #end def
+
+    #--------------------------------------------------------------------------
+    def do_2400(self, header, argument):
+        rig = self.rig
+        if header.startswith('*'):
+            return self.common(header, argument)
+        elif header == 'OUTP':
+            rig.output = argument.upper() in ('ON', '1')
+            rig.changed()
+        elif header == 'OUTP?':
+            return '1' if rig.output else '0'
+        elif header in ('SOUR:FUNC:MODE', 'SOUR:FUNC'):
+            rig.source_function = short_form(argument)
+            rig.changed()
+        elif header == 'SOUR:CURR:LEV':
+            rig.source_current = float(argument)
+            rig.changed()
+        elif header == 'SOUR:CURR:MODE':
+            rig.source_mode = short_form(argument)
+        elif header == 'SOUR:LIST:CURR':
+            rig.source_list = [float(i) for i in argument.split(',')]
+        elif header == 'SOUR:DEL':
+            rig.source_delay = float(argument)
+        elif header == 'INIT':
+            if rig.source_mode == 'LIST':
+                rig.run_source_list()
+        elif header == 'SOUR:CURR:LEV?':
+            return '%E' % rig.source_current
+        elif header == 'SOUR:VOLT:LEV':
+            rig.source_voltage = float(argument)
+            rig.changed()
+        elif header == 'SOUR:VOLT:LEV?':
+            return '%E' % rig.source_voltage
+        elif header == 'READ?':
+            return '%+.6E' % rig.read_current()
+        return None
+    #end def
+
+    #--------------------------------------------------------------------------
+    def do_2182(self, header, argument):
+        rig = self.rig
+        if header.startswith('*'):
+            return self.common(header, argument)
+        elif header == 'VOLT:DC:NPLC':
+            rig.nplc = float(argument)
+        elif header == 'TRIG:SOUR':
+            rig.trigger_source = short_form(argument)
+        elif header == 'TRAC:CLE':
+            rig.buffer = []
+        elif header == 'INIT':
+            rig.armed = True
+        elif header == 'TRAC:DATA?':
+            return ','.join('%+.8E' % v for v in rig.buffer)
+        elif header in ('DATA:FRES?', 'FETC?', 'READ?'):
+            return '%+.8E' % rig.read_voltage()
+        return None
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class SimResourceManager:
+    ''' Stand-in for visa.ResourceManager '''
+    #--------------------------------------------------------------------------
+    def __init__(self, rig=None):
+        self.rig = rig or default_rig()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def list_resources(self):
+        return tuple('GPIB0::%d::INSTR' % a for a in sorted(GPIB_ADDRESSES))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def open_resource(self, address, **kwargs):
+        match = re.match(r'GPIB\d*::(\d+)', address)
+        if not match or int(match.group(1)) not in GPIB_ADDRESSES:
+            raise SimVisaIOError('No simulated instrument at %s' % address)
+        return SimResource(self.rig, GPIB_ADDRESSES[int(match.group(1))], address)
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class SimCN7500:
+    """
+    Stand-in for omegacn7500.OmegaCN7500. Every register access is one
+    Modbus transaction.
+    """
+    REGISTER_PV = 4096
+    REGISTER_SETPOINT = 4097
+    REGISTER_OUTPUT1 = 4114
+
+    #--------------------------------------------------------------------------
+    def __init__(self, portname, slaveaddress, rig=None):
+        self.portname = portname
+        self.address = slaveaddress
+        self.rig = rig or default_rig()
+        self.registers = {}
+        self.transactions = 0
+    #end init
+
+    #--------------------------------------------------------------------------
+    def transaction(self, key):
+        self.transactions += 1
+        self.rig.count(key)
+        self.rig.wait(self.rig.modbus_latency)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read_register(self, registeraddress, numberOfDecimals=0, functioncode=3, signed=False):
+        self.transaction('modbus_reads')
+        plant = self.rig.plant
+        self.rig.temperature()
+        if registeraddress == self.REGISTER_PV:
+            value = plant.read_pv()
+        elif registeraddress == self.REGISTER_SETPOINT:
+            value = plant.setpoint
+        elif registeraddress == self.REGISTER_OUTPUT1:
+            value = plant.output
+        else:
+            value = self.registers.get(registeraddress, 0)
+        return round(value, numberOfDecimals) if numberOfDecimals else int(round(value))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write_register(self, registeraddress, value, numberOfDecimals=0, functioncode=16, signed=False):
+        self.transaction('modbus_writes')
+        self.rig.temperature()
+        if registeraddress == self.REGISTER_SETPOINT:
+            self.rig.plant.setpoint = float(value)
+        else:
+            self.registers[registeraddress] = value
+    #end def
+
+    #--------------------------------------------------------------------------
+    def get_pv(self):
+        return self.read_register(self.REGISTER_PV, 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def get_setpoint(self):
+        return self.read_register(self.REGISTER_SETPOINT, 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def set_setpoint(self, setpointvalue):
+        self.write_register(self.REGISTER_SETPOINT, setpointvalue, 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def get_output1(self):
+        return self.read_register(self.REGISTER_OUTPUT1, 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def run(self):
+        self.transaction('modbus_writes')
+        self.rig.temperature()
+        self.rig.plant.running = True
+    #end def
+
+    #--------------------------------------------------------------------------
+    def stop(self):
+        self.transaction('modbus_writes')
+        self.rig.temperature()
+        self.rig.plant.running = False
+    #end def
+
+    #--------------------------------------------------------------------------
+    def is_running(self):
+        self.transaction('modbus_reads')
+        return self.rig.plant.running
+    #end def
+
+#end class
+###############################################################################
+
+#==============================================================================
+_rig = None
+
+#--------------------------------------------------------------------------
+def options_from_env():
+    ''' Parse RESISTIVITY_SIM_OPTIONS="key=value,..." into keyword arguments '''
+    options = {}
+    for item in os.environ.get('RESISTIVITY_SIM_OPTIONS', '').split(','):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            options[key.strip()] = float(value)
+    if 'seed' in options:
+        options['seed'] = int(options['seed'])
+    return options
+#end def
+
+#--------------------------------------------------------------------------
+def default_rig():
+    ''' The rig shared by all instruments opened through the namespaces below '''
+    global _rig
+    if _rig is None:
+        _rig = SimRig(**options_from_env())
+    return _rig
+#end def
+
+#--------------------------------------------------------------------------
+def set_default_rig(rig):
+    global _rig
+    _rig = rig
+#end def
+
+# Module stand-ins, used as:  visa = instrument_sim.visa
+visa = types.ModuleType('visa')
+visa.ResourceManager = lambda *args: SimResourceManager()
+visa.VisaIOError = SimVisaIOError
+
+minimalmodbus = types.ModuleType('minimalmodbus')
+minimalmodbus.CLOSE_PORT_AFTER_EACH_CALL = True
+
+omegacn7500 = types.ModuleType('omegacn7500')
+omegacn7500.OmegaCN7500 = SimCN7500
@@ -34,6 +34,7 @@ from datetime import datetime # for getting the current date and time
 import exceptions
 import sys
 from logging_utils import setup_logging_to_file, log_exception
+import end_header
 
 # for a fancy status bar:
 import EnhancedStatusBar as ESB
@@ -51,6 +52,9 @@ Global Variables:
 # Naming a data file:
 dataFile = 'Data_Backup.csv'
 finaldataFile = 'Data.csv'
+# end of run lines, reserved after the start time and filled in at the end
+endTemplate = 'end time: %s \nelapsed measurement time: %s seconds \n \n'
+endOffset = 0
 statusFile = 'Status.csv'
 resistivityFile = 'Resistivity.csv'
 
@@ -1274,6 +1278,7 @@ class TakeData:
 
         global dataFile
         global finaldataFile
+        global endTemplate, endOffset
         global myfile
         global rawfile
         global processfile
@@ -1281,25 +1286,13 @@ class TakeData:
         stop = time.time()
         end = datetime.now() # End time
         totalTime = stop - self.start # Elapsed Measurement Time (seconds)
-        endStr = 'end time: %s \nelapsed measurement time: %s seconds \n \n' % (str(end), str(totalTime))
 
         myfile.close() # Close the file
         rawfile.close()
         processfile.close()
 
-        myfile = open(dataFile, 'r') # Opens the file for Reading
-        contents = myfile.readlines() # Reads the lines of the file into python set
-        myfile.close()
-
-        # Adds elapsed measurement time to the read file list
-        contents.insert(1, endStr) # Specify which line and what value to insert
-        # NOTE: First line is line 0
-
-        # Writes the elapsed measurement time to the final file
-        myfinalfile = open(finaldataFile,'w')
-        contents = "".join(contents)
-        myfinalfile.write(contents)
-        myfinalfile.close()
+        # Fill in the elapsed measurement time and rename to the final file
+        end_header.finalize(dataFile, finaldataFile, endOffset, endTemplate, (end, totalTime))
 
         # Save the GUI plots
         self.updateGUI(stamp='Save_All', data='Save')
@@ -1482,6 +1475,7 @@ class UserPanel(wx.Panel):
         global k2700, k2400, k2182, heaterTC, sampleTC
         global dataFile
         global finaldataFile
+        global endOffset
         global myfile
         global rawfile
         global processfile
@@ -1507,6 +1501,7 @@ class UserPanel(wx.Panel):
                     processfile = open(resistivityFile,'w')
                     begin = datetime.now() # Current date and time
                     myfile.write('Start Time: ' + str(begin) + '\n')
+                    endOffset = end_header.reserve(myfile, endTemplate)
                     rawfile.write('Start Time: ' + str(begin) + '\n')
                     processfile.write('Start Time: ' + str(begin) + '\n')
 
@@ -20,13 +20,25 @@ matplotlib.use('WXAgg') # The recommended way to use wx with mpl is with WXAgg b
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg
 from matplotlib.figure import Figure
 from matplotlib.pyplot import gcf, setp
-import matplotlib.animation as animation # For plotting
-import pylab
 import numpy as np
 import matplotlib.pyplot as plt
-import minimalmodbus as modbus # For communicating with the cn7500s
-import omegacn7500 # Driver for cn7500s under minimalmodbus, adds a few easy commands
-import visa # pyvisa, essential for communicating with the Keithley
+import instrument_sim # Simulated instruments, enabled with RESISTIVITY_SIM=1
+import instrument_trace # Instrument traffic, RESISTIVITY_RECORD=file / RESISTIVITY_REPLAY=file
+if instrument_trace.REPLAY:
+    modbus = instrument_trace.minimalmodbus
+    omegacn7500 = instrument_trace.omegacn7500
+    visa = instrument_trace.visa
+elif instrument_sim.ENABLED:
+    modbus = instrument_sim.minimalmodbus
+    omegacn7500 = instrument_sim.omegacn7500
+    visa = instrument_sim.visa
+else:
+    import minimalmodbus as modbus # For communicating with the cn7500s
+    import omegacn7500 # Driver for cn7500s under minimalmodbus, adds a few easy commands
+    import visa # pyvisa, essential for communicating with the Keithley
+#end if
+visa = instrument_trace.record_visa(visa)
+omegacn7500 = instrument_trace.record_cn7500(omegacn7500)
 from threading import Thread # For threading the processes going on behind the GUI
 import time
 from datetime import datetime # for getting the current date and time
@@ -34,6 +46,22 @@ from datetime import datetime # for getting the current date and time
 import exceptions
 import sys
 from logging_utils import setup_logging_to_file, log_exception
+from settling import SettleDetector, RANGE_NOISE, voltage_range
+from relay_sequencer import RelaySequencer, VDP_ORDER
+from scpi_batch import BatchingResource
+from state_cache import StateCache
+import vdp # van der Pauw solver
+from temperature_sampler import TemperatureSampler, LockedInstrument
+from runlog import RunLog
+import checkpoint
+from live_plot import LivePlot, grow
+from plot_history import PlotHistory
+from telemetry import Telemetry, FRAME_RATE
+from stability import RollingRegression
+from mpc import ThermalModel, SetpointPlanner
+from timing import Timer
+import ramp
+from samples import Sample
 
 # for a fancy status bar:
 import EnhancedStatusBar as ESB
@@ -59,11 +87,55 @@ thickness = 0.1 #placeholder for sample thickness in cm
 
 current = .01 # (A) Current that is sourced by the k2400
 APP_EXIT = 1 # id for File\Quit
+APP_RESUME = 2 # id for File\Resume Run
 stability_threshold = 0.1/60 # change in PID temp must be less than this value for a set time in order to reach an equilibrium
 tolerance = 2 # Temperature must be within this temperature range of the PID setpoint in order to begin a measurement
+stability_window = 60.0 # (s) time over which the PID temperature slope is fitted for the stability check
+# (C) how far past the measurement temperature the setpoint may go while
+# heating to it, planned from the thermal model (mpc.py). 0: setpoint = measurement temperature
+setpoint_overshoot = 0.0
+
+# Continuous mode: the setpoint ramps through the measurement temperatures at
+# ramp_rate while the configurations are measured all the time, instead of
+# stopping to stabilize at each one. rho(T) is binned by ramp_bin.
+ramp_mode = False
+ramp_rate = 1.0 # (C/min)
+ramp_bin = 5.0 # (C)
 measureList = []
 measurement_number = 10
 
+# Run the delta reversal inside the instruments: the k2400 steps a +I,-I,+I
+# source list and triggers the k2182 over Trigger Link, readings come back in
+# one buffered transfer. Requires the Trigger Link cable between the two.
+hardware_delta = False
+source_delay = 0.5 # (s) in-instrument settling before each triggered reading
+# The first triggered delta of each configuration at a setpoint is checked
+# against a software settled one; when they differ by more than this
+# fraction (or the reading noise) the source delay is too short for the
+# sample, and the run goes on with the software delta method.
+delta_check_tolerance = 1e-4
+
+# Poll the k2182 until readings settle instead of sleeping the full delay
+# after every relay change and current reversal. The delay is the upper bound.
+adaptive_settle = True
+
+# Read back the matrix card after every relay transition
+verify_relays = False
+
+# Further samples in the furnace, measured in turn after the first one once
+# a setpoint is stable: (name, thickness (cm), k2400 rows, k2182 rows), the
+# rows across contact pairs 1-2, 3-4, 1-3 and 2-4. Their Data and
+# Resistivity files go in a sub folder named after the sample.
+extra_samples = []
+# e.g. extra_samples = [('B', 0.12, (121, 122, 123, 124), (129, 130, 131, 132))]
+
+# (s) CN7500 polling cadence of the background temperature sampler
+temp_sample_period = 1.0
+
+# Time the phases of the measurement loop and every instrument call; the
+# run folder gets Timing.csv, Timing Histograms.csv and Timing Trace.json
+timing_enabled = False
+
 AbsoluteMaxLimit = 1000 # Restricts the user to an absolute max temperature
 maxLimit = 600 # Restricts the user to a max temperature, changes based on input temps
 maxCurrent = .1 # (A) Restricts the user to a max current
@@ -80,22 +152,17 @@ heater = ''
 filePath = 'global file path'
 
 # placer for files to be created
-myfile = 'global file'
-rawfile = 'global file'
-pidfile = 'global file'
-processfile = 'global file'
-
-# Placers for the GUI plots:
-temp_list = []
-setpoint_list = []
-ttemp_list = []
-rho_list = []
-t_list = []
-
-timecalclist = []
-tempcalclist = []
-rAcalclist = []
-rBcalclist = []
+runlog = 'global log' # binary run log, exported to the csv files at the end
+
+# Histories for the GUI plots, fixed size with min/max levels of detail:
+temp_history = PlotHistory()
+setpoint_history = PlotHistory()
+rho_history = PlotHistory()
+plot_histories = {'temperature': temp_history, 'setpoint': setpoint_history,
+                  'resistivity': rho_history}
+
+# Latest values for the GUI, drained by the frame timer:
+telemetry = Telemetry()
 
 #ResourceManager for visa instrument control
 ResourceManager = visa.ResourceManager()
@@ -105,7 +172,7 @@ class Keithley_2700:
     ''' Used for the matrix card operations. '''
     #--------------------------------------------------------------------------
     def __init__(self, instr):
-        self.ctrl = ResourceManager.open_resource(instr)
+        self.ctrl = BatchingResource(ResourceManager.open_resource(instr))
 
         self.openAllChannels()
     #end init
@@ -125,6 +192,17 @@ class Keithley_2700:
         self.ctrl.write("ROUTe:OPEN:ALL")
     #end def
 
+    #--------------------------------------------------------------------------
+    def switchChannels(self, close, open):
+        ''' Open then close channels in a single ROUT transaction '''
+        commands = []
+        if open:
+            commands.append(":ROUT:MULT:OPEN (@ %s)" %open)
+        if close:
+            commands.append(":ROUT:MULT:CLOS (@ %s)" %close)
+        self.ctrl.write(";".join(commands))
+    #end def
+
     #--------------------------------------------------------------------------
     def get_closedChannels(self):
         return self.ctrl.query(":ROUT:MULT:CLOS?")
@@ -136,24 +214,29 @@ class Keithley_2700:
 ###############################################################################
 class Keithley_2400:
     ''' SourceMeter '''
+    # Current source ranges (A), smallest first
+    current_ranges = [1.05*10**(-6), 10.5*10**(-6), 105*10**(-6), 1.05*10**(-3), 10.5*10**(-3), 105*10**(-3), 1.05]
+
     #--------------------------------------------------------------------------
     def __init__(self, instr):
-        self.ctrl = ResourceManager.open_resource(instr)
-
-        self.ctrl.write(":ROUT:TERM REAR") # Use the rear output terminals
-        self.current_mode()
-        self.set_current_range(10.5*10**(-3)) # Default
-        self.set_current(float(current))
+        self.ctrl = BatchingResource(ResourceManager.open_resource(instr))
+        self.cache = StateCache(self.ctrl)
+
+        with self.ctrl.batch():
+            self.ctrl.write(":ROUT:TERM REAR") # Use the rear output terminals
+            self.current_mode()
+            self.set_current_range(10.5*10**(-3)) # Default
+            self.set_current(float(current))
     #end init
 
     #--------------------------------------------------------------------------
     def turn_source_on(self):
-        self.ctrl.write(":OUTPut:STATe ON")
+        self.cache.write('output', 'ON', ":OUTPut:STATe ON")
     #end def
 
     #--------------------------------------------------------------------------
     def turn_source_off(self):
-        self.ctrl.write(":OUTPut:STATe OFF")
+        self.cache.write('output', 'OFF', ":OUTPut:STATe OFF")
     #end def
 
     #--------------------------------------------------------------------------
@@ -175,77 +258,42 @@ class Keithley_2400:
 
     #--------------------------------------------------------------------------
     def current_mode(self):
-        self.ctrl.write(":SOURce:FUNCtion:MODE CURRent")
-        self.ctrl.write(":SOURce:CURRent:MODE FIXed") # Fixed current mode
+        with self.ctrl.batch():
+            self.cache.write('function', 'CURR', ":SOURce:FUNCtion:MODE CURRent")
+            self.cache.write('mode', 'FIX', ":SOURce:CURRent:MODE FIXed") # Fixed current mode
     #end def
 
     #--------------------------------------------------------------------------
     def set_current(self, current):
-        self.change_current_range(current)
-        #time.sleep(5)
-        self.ctrl.write(":SOURce:CURRent:LEVel:IMMediate:AMPLitude %f" % current)
+        with self.ctrl.batch():
+            self.change_current_range(current)
+            #time.sleep(5)
+            self.cache.write('level', current, ":SOURce:CURRent:LEVel:IMMediate:AMPLitude %f" % current)
     #end def
 
     #--------------------------------------------------------------------------
     def change_current_range(self, current):
-        #self.write(":SOURce:CURRent:LEVel:IMMediate:AMPLitude 0")
-        if current > 0:
-            if current > 105*10**(-3):
-                    self.set_current_range(1.05)
-            else:
-                if current > 10.5*10**(-3):
-                    self.set_current_range(105*10**(-3))
-                else:
-                    if current > 1.05*10**(-3):
-                        self.set_current_range(10.5*10**(-3))
-                    else:
-                        if current > 105*10**(-6):
-                            self.set_current_range(1.05*10**(-3))
-                        else:
-                            if current > 10.5*10**(-6):
-                                self.set_current_range(105*10**(-6))
-                            else:
-                                if current > 1.05*10**(-6):
-                                    self.set_current_range(10.5*10**(-6))
-                                else:
-                                    self.set_current_range(1.05*10**(-6))
-
-        elif current < 0:
-            if current < -105*10**(-3):
-                    self.set_current_range(-1.05)
-            else:
-                if current < -10.5*10**(-3):
-                    self.set_current_range(-105*10**(-3))
-                else:
-                    if current < -1.05*10**(-3):
-                        self.set_current_range(-10.5*10**(-3))
-                    else:
-                        if current < -105*10**(-6):
-                            self.set_current_range(-1.05*10**(-3))
-                        else:
-                            if current < -10.5*10**(-6):
-                                self.set_current_range(-105*10**(-6))
-                            else:
-                                if current < -1.05*10**(-6):
-                                    self.set_current_range(-10.5*10**(-6))
-                                else:
-                                    self.set_current_range(-1.05*10**(-6))
-
-        else:
-            self.set_current_range(1.05*10**(-6))
+        ''' Smallest range that holds the current, shared by +I and -I '''
+        magnitude = abs(current)
+        for current_range in self.current_ranges:
+            if magnitude <= current_range:
+                break
+        #end for
+        self.set_current_range(current_range)
 
     #end def
 
     #--------------------------------------------------------------------------
     def set_current_range(self, current):
-        self.ctrl.write(":SOURce:CURRent:RANGe %f" % current)
+        self.cache.write('range', abs(current), ":SOURce:CURRent:RANGe %f" % abs(current))
 
     #end def
 
     #--------------------------------------------------------------------------
     def voltage_mode(self):
-        self.ctrl.write(":SOURce:FUNCtion:MODE VOLTage")
-        self.ctrl.write(":SOURce:VOLTage:MODE FIXed") # Fixed voltage mode
+        with self.ctrl.batch():
+            self.cache.write('function', 'VOLT', ":SOURce:FUNCtion:MODE VOLTage")
+            self.ctrl.write(":SOURce:VOLTage:MODE FIXed") # Fixed voltage mode
     #end def
 
     #--------------------------------------------------------------------------
@@ -253,6 +301,41 @@ class Keithley_2400:
         self.ctrl.write(":SOURce:VOLTage:LEVel:IMMediate:AMPLitude %f" % voltage)
     #end def
 
+    #--------------------------------------------------------------------------
+    def load_delta_list(self, current, delay):
+        """
+        Load +I, -I, +I into source memory and set up Trigger Link so each
+        source step triggers the k2182 (output line 2) and the next step waits
+        for the k2182 reading to complete (input line 1).
+        """
+        with self.ctrl.batch():
+            self.change_current_range(current)
+            self.cache.write('mode', 'LIST', ":SOURce:CURRent:MODE LIST")
+            self.ctrl.write(":SOURce:LIST:CURRent %f,%f,%f" % (current, -current, current))
+            self.ctrl.write(":SOURce:DELay %f" % delay)
+            self.ctrl.write(":TRIGger:COUNt 3")
+            self.ctrl.write(":TRIGger:DIRection SOURce") # bypass the input trigger on the first step
+            self.ctrl.write(":TRIGger:ILINe 1")
+            self.ctrl.write(":TRIGger:INPut SOURce")
+            self.ctrl.write(":TRIGger:OLINe 2")
+            self.ctrl.write(":TRIGger:OUTPut SOURce")
+    #end def
+
+    #--------------------------------------------------------------------------
+    def start_list(self):
+        self.ctrl.write(":INITiate")
+        self.cache.invalidate('level') # left at the last list value
+    #end def
+
+    #--------------------------------------------------------------------------
+    def fixed_mode(self):
+        with self.ctrl.batch():
+            self.ctrl.write(":TRIGger:COUNt 1")
+            self.ctrl.write(":TRIGger:INPut NONE")
+            self.ctrl.write(":TRIGger:OUTPut NONE")
+            self.cache.write('mode', 'FIX', ":SOURce:CURRent:MODE FIXed")
+    #end def
+
 #end class
 ###############################################################################
 
@@ -261,12 +344,14 @@ class Keithley_2182:
     ''' NanoVoltMeter '''
     #--------------------------------------------------------------------------
     def __init__(self, instr):
-        self.ctrl = ResourceManager.open_resource(instr)
-
-        self.ctrl.write(":TRIGger:SEQuence1:COUNt 1")
-        self.ctrl.write(":TRIGger:SEQuence1:DELay 0") # Set count rate
-        self.ctrl.write(":SENSe:FUNCtion VOLTage")
-        self.ctrl.write(":SENSe1:VOLTage:DC:NPLCycles 5") # Sets integration period based on frequency
+        self.ctrl = BatchingResource(ResourceManager.open_resource(instr))
+        self.cache = StateCache(self.ctrl)
+
+        with self.ctrl.batch():
+            self.ctrl.write(":TRIGger:SEQuence1:COUNt 1")
+            self.ctrl.write(":TRIGger:SEQuence1:DELay 0") # Set count rate
+            self.cache.write('function', 'VOLT', ":SENSe:FUNCtion VOLTage")
+            self.set_nplc(5) # Sets integration period based on frequency
     #end init
 
     #--------------------------------------------------------------------------
@@ -275,14 +360,68 @@ class Keithley_2182:
         Scan the channel and take a reading
         """
         #self.write(":ROUTe:SCAN:INTernal:CCOunt 1") # Specify number of readings on channel 1
-        self.ctrl.write(":SENSe:CHANnel 1")
-        data = self.ctrl.query(":SENSe:DATA:FRESh?")
+        with self.ctrl.batch():
+            self.cache.write('channel', 1, ":SENSe:CHANnel 1")
+            data = self.ctrl.query(":SENSe:DATA:FRESh?")
         #print str(data)[0:15]
         #print data
         return str(data)[0:15] # Fetches Reading
 
     #end def
 
+    #--------------------------------------------------------------------------
+    def set_nplc(self, nplc):
+        self.nplc = nplc
+        self.cache.write('nplc', nplc, ":SENSe1:VOLTage:DC:NPLCycles %g" % nplc)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def arm_buffer(self, n, delay):
+        """
+        Wait for n Trigger Link pulses from the k2400, storing one reading
+        per pulse in the buffer. delay (s) is the source delay before each
+        pulse, for the time the sequence may take.
+        """
+        # three line cycles of 50 Hz per NPLC cover the conversion and autozero
+        self.sequence_time = n*(delay + 3*self.nplc/50.0)
+        with self.ctrl.batch():
+            self.cache.write('channel', 1, ":SENSe:CHANnel 1")
+            self.ctrl.write(":TRIGger:SEQuence1:SOURce EXTernal")
+            self.ctrl.write(":TRIGger:SEQuence1:COUNt %d" % n)
+            self.ctrl.write(":TRACe:CLEar")
+            self.ctrl.write(":TRACe:POINts %d" % n)
+            self.ctrl.write(":TRACe:FEED SENSe")
+            self.ctrl.write(":TRACe:FEED:CONTrol NEXT")
+            self.ctrl.write(":INITiate")
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read_buffer(self):
+        """
+        Wait for the armed sequence to finish and return its readings. The
+        *OPC? blocks until then, so the VISA timeout (ms) is raised to twice
+        the sequence time and a second while it waits.
+        """
+        resource = self.ctrl.resource # the BatchingResource does not pass attributes set on it
+        timeout = resource.timeout
+        resource.timeout = max(timeout, int(1000*(2*self.sequence_time + 1)))
+        try:
+            self.ctrl.query("*OPC?")
+        finally:
+            resource.timeout = timeout
+        #end try
+        data = self.ctrl.query(":TRACe:DATA?")
+        return [float(v) for v in str(data).split(',')]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def disarm(self):
+        with self.ctrl.batch():
+            self.ctrl.write(":TRACe:FEED NONE")
+            self.ctrl.write(":TRIGger:SEQuence1:SOURce IMMediate")
+            self.ctrl.write(":TRIGger:SEQuence1:COUNt 1")
+    #end def
+
 #end class
 ###############################################################################
 
@@ -403,22 +542,25 @@ class InitialCheck:
     
     #--------------------------------------------------------------------------
     def setupIV(self):
-        self.k2400.ctrl.write(":SOUR:FUNC VOLT")
-        self.k2400.ctrl.write(":SOUR:VOLT:MODE FIXED")
-        self.k2400.ctrl.write(":SOUR:VOLT:RANG 20")
-        self.k2400.ctrl.write(":SOUR:VOLT:LEV "+str(self.voltage))
-        self.k2400.ctrl.write(":SENS:CURR:PROT 10E-2")
-        self.k2400.ctrl.write(":SENS:FUNC CURR")
-        self.k2400.ctrl.write(":SENS:CURR:RANG 10E-2")
-        self.k2400.ctrl.write(":FORM:ELEM CURR")
+        with self.k2400.ctrl.batch():
+            self.k2400.ctrl.write(":SOUR:FUNC VOLT")
+            self.k2400.ctrl.write(":SOUR:VOLT:MODE FIXED")
+            self.k2400.ctrl.write(":SOUR:VOLT:RANG 20")
+            self.k2400.ctrl.write(":SOUR:VOLT:LEV "+str(self.voltage))
+            self.k2400.ctrl.write(":SENS:CURR:PROT 10E-2")
+            self.k2400.ctrl.write(":SENS:FUNC CURR")
+            self.k2400.ctrl.write(":SENS:CURR:RANG 10E-2")
+            self.k2400.ctrl.write(":FORM:ELEM CURR")
+        self.k2400.cache.invalidate() # settings changed behind the driver
     #end def
     #--------------------------------------------------------------------------
 
     #--------------------------------------------------------------------------
     def resetSourcemeter(self):
-        self.k2400.current_mode()
-        self.k2400.set_current_range(10.5*10**(-3)) # Default
-        self.k2400.set_current(float(current))
+        with self.k2400.ctrl.batch():
+            self.k2400.current_mode()
+            self.k2400.set_current_range(10.5*10**(-3)) # Default
+            self.k2400.set_current(float(current))
     #end def
     #--------------------------------------------------------------------------
 
@@ -490,8 +632,9 @@ class InitialCheck:
         V = [1000*self.voltage*(x)/n for x in range(-n,n+1)]
 
         for v in V:
-            self.k2400.ctrl.write(":SOUR:VOLT:LEV "+str(float(v)/1000))
-            self.k2400.ctrl.write(":OUTP ON")
+            with self.k2400.ctrl.batch():
+                self.k2400.ctrl.write(":SOUR:VOLT:LEV "+str(float(v)/1000))
+                self.k2400.ctrl.write(":OUTP ON")
             time.sleep(self.delay)
             i = float(self.k2400.ctrl.query(":READ?"))
             time.sleep(self.delay)
@@ -500,6 +643,7 @@ class InitialCheck:
             I.append(i)
             time.sleep(self.delay)
         #end for
+        self.k2400.cache.invalidate('output', 'level')
 
 
         fit = self.polyfit(V,I,1)
@@ -577,13 +721,12 @@ class InitialCheck:
     #end def
 
     #--------------------------------------------------------------------------
-    def updateGUI(self, stamp, data):
+    def updateGUI(self, stamp, data, key=None):
         """
         Sends data to the GUI (main thread), for live updating while the process is running
-        in another thread.
+        in another thread. Only the latest value per topic reaches the next GUI frame.
         """
-        time.sleep(0.1)
-        wx.CallAfter(pub.sendMessage, stamp, msg=data)
+        telemetry.put(stamp, data, key)
 
     #end def
 
@@ -598,9 +741,10 @@ class ProcessThread(Thread):
     """
 
     #--------------------------------------------------------------------------
-    def __init__(self):
+    def __init__(self, resume=None):
         """ Init Worker Thread Class """
         Thread.__init__(self)
+        self.resume = resume
         self.start()
 
     #end init
@@ -608,7 +752,7 @@ class ProcessThread(Thread):
     #--------------------------------------------------------------------------
     def run(self):
         """ Run Worker Thread """
-        td=TakeData()
+        td=TakeData(self.resume)
         #td = TakeDataTest()
     #end def
 
@@ -617,9 +761,11 @@ class ProcessThread(Thread):
 
 ###############################################################################
 class TakeData:
-    ''' Takes measurements and saves them to file. '''
+    ''' Takes measurements and saves them to file. resume is the checkpoint
+        of a run to continue.
+    '''
     #--------------------------------------------------------------------------
-    def __init__(self):
+    def __init__(self, resume=None):
         global abort_ID
         global k2700
         global k2400
@@ -633,12 +779,13 @@ class TakeData:
         global current
         global thickness
 
-        global timecalclist, tempcalclist, rAcalclist, rBcalclist
-
         self.k2400 = k2400
         self.k2700 = k2700
         self.k2182 = k2182
-        self.heater = heater
+        self.timer = Timer(enabled=timing_enabled)
+        # shared with the sampler thread
+        self.heater = LockedInstrument(self.timer.proxy(heater, 'cn7500'))
+        self.runlog = runlog # kept, a new run replaces the global
 
         self.current = current
         self.tolerance = tolerance
@@ -649,41 +796,123 @@ class TakeData:
 
         self.exception_ID = 0
 
-        self.start = time.time()
+        if resume:
+            self.start = resume['start'] # times carry on from the first run
+        else:
+            self.start = time.time()
+        #end if
         #time initializations
         self.time_temp = 0
 
         self.delay = 3
         self.tempdelay = 5
 
+        # the first sample is the run folder, the others are in sub folders
+        self.samples = [Sample('main', thickness)]
+        self.samples[0].runlog = self.runlog
+        for name, sample_thickness, current_rows, voltage_rows in extra_samples:
+            self.samples.append(Sample(name, sample_thickness, current_rows, voltage_rows))
+        #end for
+
+        configurations = {}
+        managed = set()
+        short = set()
+        for sample in self.samples:
+            configurations.update(sample.configurations)
+            managed.update(sample.channels())
+            short.update(sample.short())
+        #end for
+        self.relays = RelaySequencer(self.k2700, configurations, managed, verify=verify_relays,
+                                     short=short)
+        if instrument_sim.ENABLED and not instrument_trace.REPLAY:
+            # the simulated card gets the further samples on their rows
+            for sample in self.samples[1:]:
+                instrument_sim.default_rig().add_sample(sample.current, sample.voltage)
+        #end if
+        self.hardware_delta = hardware_delta
+        if adaptive_settle:
+            self.settle = SettleDetector()
+        else:
+            self.settle = None
+        #end if
+        if self.hardware_delta:
+            self.k2400.load_delta_list(float(self.current), source_delay)
+        #end if
+        self.delta_checked = set() # configurations whose triggered delta was checked at this setpoint
+
+        # bus transactions and the phases of the loop; nothing is wrapped
+        # when timing is off
+        for name, instrument in (('k2700', self.k2700), ('k2400', self.k2400), ('k2182', self.k2182)):
+            self.timer.replace(instrument.ctrl, 'resource', self.timer.proxy(instrument.ctrl.resource, name))
+        #end for
+        self.timer.instrument(self.relays, ['goto'], 'relays.')
+        self.timer.instrument(self, ['take_PID_Data', 'check_status', 'control_setpoint', 'updateStats',
+                                     'data_measurement', 'measure_configurations', 'delta_method',
+                                     'software_delta_method', 'triggered_delta_method',
+                                     'check_triggered_delta', 'read_voltage', 'relay_pause',
+                                     'write_data_to_file', 'write_temperature_log', 'process_data',
+                                     'save_checkpoint', 'updateGUI'])
+
+        self.sampler = TemperatureSampler(self.heater, period=temp_sample_period)
+        self.sampler.start()
+        self.pid_index = 0 # next sample for the stability check
+        self.logged = 0 # next sample to write to the temperature file
+        self.regression = RollingRegression(window=stability_window)
+        self.fitted = 0 # next sample to add to the stability fit
+        self.model = ThermalModel(period=temp_sample_period)
+        self.modelled = 0 # next sample to add to the thermal model
+        self.model_time = time.time() # last fit of the thermal model
+        self.planner = None
+        self.heater_setpoint = None
+        self.stability = '-'
+        self.stability_ci = '-'
+        self.measureList = list(measureList)
+        self.Tnum = 0
+        if resume:
+            self.Tnum = resume['completed']
+            self.samples[0].restore(resume['calclists'])
+            self.samples[0].ramp_points = resume.get('ramp_points', [])
+        #end if
+        for sample in self.samples[1:]:
+            saved = resume and resume.get('samples', {}).get(sample.name)
+            if saved:
+                sample.restore(saved['calclists'])
+                sample.ramp_points = saved['ramp_points']
+                sample.open_log(self.runlog.folder, resume={'data': saved['offsets']['data'],
+                                                            'resistivity': saved['offsets']['resistivity'],
+                                                            'blocks': saved['offsets'].get('blocks')})
+            else:
+                sample.open_log(self.runlog.folder, start=self.runlog.start)
+            #end if
+        #end for
+        self.measurementtemp = self.measureList[self.Tnum]
+
         self.tol = 'NO'
         self.stable = 'NO'
         self.measurement = 'OFF'
         self.updateGUI(stamp='Measurement', data=self.measurement)
         self.updateGUI(stamp='Status Bar', data='Running')
         print "start take data"
-        self.Tnum = 0
         try:
+            self.save_checkpoint()
+            if ramp_mode:
+                self.ramp_sweep()
+            #end if
             while abort_ID == 0:
-                for temp in measureList:
+                for temp in self.measureList[self.Tnum:]:
                     self.measurementtemp = temp
                     print "Set measurement to %f" %(self.measurementtemp)
-                    while True:
-                        try:
-                            self.heater.set_setpoint(self.measurementtemp)
-                            break
-                        except IOError:
-                            print 'IOError: communication failure'
-                    #end while
-
-                    timecalclist = []
-                    tempcalclist = []
-                    rAcalclist = []
-                    rBcalclist = []
-
-                    self.recentPID = []
-                    self.recentPIDtime=[]
+                    self.start_planner()
+
+                    for sample in self.samples:
+                        sample.clear()
+                    #end for
+
+                    # stability is fitted on samples from the new setpoint on
+                    self.regression.reset()
+                    self.fitted = self.sampler.count
                     self.stability = '-'
+                    self.stability_ci = '-'
                     self.updateGUI(stamp="Stability", data=self.stability)
 
                     self.take_PID_Data()
@@ -694,6 +923,7 @@ class TakeData:
                     while (not condition):
                         n = n+1
                         self.take_PID_Data()
+                        self.control_setpoint()
                         if n%10 == 0:
                             self.updateStats()
                         #end if
@@ -704,16 +934,25 @@ class TakeData:
                     if abort_ID == 1: break
                     # start measurement
                     if (condition):
+                        # no boost while measuring
+                        self.planner.holding = True
+                        self.control_setpoint()
                         self.measurement = 'ON'
                         self.updateGUI(stamp='Measurement', data=self.measurement)
+                        self.begin_block()
 
+                        # the samples in turn, so they share the temperature
                         for i in range(measurement_number):
                             print 'measurement number: ', i
-                            self.data_measurement()
-                            self.write_data_to_file()
+                            for sample in self.samples:
+                                self.data_measurement(sample)
+                                if abort_ID == 1: break
+                                self.write_data_to_file(sample)
+                            #end for
                             if abort_ID == 1: break
                         #end for
 
+                        self.end_block('aborted' if abort_ID == 1 else 'complete')
                         if abort_ID == 1: break
                         self.measurement = 'OFF'
 
@@ -722,11 +961,17 @@ class TakeData:
                         self.updateGUI(stamp='Measurement', data=self.measurement)
                     #end if
                     if abort_ID == 1: break
-                    self.process_data()
+                    for sample in self.samples:
+                        self.process_data(sample)
+                    #end for
                     self.Tnum = self.Tnum + 1
+                    self.save_checkpoint()
 
                     if abort_ID == 1: break
                 #end for
+                if self.Tnum == len(self.measureList):
+                    self.save_checkpoint(finished=True)
+                #end if
                 abort_ID = 1
             #end while
         #end try
@@ -755,65 +1000,305 @@ class TakeData:
                 print 'IOError: communication failure'
         #end while
 
+        if self.hardware_delta:
+            self.k2400.fixed_mode()
+            self.k2182.disarm()
+        #end if
+        # leave the card shorted, however the run ended
+        try:
+            self.relays.short()
+        except IOError:
+            print 'IOError: could not short the matrix card'
+        #end try
+
+        self.write_temperature_log()
+        self.sampler.stop()
+        print 'Temperature samples: %d, failed reads: %d' % (self.sampler.count, self.sampler.errors)
+        print self.model.describe()
+
+        if self.settle:
+            print 'Learned settle times:'
+            print self.settle.summary()
+        #end if
+        print 'GPIB transactions saved by batching: k2700 %d, k2400 %d, k2182 %d' % (
+            self.k2700.ctrl.saved(), self.k2400.ctrl.saved(), self.k2182.ctrl.saved())
+        print 'k2400 state cache %s' % self.k2400.cache.summary()
+        print 'k2182 state cache %s' % self.k2182.cache.summary()
+        print telemetry.summary()
+
         self.save_files()
 
         wx.CallAfter(pub.sendMessage, 'Enable Buttons')
 
+        for sample in self.samples:
+            sample.runlog.export()
+        #end for
+        print 'csv files written'
+
     #end init
 
+    #--------------------------------------------------------------------------
+    def ramp_sweep(self):
+        ''' Continuous mode: ramps from one measurement temperature to the
+            next at ramp_rate, measuring all the way.
+        '''
+        global abort_ID
+
+        self.measurement = 'ON'
+        self.updateGUI(stamp='Measurement', data=self.measurement)
+        self.take_PID_Data()
+        for target in self.measureList[self.Tnum:]:
+            self.measurementtemp = target
+            origin = self.temp
+            if abs(target - origin) < self.tolerance:
+                direction = 0
+            elif target > origin:
+                direction = 1
+            else:
+                direction = -1
+            #end if
+            print "Ramp from %.1f C to %.1f C at %.2f C/min" % (origin, target, ramp_rate)
+
+            for sample in self.samples:
+                sample.clear()
+            #end for
+
+            self.begin_block()
+            t0 = time.time()
+            while abort_ID == 0:
+                setpoint = origin + direction*ramp_rate/60*(time.time() - t0)
+                if direction == 0 or (setpoint - target)*direction >= 0:
+                    setpoint = target
+                #end if
+                setpoint = round(setpoint, 1)
+                if setpoint != self.heater_setpoint:
+                    self.write_setpoint(setpoint)
+                #end if
+
+                self.take_PID_Data()
+                for sample in self.samples:
+                    self.data_measurement(sample)
+                    if abort_ID == 1: break
+                    self.write_data_to_file(sample)
+                    rho = self.resistivitycalc([self.r_A], [self.r_B], sample)
+                    sample.ramp_points.append((sample.timecalclist[-1], self.avgTemp, rho*1000, direction))
+                #end for
+                if abort_ID == 1: break
+
+                if setpoint == target and abs(self.temp - target) < self.tolerance:
+                    break
+                #end if
+            #end while
+            self.end_block('aborted' if abort_ID == 1 else 'ramp')
+            if abort_ID == 1: break
+            self.Tnum = self.Tnum + 1
+            self.save_checkpoint()
+        #end for
+        if self.Tnum == len(self.measureList):
+            self.save_checkpoint(finished=True)
+        #end if
+        self.measurement = 'OFF'
+        self.updateGUI(stamp='Measurement', data=self.measurement)
+
+        for sample in self.samples:
+            self.process_ramp(sample)
+        #end for
+        abort_ID = 1
+    #end def
+
+    #--------------------------------------------------------------------------
+    def process_ramp(self, sample):
+        ''' Binned rho(T) of the ramps, lag and drift corrected, into the
+            resistivity file of the sample.
+        '''
+        if not sample.ramp_points:
+            return
+        t, temps, rho, direction = np.array(sample.ramp_points, dtype=float).T
+        temps, rho, lag, drift = ramp.correct(temps, rho, direction, ramp_bin)
+        T, rho, stderr, n, index = ramp.bin_curve(temps, rho, ramp_bin)
+        t = np.bincount(index, t)/n
+        for k in xrange(len(T)):
+            sample.runlog.append('resistivity', t[k], T[k], rho[k])
+        #end for
+        print 'Ramp of %s: %d readings in %d bins, thermocouple lag %.2f C, drift %.4f mOhm*cm' % (
+            sample.name, len(index), len(T), lag, drift)
+        if np.isnan(drift):
+            print '  rho(T) is too close to a line to tell the lag from a drift: lag fitted with no drift'
+        sample.ramp_meta = {'ramp_rate': ramp_rate, 'ramp_bin': ramp_bin,
+                          'ramp_lag': lag, 'ramp_drift': drift}
+    #end def
+
+    #--------------------------------------------------------------------------
+    def begin_block(self):
+        ''' The next readings of every sample are a block at the measurement temperature '''
+        self.delta_checked.clear() # settling changes with the sample resistance
+        for sample in self.samples:
+            sample.runlog.begin_block(self.measurementtemp, time.time() - self.start)
+        #end for
+    #end def
+
+    #--------------------------------------------------------------------------
+    def end_block(self, status):
+        ''' Index the block of readings in the run logs '''
+        for sample in self.samples:
+            sample.runlog.end_block(time.time() - self.start, status)
+        #end for
+    #end def
+
+    #--------------------------------------------------------------------------
+    def save_checkpoint(self, finished=False):
+        ''' Everything needed to continue the run after the last completed
+            setpoint.
+        '''
+        state = {
+            'finished': finished,
+            'saved': str(datetime.now()),
+            'start': self.start,
+            'begin': self.runlog.start,
+            'measureList': self.measureList,
+            'completed': self.Tnum,
+            'remaining': self.measureList[self.Tnum:],
+            'calclists': self.samples[0].calclists(),
+            'ramp_points': self.samples[0].ramp_points,
+            'offsets': self.runlog.offsets(),
+            'samples': dict((sample.name, {'calclists': sample.calclists(),
+                                           'ramp_points': sample.ramp_points,
+                                           'offsets': sample.runlog.offsets()})
+                            for sample in self.samples[1:]),
+            'settings': {
+                'current': self.current,
+                'thickness': self.thickness,
+                'tolerance': self.tolerance,
+                'stability_threshold': self.stability_threshold,
+                'measurement_number': measurement_number,
+                'maxLimit': maxLimit,
+                'hardware_delta': self.hardware_delta,
+                'source_delay': source_delay,
+                'adaptive_settle': adaptive_settle,
+                'verify_relays': verify_relays,
+                'temp_sample_period': temp_sample_period,
+                'stability_window': stability_window,
+                'setpoint_overshoot': setpoint_overshoot,
+                'ramp_mode': ramp_mode,
+                'ramp_rate': ramp_rate,
+                'ramp_bin': ramp_bin,
+                'timing_enabled': timing_enabled,
+                'extra_samples': [sample.settings() for sample in self.samples[1:]],
+            },
+        }
+        checkpoint.save(state, self.runlog.folder)
+    #end def
+
     #--------------------------------------------------------------------------
     def take_PID_Data(self):
         """ Takes data from the PID and proceeds to a
             function that checks the PID setpoints.
         """
 
-        try:
-            # Take Data
-            self.time_temp = time.time() - self.start
-            self.temp = float(self.heater.get_pv())
-            self.setpoint = float(self.heater.get_setpoint())
-
-        except exceptions.ValueError as VE:
-            print(VE)
-            self.time_temp = time.time() - self.start
-            self.temp = float(self.heater.get_pv())
-            self.setpoint = float(self.heater.get_setpoint())
+        # Take Data, the next sample from the sampler thread
+        self.pid_index = self.sampler.wait_next(self.pid_index)
+        sample = self.sampler.latest()
+        if sample is None or self.sampler.stale():
+            # the sampler skips failed reads, so a dead CN7500 or sampler
+            # thread would otherwise repeat the last temperature forever
+            raise IOError('No temperature from the PID for %.1f s: %s'
+                          % (self.sampler.age(), self.sampler.last_error))
+        #end if
+        t, self.temp, self.setpoint = sample
+        self.time_temp = t - self.start
 
         print "t_temp: %.2f s\ttemp: %s C" % (self.time_temp, self.temp)
 
-        #check stability of PID
-        if (len(self.recentPID)<6):
-            self.recentPID.append(self.temp)
-            self.recentPIDtime.append(self.time_temp)
-        #end if
-        else:
-            self.recentPID.pop(0)
-            self.recentPIDtime.pop(0)
-            self.recentPID.append(self.temp)
-            self.recentPIDtime.append(self.time_temp)
+        #check stability of PID: every sample of the last stability_window
+        #seconds, whatever the rate of this loop
+        samples, self.fitted = self.sampler.since(self.fitted)
+        for t, temp, setpoint in samples:
+            self.regression.add(t, temp)
+        #end for
 
-            self.stability = self.getStability(self.recentPID,self.recentPIDtime)
-            print "stability: %.4f C/min" % (self.stability*60)
+        # thermal model of the PID loop, from every sample of the run
+        samples, self.modelled = self.sampler.since(self.modelled)
+        for t, temp, setpoint in samples:
+            self.model.add(t, temp, setpoint)
+        #end for
+        if time.time() - self.model_time > 60:
+            self.model.fit()
+            self.model_time = time.time()
+            print self.model.describe()
+        #end if
+        if self.regression.ready():
+            self.stability, self.stability_ci, fitted = self.regression.fit()
+            print "stability: %.4f +- %.4f C/min" % (self.stability*60, self.stability_ci*60)
             print "stability threshold: %.4f C/min" % (self.stability_threshold*60)
             self.updateGUI(stamp="Stability", data=self.stability*60)
-        #end else
+        #end if
         self.updateGUI(stamp="Time Temp", data=self.time_temp)
         self.updateGUI(stamp="Setpoint", data=self.setpoint)
         self.updateGUI(stamp="Temperature", data=self.temp)
+        telemetry.sample('temperature', self.time_temp, self.temp)
+        telemetry.sample('setpoint', self.time_temp, self.setpoint)
 
         self.safety_check()
         self.check_status()
-        
-        global pidfile
-        print('\nWrite status to file\n')
-        pidfile.write('%.1f,'%(time.time()-self.start))
+
+        self.write_temperature_log()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write_temperature_log(self):
+        ''' Writes every sample taken since the last call, including those
+            taken during a resistance measurement.
+        '''
+        global runlog
         if self.stability != '-':
-            pidfile.write('%.4f,' %(self.stability*60))
+            stability = self.stability*60
+        else:
+            stability = np.nan
         #end if
+        samples, self.logged = self.sampler.since(self.logged)
+        for t, temp, setpoint in samples:
+            runlog.append('temperature', t-self.start, stability, temp, setpoint, self.measurementtemp)
+        #end for
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write_setpoint(self, setpoint):
+        while True:
+            try:
+                self.heater.set_setpoint(setpoint)
+                break
+            except IOError:
+                print 'IOError: communication failure'
+        #end while
+        self.heater_setpoint = setpoint
+    #end def
+
+    #--------------------------------------------------------------------------
+    def start_planner(self):
+        ''' New setpoint plan for the measurement temperature '''
+        global maxLimit
+        sample = self.sampler.latest()
+        if sample is None:
+            temp, setpoint = self.measurementtemp, self.measurementtemp
+        elif self.sampler.stale():
+            raise IOError('No temperature from the PID for %.1f s: %s'
+                          % (self.sampler.age(), self.sampler.last_error))
         else:
-            pidfile.write('-,')
-        #end else
-        pidfile.write('%.2f,%.2f,' %(self.temp,self.setpoint))
+            temp, setpoint = sample[1], sample[2]
+        #end if
+        self.planner = SetpointPlanner(self.model, self.measurementtemp, self.tolerance,
+                                       setpoint_overshoot, maxLimit, time.time(), setpoint)
+        self.write_setpoint(self.planner.command(time.time(), temp))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def control_setpoint(self):
+        ''' Next setpoint of the plan, written only when it changes '''
+        setpoint = self.planner.command(time.time(), self.temp)
+        if setpoint != self.heater_setpoint:
+            print 'Setpoint: %.1f C (measurement temperature %.1f C)' % (setpoint, self.measurementtemp)
+            self.write_setpoint(setpoint)
+        #end if
     #end def
 
     #--------------------------------------------------------------------------
@@ -825,15 +1310,6 @@ class TakeData:
             abort_ID = 1
     #end def
 
-    #--------------------------------------------------------------------------
-    def getStability(self, temps, times):
-        coeffs = np.polyfit(times, temps, 1)
-
-        # Polynomial Coefficients
-        results = coeffs.tolist()
-        return results[0]
-    #end def
-
     #--------------------------------------------------------------------------
     def check_status(self):
         global measureList
@@ -845,60 +1321,37 @@ class TakeData:
             self.tol = 'NO'
         #end else
 
-        if (self.stability!='-'):
-            if (np.abs(self.stability) < self.stability_threshold):
-                self.stable = 'OK'
-            #end if
-            else:
-                self.stable = 'NO'
+        # the slope within the threshold, its confidence interval is only shown
+        if self.regression.stable(self.stability_threshold):
+            self.stable = 'OK'
         #end if
         else:
             self.stable = 'NO'
         #end else
 
+        eta = self.regression.eta(self.measurementtemp, self.tolerance, self.stability_threshold)
+        if eta is None:
+            eta = '-'
+        else:
+            eta = '%d:%02d' % (eta//60, eta%60)
+        #end if
 
-        print "tolerance: %s\nstable: %s\n" % (self.tol, self.stable)
+        print "tolerance: %s\nstable: %s\ntime until stable: %s\n" % (self.tol, self.stable, eta)
 
 
-        self.updateGUI(stamp="Status Bar", data=[self.tol, self.stable])
+        self.updateGUI(stamp="Status Bar", data=[self.tol, self.stable], key='Status Bar tol')
+        self.updateGUI(stamp="Status Bar", data=eta + 'eta', key='Status Bar eta')
     #end def
 
     #--------------------------------------------------------------------------
     def updateStats(self):
         print('update all stats\n')
-        # short the matrix card
-        self.k2700.closeChannels('117, 125, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        time.sleep(self.delay)
-
-        ### r_A:
-        # r_12,34
-        print('measure r_12,34')
-        self.k2700.openChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_1234, self.t_1234 = self.delta_method()
-        self.r_1234 = abs(self.r_1234)
-        self.k2700.closeChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        print "t_r1234: %.2f s\tr1234: %.2f Ohm" % (self.t_1234, self.r_1234)
+        r, t = self.measure_configurations()
         if abort_ID == 1: return
-        time.sleep(self.delay)
+        self.write_temperature_log()
 
-        # r_34,12
-        print('measure r_34,12')
-        self.k2700.closeChannels('118')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_3412, self.t_3412 = self.delta_method()
-        self.r_3412 = abs(self.r_3412)
-        self.k2700.closeChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('118')
-        print(self.k2700.get_closedChannels())
-        print "t_r3412: %.2f s\tr3412: %.2f Ohm" % (self.t_3412, self.r_3412)
-        if abort_ID == 1: return
-        time.sleep(self.delay)
+        self.r_1234, self.r_3412, self.r_1324, self.r_2413 = [r[c] for c in VDP_ORDER]
+        self.t_1234, self.t_3412, self.t_1324, self.t_2413 = [t[c] for c in VDP_ORDER]
 
         # Calculate r_A
         self.r_A = (self.r_1234 + self.r_3412)/2
@@ -907,37 +1360,6 @@ class TakeData:
         self.updateGUI(stamp="R_A", data=self.r_A*1000)
         print "t_rA: %.2f s\trA: %.2f Ohm" % (self.t_A, self.r_A)
 
-        ### r_B:
-        # r_13,24
-        print('measure r_13,24')
-        self.k2700.closeChannels('119')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.r_1324, self.t_1324 = self.delta_method()
-        self.r_1324 = abs(self.r_1324)
-        self.k2700.closeChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('119')
-        print(self.k2700.get_closedChannels())
-        print "t_r1324: %.2f s\tr1324: %.2f Ohm" % (self.t_1324, self.r_1324)
-        if abort_ID == 1: return
-        time.sleep(self.delay)
-
-        # r_24,13
-        print('measure r_24,13')
-        self.k2700.closeChannels('120')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_2413, self.t_2413 = self.delta_method()
-        self.r_2413 = abs(self.r_2413)
-        self.k2700.closeChannels('117, 125, 126, 128')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('120')
-        print(self.k2700.get_closedChannels())
-        print "t_r2413: %.2f s\tr2413: %.2f Ohm" % (self.t_2413, self.r_2413)
-        if abort_ID == 1: return
         # Calculate r_B
         self.r_B = (self.r_1324 + self.r_2413)/2
         self.t_B = time.time()-self.start
@@ -949,18 +1371,52 @@ class TakeData:
         print "resistivity: %f" % (self.resistivity*1000)
         self.updateGUI(stamp = "Time Resistivity", data = self.t_B)
         self.updateGUI(stamp = "Resistivity", data = self.resistivity*1000)
+        telemetry.sample('resistivity', self.t_B, self.resistivity*1000)
 
-        global rawfile
+        global runlog
         print('\nWrite status to file\n')
-        rawfile.write('%.1f,'%(self.t_B))
-        rawfile.write('%.4f,'%(self.thickness))
-        rawfile.write('%.2f,%.2f,' %(self.temp,self.setpoint))
-        rawfile.write('%.2f,%.2f,'%(self.r_A*1000,self.r_B*1000))
-        rawfile.write('%.3f\n'%(self.resistivity*1000))
+        runlog.append('status', self.t_B, self.thickness, self.temp, self.setpoint,
+                      self.r_A*1000, self.r_B*1000, self.resistivity*1000)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def measure_configurations(self, sample=None):
+        """
+        Delta method on each van der Pauw configuration of a sample (the
+        first one by default), in the order that needs the fewest relay
+        actuations from the present card state; the card is shorted again
+        at the end of the pass.
+        Returns dictionaries of |r| (Ohm) and time (s) by configuration.
+        """
+        sample = sample or self.samples[0]
+        r = {}
+        t = {}
+        for key in self.relays.order([sample.key(config) for config in VDP_ORDER]):
+            config = key[1]
+            print('measure %s r_%s,%s' % (sample.name, config[:2], config[2:]))
+            self.relays.goto(key)
+            r_config, t[config] = self.delta_method()
+            if self.hardware_delta and key not in self.delta_checked:
+                r_config = self.check_triggered_delta(key, r_config)
+            #end if
+            r[config] = abs(r_config)
+            print "t_r%s: %.2f s\tr%s: %.2f Ohm" % (config, t[config], config, r[config])
+            if abort_ID == 1: break
+            self.relay_pause()
+        #end for
+        self.relays.short() # between passes the sample sits shorted
+        return r, t
     #end def
 
     #--------------------------------------------------------------------------
     def delta_method(self):
+        if self.hardware_delta:
+            return self.triggered_delta_method()
+        return self.software_delta_method()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def software_delta_method(self):
         print('Delta Method')
         t1 = time.time() - self.start
         # delta method:
@@ -968,23 +1424,17 @@ class TakeData:
         self.k2400.turn_source_on()
         self.k2400.set_current(float(self.current))
         self.updateGUI(stamp="Current Status", data=float(self.current)*1000)
-        time.sleep(self.delay)
-        v1p = float( self.k2182.fetch() )
-        time.sleep(self.delay)
+        v1p = self.read_voltage()
         # negative V:
         self.k2400.set_current(-1*float(self.current))
         self.updateGUI(stamp="Current Status", data=-1*float(self.current)*1000)
-        time.sleep(self.delay)
-        vn = float( self.k2182.fetch() )
-        time.sleep(self.delay)
+        vn = self.read_voltage()
         t2 = time.time() - self.start
 
         # positive V2:
         self.k2400.set_current(float(self.current))
         self.updateGUI(stamp="Current Status", data=float(self.current)*1000)
-        time.sleep(self.delay)
-        v2p = float( self.k2182.fetch() )
-        time.sleep(self.delay)
+        v2p = self.read_voltage()
         self.k2400.turn_source_off()
         self.updateGUI(stamp="Current Status", data=0)
 
@@ -1002,167 +1452,161 @@ class TakeData:
     #end def
 
     #--------------------------------------------------------------------------
-    def resistivitycalc(self,Alist,Blist):
-        global thickness
-        delta = 0.0005 # error limit (0.05%)
-        lim = 1
-        rA = np.average(Alist)
-        rB = np.average(Blist)
+    def read_voltage(self):
+        ''' One k2182 reading after the source or the relays changed '''
+        if self.settle:
+            return self.settle.read(self.k2182.fetch, self.delay)
+        #end if
+        time.sleep(self.delay)
+        v = float( self.k2182.fetch() )
+        time.sleep(self.delay)
+        return v
+    #end def
 
-        z1 = (2*np.log(2))/(np.pi*(rA + rB))
+    #--------------------------------------------------------------------------
+    def relay_pause(self):
+        ''' Wait after a relay change, left to the next reading when adaptive '''
+        if not self.settle:
+            time.sleep(self.delay)
+        #end if
+    #end def
 
-        # Algorithm taken from http://www.nist.gov/pml/div683/hall_algorithm.cfm
-        while (lim > delta):
-            y = 1/np.exp(np.pi*z1*rA) + 1/np.exp(np.pi*z1*rB)
+    #--------------------------------------------------------------------------
+    def triggered_delta_method(self):
+        """
+        Delta method run by the instruments: the k2400 steps through its
+        +I,-I,+I source list, triggering the k2182 over Trigger Link after
+        each step, and the three readings are fetched in one transfer.
+        """
+        print('Triggered Delta Method')
+        t1 = time.time() - self.start
+        self.k2182.arm_buffer(3, source_delay)
+        self.k2400.turn_source_on()
+        self.updateGUI(stamp="Current Status", data=float(self.current)*1000)
+        self.k2400.start_list()
+        v1p, vn, v2p = self.k2182.read_buffer()
+        self.k2400.turn_source_off()
+        self.updateGUI(stamp="Current Status", data=0)
+        t3 = time.time() - self.start
 
-            z2 = z1 - (1/np.pi)*((1-y)/(rA/np.exp(np.pi*z1*rA) + rB/np.exp(np.pi*z1*rB)))
+        print 'i: %f Amps' % float(self.current)
+        print "v: %f V, %f V, %f V" % (v1p, vn, v2p)
 
-            lim = abs(z2 - z1)/z2
+        r = (v1p + v2p - 2*vn)/(4*float(self.current))
 
-            z1 = z2
-        #end while
+        avgt = (t1 + t3)/2
 
-        rho = 1/z1*float(thickness)
-        return rho
+        return r, avgt
     #end def
 
     #--------------------------------------------------------------------------
-    def data_measurement(self):
+    def check_triggered_delta(self, key, r_triggered):
+        """
+        Measure the configuration again with the software delta method,
+        settled by the adaptive detector (or the full delay), and compare.
+        When the triggered result is off by more than delta_check_tolerance
+        or the reading noise, source_delay is too short for this sample:
+        hardware_delta is turned off for the rest of the run and the
+        software result is returned. Otherwise the triggered one is.
+        """
+        self.delta_checked.add(key)
+        self.k2400.fixed_mode()
+        self.k2182.disarm()
+        r_software = self.software_delta_method()[0]
+
+        current = float(self.current)
+        noise = RANGE_NOISE[voltage_range(r_software*current)]
+        tolerance = max(delta_check_tolerance*abs(r_software), 5*noise/current)
+        if abs(r_triggered - r_software) > tolerance:
+            print 'Triggered delta of %s %s: %.6g Ohm, software settled: %.6g Ohm' % (key + (r_triggered, r_software))
+            print 'source delay %.3g s is too short for the sample, going on with the software delta method' % source_delay
+            self.hardware_delta = False
+            return r_software
+        #end if
+        self.k2400.load_delta_list(current, source_delay)
+        return r_triggered
+    #end def
 
-        self.delay = 2.5 # time for the keithley to take a steady measurement
+    #--------------------------------------------------------------------------
+    def resistivitycalc(self,Alist,Blist,sample=None):
+        global thickness
+        if sample is not None:
+            return vdp.resistivity(Alist, Blist, sample.thickness)
+        return vdp.resistivity(Alist, Blist, thickness)
+    #end def
 
-        temp1 = float(heater.get_pv())
+    #--------------------------------------------------------------------------
+    def data_measurement(self, sample):
 
-        # short the matrix card
-        self.k2700.closeChannels('117, 125, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        time.sleep(self.delay)
+        self.delay = 2.5 # time for the keithley to take a steady measurement
 
-        ### r_A:
-        # r_12,34
-        print('measure r_12,34')
-        self.k2700.openChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_1234, self.t_1234 = self.delta_method()
-        self.r_1234 = abs(self.r_1234)
-        self.k2700.closeChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        print "t_r1234: %.2f s\tr1234: %.2f Ohm" % (self.t_1234, self.r_1234)
+        r, t = self.measure_configurations(sample)
         if abort_ID == 1: return
-        time.sleep(self.delay)
+        shown = sample is self.samples[0] # the GUI follows the first sample
 
-        # r_34,12
-        print('measure r_34,12')
-        self.k2700.closeChannels('118')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_3412, self.t_3412 = self.delta_method()
-        self.r_3412 = abs(self.r_3412)
-        self.k2700.closeChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('118')
-        print(self.k2700.get_closedChannels())
-        print "t_r3412: %.2f s\tr3412: %.2f Ohm" % (self.t_3412, self.r_3412)
-        if abort_ID == 1: return
-        time.sleep(self.delay)
+        self.r_1234, self.r_3412, self.r_1324, self.r_2413 = [r[c] for c in VDP_ORDER]
+        self.t_1234, self.t_3412, self.t_1324, self.t_2413 = [t[c] for c in VDP_ORDER]
 
         # Calculate r_A
         self.r_A = (self.r_1234 + self.r_3412)/2
         self.t_A = time.time()-self.start
-        self.updateGUI(stamp="Time R_A", data=self.t_A)
-        self.updateGUI(stamp="R_A", data=self.r_A*1000)
+        if shown:
+            self.updateGUI(stamp="Time R_A", data=self.t_A)
+            self.updateGUI(stamp="R_A", data=self.r_A*1000)
+        #end if
         print "t_rA: %.2f s\trA: %.2f Ohm" % (self.t_A, self.r_A)
 
-        temp2 = float(self.heater.get_pv())
-
-        ### r_B:
-        # r_13,24
-        print('measure r_13,24')
-        self.k2700.closeChannels('119')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.r_1324, self.t_1324 = self.delta_method()
-        self.r_1324 = abs(self.r_1324)
-        self.k2700.closeChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('119')
-        print(self.k2700.get_closedChannels())
-        print "t_r1324: %.2f s\tr1324: %.2f Ohm" % (self.t_1324, self.r_1324)
-        if abort_ID == 1: return
-        time.sleep(self.delay)
-
-        # r_24,13
-        print('measure r_24,13')
-        self.k2700.closeChannels('120')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_2413, self.t_2413 = self.delta_method()
-        self.r_2413 = abs(self.r_2413)
-        self.k2700.closeChannels('117, 125, 126, 128')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('120')
-        print(self.k2700.get_closedChannels())
-        print "t_r2413: %.2f s\tr2413: %.2f Ohm" % (self.t_2413, self.r_2413)
-        if abort_ID == 1: return
         # Calculate r_B
         self.r_B = (self.r_1324 + self.r_2413)/2
         self.t_B = time.time()-self.start
-        self.updateGUI(stamp="Time R_B", data=self.t_B)
-        self.updateGUI(stamp="R_B", data=self.r_B*1000)
+        if shown:
+            self.updateGUI(stamp="Time R_B", data=self.t_B)
+            self.updateGUI(stamp="R_B", data=self.r_B*1000)
+        #end if
         print "t_rB: %.2f s\trB: %.2f Ohm" % (self.t_B, self.r_B)
 
-        temp3 = float(self.heater.get_pv())
+        # temperature at the time of each configuration
+        temps = [self.sampler.temperature_at(self.start + t[c]) for c in VDP_ORDER]
+        self.avgTemp = np.average(temps)
+        print "temps: %s C" % ', '.join('%.2f' % T for T in temps)
 
-        self.avgTemp = (temp1 + temp2 + temp3)/3
+        self.write_temperature_log()
     #end def
 
     #--------------------------------------------------------------------------
-    def write_data_to_file(self):
-        global timecalclist, tempcalclist, rAcalclist, rBcalclist
-        global myfile
-
-        print('\nWrite data to file\n')
+    def write_data_to_file(self, sample):
+        print('\nWrite data of %s to file\n' % sample.name)
         time = (self.t_1234 + self.t_3412 + self.t_1324 + self.t_2413)/4
         temp = self.avgTemp
-        thickness = self.thickness
+        thickness = sample.thickness
         rA = self.r_A
         rB = self.r_B
-        resistivity = self.resistivitycalc([rA],[rB])
-        myfile.write('%.6f,%.6f,%.6f,' %(time,temp,thickness))
-        myfile.write('%.6f,%.6f,' % (rA*1000, rB*1000) )
-        myfile.write('%.6f\n' % (resistivity*1000))
+        resistivity = self.resistivitycalc([rA],[rB],sample)
+        sample.runlog.append('data', time, temp, thickness, rA*1000, rB*1000, resistivity*1000)
 
-        timecalclist.append(time)
-        tempcalclist.append(temp)
-        rAcalclist.append(rA)
-        rBcalclist.append(rB)
+        sample.timecalclist.append(time)
+        sample.tempcalclist.append(temp)
+        sample.rAcalclist.append(rA)
+        sample.rBcalclist.append(rB)
     #end def
 
     #--------------------------------------------------------------------------
-    def updateGUI(self, stamp, data):
+    def updateGUI(self, stamp, data, key=None):
         """
         Sends data to the GUI (main thread), for live updating while the process is running
-        in another thread.
+        in another thread. Only the latest value per topic reaches the next GUI frame.
         """
-        time.sleep(0.1)
-        wx.CallAfter(pub.sendMessage, stamp, msg=data)
+        telemetry.put(stamp, data, key)
     #end def
 
     #--------------------------------------------------------------------------
-    def process_data(self):
-        global timecalclist, tempcalclist, rAcalclist, rBcalclist
-        global processfile
+    def process_data(self, sample):
+        time = np.average(sample.timecalclist)
+        temp = np.average(sample.tempcalclist)
 
-        time = np.average(timecalclist)
-        thickness = self.thickness
-        temp = np.average(tempcalclist)
+        resistivity = self.resistivitycalc(sample.rAcalclist,sample.rBcalclist,sample)
 
-        resistivity = self.resistivitycalc(rAcalclist,rBcalclist)
-
-        processfile.write('%.1f,%.6f,%.6f\n'%(time,temp,resistivity*1000))
+        sample.runlog.append('resistivity', time, temp, resistivity*1000)
     #end def
 
     #--------------------------------------------------------------------------
@@ -1173,36 +1617,25 @@ class TakeData:
 
         print('Save Files')
 
-        global dataFile
-        global finaldataFile
-        global myfile
-        global rawfile
-        global pidfile
-        global processfile
-
         stop = time.time()
         end = datetime.now() # End time
         totalTime = stop - self.start # Elapsed Measurement Time (seconds)
-        endStr = 'end time: %s \nelapsed measurement time: %s seconds \n \n' % (str(end), str(totalTime))
-
-        myfile.close() # Close the file
-        rawfile.close()
-        pidfile.close()
-        processfile.close()
-
-        myfile = open(dataFile, 'r') # Opens the file for Reading
-        contents = myfile.readlines() # Reads the lines of the file into python set
-        myfile.close()
 
-        # Adds elapsed measurement time to the read file list
-        contents.insert(1, endStr) # Specify which line and what value to insert
-        # NOTE: First line is line 0
+        # The end of the run goes into the run log headers, in place; the csv
+        # files (Data.csv with the end time) are exported after the rig is free
+        for sample in self.samples:
+            sample.runlog.finalize(end=str(end), elapsed=str(totalTime), **sample.ramp_meta)
+            sample.runlog.close()
+        #end for
 
-        # Writes the elapsed measurement time to the final file
-        myfinalfile = open(finaldataFile,'w')
-        contents = "".join(contents)
-        myfinalfile.write(contents)
-        myfinalfile.close()
+        if self.timer.enabled:
+            folder = self.runlog.folder
+            self.timer.write_log(os.path.join(folder, 'Timing.csv'),
+                                 os.path.join(folder, 'Timing Histograms.csv'))
+            self.timer.write_trace(os.path.join(folder, 'Timing Trace.json'))
+            print self.timer.summary()
+        #end if
+        self.timer.restore()
 
         # Save the GUI plots
         self.updateGUI(stamp='Save_All', data='Save')
@@ -1385,10 +1818,7 @@ class UserPanel(wx.Panel):
         global k2700, k2400, k2182, heater
         global dataFile
         global finaldataFile
-        global myfile
-        global rawfile
-        global pidfile
-        global processfile
+        global runlog
         global statusFile
         global temperatureFile
         global resistivityFile
@@ -1407,41 +1837,14 @@ class UserPanel(wx.Panel):
                 self.name_folder()
 
                 if self.run_check == wx.ID_OK:
-                    myfile = open(dataFile, 'w') # opens file for writing/overwriting
-                    rawfile = open(statusFile,'w')
-                    pidfile = open(temperatureFile,'w')
-                    processfile = open(resistivityFile,'w')
                     begin = datetime.now() # Current date and time
-                    myfile.write('Start Time: ' + str(begin) + '\n')
-                    rawfile.write('Start Time: ' + str(begin) + '\n')
-                    processfile.write('Start Time: ' + str(begin) + '\n')
-
-                    dataheaders = 'time (s), temp (C), thickness (cm), R_A (mOhm), R_B (mOhm), resistivity (mOhm*cm)\n'
-                    myfile.write(dataheaders)
-
-                    rawheaders = 'time (s), thickness (cm), temperature (C), setpoint (C), R_A (mOhm), R_B (mOhm), resistivity (mOhm*cm)\n'
-                    rawfile.write(rawheaders)
-                    
-                    pidheaders = 'time (s), stability (C/min), temperature (C), setpoint (C), measurementtemp (C)\n'
-                    pidfile.write(pidheaders)
-
-                    processheaders = 'time (s), temp (C),resistivity (mOhm*cm)\n'
-                    processfile.write(processheaders)
+                    # Data, Status, Temperature and Resistivity records; the
+                    # csv files (same names and headers) are written at the end
+                    runlog = RunLog('.', start=begin)
 
                     abort_ID = 0
 
-                    self.btn_pid_tolerance.Disable()
-                    self.btn_stability_threshold.Disable()
-                    self.btn_current.Disable()
-                    self.btn_thickness.Disable()
-                    self.btn_measurement_number.Disable()
-                    self.btn_new.Disable()
-                    self.btn_ren.Disable()
-                    self.btn_dlt.Disable()
-                    self.btn_clr.Disable()
-                    self.btn_check.Disable()
-                    self.btn_run.Disable()
-                    self.btn_stop.Enable()
+                    self.disable_buttons()
 
                     #start the threading process
                     thread = ProcessThread()
@@ -1460,6 +1863,71 @@ class UserPanel(wx.Panel):
 
     #end def
 
+    #--------------------------------------------------------------------------
+    def resume(self, folder):
+        ''' Continues the run saved in folder after its last completed setpoint '''
+        global current, thickness, tolerance, stability_threshold, measurement_number, maxLimit
+        global hardware_delta, source_delay, adaptive_settle, verify_relays, temp_sample_period
+        global stability_window, setpoint_overshoot, ramp_mode, ramp_rate, ramp_bin
+        global extra_samples, timing_enabled
+        global measureList
+        global filePath
+        global runlog
+        global abort_ID
+
+        state = checkpoint.load(folder)
+        if state is None or state['finished']:
+            wx.MessageBox('There is no unfinished run in this folder.', 'Error', wx.OK | wx.ICON_INFORMATION)
+            return
+        #end if
+
+        settings = state['settings']
+        current = settings['current']
+        thickness = settings['thickness']
+        tolerance = settings['tolerance']
+        stability_threshold = settings['stability_threshold']
+        measurement_number = settings['measurement_number']
+        maxLimit = settings['maxLimit']
+        hardware_delta = settings['hardware_delta']
+        source_delay = settings['source_delay']
+        adaptive_settle = settings['adaptive_settle']
+        verify_relays = settings['verify_relays']
+        temp_sample_period = settings['temp_sample_period']
+        stability_window = settings.get('stability_window', stability_window)
+        setpoint_overshoot = settings.get('setpoint_overshoot', setpoint_overshoot)
+        ramp_mode = settings.get('ramp_mode', ramp_mode)
+        ramp_rate = settings.get('ramp_rate', ramp_rate)
+        ramp_bin = settings.get('ramp_bin', ramp_bin)
+        timing_enabled = settings.get('timing_enabled', timing_enabled)
+        extra_samples = [(sample['name'], sample['thickness'], sample['current'], sample['voltage'])
+                         for sample in settings.get('extra_samples', [])]
+        measureList = state['measureList']
+
+        self.listbox.Set([str(T) for T in state['remaining']])
+
+        try:
+            setup = Setup() # reconnect the instruments
+        except visa.VisaIOError:
+            wx.MessageBox("Not all instruments are connected!", "Error")
+            return
+        #end try
+
+        filePath = folder
+        os.chdir(folder)
+        # data of the setpoint that was interrupted is dropped and measured again
+        runlog = RunLog('.', resume={'data': state['offsets']['data'],
+                                     'resistivity': state['offsets']['resistivity'],
+                                     'blocks': state['offsets'].get('blocks')})
+        print 'Resuming run of %s at %s C, %d setpoints left' % (
+            state['begin'], state['remaining'][0], len(state['remaining']))
+
+        abort_ID = 0
+
+        self.disable_buttons()
+
+        thread = ProcessThread(resume=state)
+    #end def
+
     #--------------------------------------------------------------------------
     def name_folder(self):
         question = wx.MessageDialog(None, 'The data files are saved into a folder upon ' + \
@@ -1936,6 +2404,22 @@ class UserPanel(wx.Panel):
 
     #end def
 
+    #--------------------------------------------------------------------------
+    def disable_buttons(self):
+        self.btn_pid_tolerance.Disable()
+        self.btn_stability_threshold.Disable()
+        self.btn_current.Disable()
+        self.btn_thickness.Disable()
+        self.btn_measurement_number.Disable()
+        self.btn_new.Disable()
+        self.btn_ren.Disable()
+        self.btn_dlt.Disable()
+        self.btn_clr.Disable()
+        self.btn_check.Disable()
+        self.btn_run.Disable()
+        self.btn_stop.Enable()
+    #end def
+
     #--------------------------------------------------------------------------
     def enable_buttons(self):
         self.btn_pid_tolerance.Enable()
@@ -1977,6 +2461,7 @@ class StatusPanel(wx.Panel):
         self.stability = '-'
         self.i = str(0.00)
         self.measurement = 'OFF'
+        self.changed = False # labels to update on the next frame
 
         self.celsius = u"\u2103"
         self.ohm = u"\u2126"
@@ -2030,25 +2515,25 @@ class StatusPanel(wx.Panel):
     #--------------------------------------------------------------------------
     def OnR_A(self, msg):
         self.rA = '%.2f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnR_B(self, msg):
         self.rB = '%.2f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnTemp(self, msg):
         self.temp = '%.1f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnSetpoint(self, msg):
         self.setpoint = '%.1f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
@@ -2057,19 +2542,19 @@ class StatusPanel(wx.Panel):
             self.stability = '%.3f'%(float(msg))
         else:
             self.stability = msg
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnCurrent(self, msg):
         self.i = '%.2f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnMeasurement(self, msg):
         self.measurement = msg
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
@@ -2090,19 +2575,19 @@ class StatusPanel(wx.Panel):
 
         self.t = '%s:%s:%s'%(hours,minutes,seconds)
         self.ctime = str(datetime.now())[11:19]
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnThickness(self, msg):
         self.d = '%.2f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
     def OnResistivity(self,msg):
         self.rho = '%.2f'%(float(msg))
-        self.update_values()
+        self.changed = True
     #end def
 
     #--------------------------------------------------------------------------
@@ -2185,6 +2670,14 @@ class StatusPanel(wx.Panel):
 
     #end def
 
+    #--------------------------------------------------------------------------
+    def refresh(self):
+        ''' Called once per GUI frame '''
+        if self.changed:
+            self.update_values()
+            self.changed = False
+    #end def
+
     #--------------------------------------------------------------------------
     def create_sizer(self):
         sizer = wx.GridBagSizer(14,2)
@@ -2227,13 +2720,12 @@ class StatusPanel(wx.Panel):
     #end def
 
     #--------------------------------------------------------------------------
-    def updateGUI(self, stamp, data):
+    def updateGUI(self, stamp, data, key=None):
         """
         Sends data to the GUI (main thread), for live updating while the process is running
-        in another thread.
+        in another thread. Only the latest value per topic reaches the next GUI frame.
         """
-        time.sleep(0.1)
-        wx.CallAfter(pub.sendMessage, stamp, msg=data)
+        telemetry.put(stamp, data, key)
 
     #end def
 #end class
@@ -2250,24 +2742,21 @@ class ResistivityPanel(wx.Panel):
 
         global filePath
 
-        global t_list
-        global rho_list
-
         self.rhochar = u"\u03c1"
 
         self.create_title("Resistivity Panel")
         self.init_plot()
         self.canvas = FigureCanvasWxAgg(self, -1, self.figure)
+        self.live = LivePlot(self.canvas, self.subplot, [self.linerho])
         self.create_control_panel()
         self.create_sizer()
 
-        pub.subscribe(self.OnResistivity, "Resistivity")
-        pub.subscribe(self.OnResistivityTime, "Time Resistivity")
-
         # For saving the plots at the end of data acquisition:
         pub.subscribe(self.save_plot, "Save_All")
 
-        self.animator = animation.FuncAnimation(self.figure, self.draw_plot, interval=2000, blit=False)
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.draw_plot, self.timer)
+        self.timer.Start(2000)
     #end init
 
     #--------------------------------------------------------------------------
@@ -2301,18 +2790,6 @@ class ResistivityPanel(wx.Panel):
         self.hbox1.Add(self.ymax_control, border=5, flag=wx.ALL)
     #end def
 
-    #--------------------------------------------------------------------------
-    def OnResistivity(self, msg):
-        self.rho = float(msg)
-        rho_list.append(self.rho)
-        t_list.append(self.t)
-    #end def
-
-    #--------------------------------------------------------------------------
-    def OnResistivityTime(self, msg):
-        self.t = float(msg)
-    #end def
-
     #--------------------------------------------------------------------------
     def init_plot(self):
         self.dpi = 100
@@ -2320,7 +2797,14 @@ class ResistivityPanel(wx.Panel):
 
         self.figure = Figure((6,2), dpi=self.dpi)
         self.subplot = self.figure.add_subplot(111)
-        self.linerho, = self.subplot.plot(t_list,rho_list, color=self.colorrho, linewidth=1)
+        self.subplot.set_ylabel(r"$\rho$ ($m\Omega cm$)",fontsize=8)
+        self.subplot.set_xlabel("t (s)", fontsize = 8)
+        self.subplot.tick_params(labelsize=8)
+        self.linerho, = self.subplot.plot([], [], color=self.colorrho, linewidth=1)
+
+        # auto limits, moved only when the data outgrows them
+        self.xmax_auto = None
+        self.ymax_auto = None
 
         self.legend = self.figure.legend( (self.linerho,), (r"$\rho$",), (0.15,0.70),fontsize=8)
         #self.subplot.text(0.05, .95, r'$X(f) = \mathcal{F}\{x(t)\}$', \
@@ -2328,16 +2812,12 @@ class ResistivityPanel(wx.Panel):
     #end def
 
     #--------------------------------------------------------------------------
-    def draw_plot(self,i):
-        self.subplot.clear()
-        #self.subplot.set_title("voltage vs. time", fontsize=12)
-
-        self.subplot.set_ylabel(r"$\rho$ ($m\Omega cm$)",fontsize=8)
-        self.subplot.set_xlabel("t (s)", fontsize = 8)
+    def draw_plot(self, event):
+        if not len(rho_history): return
 
         # Adjustable scale:
         if self.xmax_control.is_auto():
-            xmax = max(t_list)
+            self.xmax_auto = xmax = grow(self.xmax_auto, rho_history.last[0], 0.2)
         else:
             xmax = float(self.xmax_control.manual_value())
         if self.xmin_control.is_auto():
@@ -2349,29 +2829,17 @@ class ResistivityPanel(wx.Panel):
         else:
             ymin = float(self.ymin_control.manual_value())
         if self.ymax_control.is_auto():
-            maxR = max(rho_list)
-            ymax = maxR + abs(maxR)*0.3
+            self.ymax_auto = ymax = grow(self.ymax_auto, rho_history.max, 0.3)
         else:
             ymax = float(self.ymax_control.manual_value())
 
-        self.subplot.set_xlim([xmin, xmax])
-        self.subplot.set_ylim([ymin, ymax])
-
-        pylab.setp(self.subplot.get_xticklabels(), fontsize=8)
-        pylab.setp(self.subplot.get_yticklabels(), fontsize=8)
-
-        self.linerho, = self.subplot.plot(t_list,rho_list, color=self.colorrho, linewidth=1)
-
-        return (self.linerho,)
-        #return (self.subplot.plot( thighV_list, highV_list, color=self.colorH, linewidth=1),
-            #self.subplot.plot( tlowV_list, lowV_list, color=self.colorL, linewidth=1))
-
+        self.live.update([rho_history.view(xmin, xmax)], (xmin, xmax, ymin, ymax))
     #end def
 
     #--------------------------------------------------------------------------
     def save_plot(self, msg):
         path = filePath + "/Resistivity_Plot.png"
-        self.canvas.print_figure(path)
+        self.live.save(path)
 
     #end def
 
@@ -2398,26 +2866,22 @@ class TemperaturePanel(wx.Panel):
         wx.Panel.__init__(self, *args, **kwargs)
 
         global filePath
-        global ttemp_list
-        global temp_list
-        global setpoint_list
 
         self.create_title("Temperature Panel")
         self.init_plot()
         self.canvas = FigureCanvasWxAgg(self, -1, self.figure)
+        self.live = LivePlot(self.canvas, self.subplot, [self.lineSetpoint, self.lineTemp])
         self.create_control_panel()
         self.create_sizer()
         self.celsius = u"\u2103"
 
 
-        pub.subscribe(self.OnTemp, "Temperature")
-        pub.subscribe(self.OnSetpoint, "Setpoint")
-        pub.subscribe(self.OnTime, "Time Temp")
-
         # For saving the plots at the end of data acquisition:
         pub.subscribe(self.save_plot, "Save_All")
 
-        self.animator = animation.FuncAnimation(self.figure, self.draw_plot, interval=5000, blit=False)
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.draw_plot, self.timer)
+        self.timer.Start(5000)
     #end init
 
     #--------------------------------------------------------------------------
@@ -2451,25 +2915,6 @@ class TemperaturePanel(wx.Panel):
         self.hbox1.Add(self.ymax_control, border=5, flag=wx.ALL)
     #end def
 
-    #--------------------------------------------------------------------------
-    def OnTime(self, msg):
-        self.time = float(msg)
-
-    #end def
-
-    #--------------------------------------------------------------------------
-    def OnSetpoint(self, msg):
-        self.setpoint = float(msg)
-    #end def
-
-    #--------------------------------------------------------------------------
-    def OnTemp(self, msg):
-        self.temp = float(msg)
-        temp_list.append(self.temp)
-        setpoint_list.append(self.setpoint)
-        ttemp_list.append(self.time)
-    #end def
-
     #--------------------------------------------------------------------------
     def init_plot(self):
         self.dpi = 100
@@ -2478,22 +2923,27 @@ class TemperaturePanel(wx.Panel):
 
         self.figure = Figure((6,2), dpi=self.dpi)
         self.subplot = self.figure.add_subplot(111)
+        self.subplot.set_ylabel(r"temperature ($\degree$C)",fontsize=8)
+        self.subplot.set_xlabel("time (s)", fontsize = 8)
+        self.subplot.tick_params(labelsize=8)
 
-        self.lineSetpoint, = self.subplot.plot(ttemp_list,setpoint_list, color=self.colorSetpoint, linewidth=1)
-        self.lineTemp, = self.subplot.plot(ttemp_list,temp_list, color=self.colorTemp, linewidth=1)
+        self.lineSetpoint, = self.subplot.plot([], [], color=self.colorSetpoint, linewidth=1)
+        self.lineTemp, = self.subplot.plot([], [], color=self.colorTemp, linewidth=1)
+
+        # auto limits, moved only when the data outgrows them
+        self.xmax_auto = None
+        self.ymax_auto = None
 
         self.legend = self.figure.legend( (self.lineSetpoint, self.lineTemp), (r"$Setpoint$",r"$Temperature$"), (0.15,0.70),fontsize=8)
     #end def
 
     #--------------------------------------------------------------------------
-    def draw_plot(self,i):
-        self.subplot.clear()
-        self.subplot.set_ylabel(r"temperature ($\degree$C)",fontsize=8)
-        self.subplot.set_xlabel("time (s)", fontsize = 8)
+    def draw_plot(self, event):
+        if not len(temp_history): return
 
         # Adjustable scale:
         if self.xmax_control.is_auto():
-            xmax = max(ttemp_list)
+            self.xmax_auto = xmax = grow(self.xmax_auto, temp_history.last[0], 0.2)
         else:
             xmax = float(self.xmax_control.manual_value())
         if self.xmin_control.is_auto():
@@ -2505,29 +2955,19 @@ class TemperaturePanel(wx.Panel):
         else:
             ymin = float(self.ymin_control.manual_value())
         if self.ymax_control.is_auto():
-            maxT = max(setpoint_list+temp_list)
-            ymax = maxT + abs(maxT)*0.3
+            self.ymax_auto = ymax = grow(self.ymax_auto, max(temp_history.max, setpoint_history.max), 0.3)
         else:
             ymax = float(self.ymax_control.manual_value())
 
-        self.subplot.set_xlim([xmin, xmax])
-        self.subplot.set_ylim([ymin, ymax])
-
-        pylab.setp(self.subplot.get_xticklabels(), fontsize=8)
-        pylab.setp(self.subplot.get_yticklabels(), fontsize=8)
-
-        self.lineSetpoint, = self.subplot.plot(ttemp_list,setpoint_list, color=self.colorSetpoint, linewidth=1)
-        self.lineTemp, = self.subplot.plot(ttemp_list,temp_list, color=self.colorTemp, linewidth=1)
-
-        return (self.lineSetpoint, self.lineTemp)
-
+        self.live.update([setpoint_history.view(xmin, xmax), temp_history.view(xmin, xmax)],
+                         (xmin, xmax, ymin, ymax))
     #end def
 
     #--------------------------------------------------------------------------
     def save_plot(self, msg):
         path = filePath + "/Temperature plot.png"
         #path = filePath + '/Raw Data/' + 'Plots/' + "Temperature_Plot.png"
-        self.canvas.print_figure(path)
+        self.live.save(path)
 
     #end def
 
@@ -2558,8 +2998,24 @@ class Frame(wx.Frame):
 
         pub.subscribe(self.update_statusbar, "Status Bar")
 
+        # GUI frames: telemetry from the running program
+        self.frame_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_frame, self.frame_timer)
+        self.frame_timer.Start(1000/FRAME_RATE)
+
     #end init
 
+    #--------------------------------------------------------------------------
+    def on_frame(self, event):
+        ''' Plot samples into the histories, latest values to the panels '''
+        changed, samples = telemetry.drain()
+        for series, t, y in samples:
+            plot_histories[series].append(t, y)
+        for topic, value in changed:
+            pub.sendMessage(topic, msg=value)
+        self.statuspanel.refresh()
+    #end def
+
     #--------------------------------------------------------------------------
     def init_UI(self):
         self.SetBackgroundColour('#E0EBEB')
@@ -2587,21 +3043,35 @@ class Frame(wx.Frame):
         # Menu Bar with File, Quit
         menubar = wx.MenuBar()
         fileMenu = wx.Menu()
+        rmi = wx.MenuItem(fileMenu, APP_RESUME, '&Resume Run...\tCtrl+R')
+        fileMenu.AppendItem(rmi)
         qmi = wx.MenuItem(fileMenu, APP_EXIT, '&Quit\tCtrl+Q')
         #qmi.SetBitmap(wx.Bitmap('exit.png'))
         fileMenu.AppendItem(qmi)
 
+        self.Bind(wx.EVT_MENU, self.onResume, id=APP_RESUME)
         self.Bind(wx.EVT_MENU, self.onQuit, id=APP_EXIT)
 
         menubar.Append(fileMenu, 'File')
         self.SetMenuBar(menubar)
     #end def
 
+    #--------------------------------------------------------------------------
+    def onResume(self, e):
+        dlg = wx.DirDialog(None, "Choose the folder of the run to resume.", "",
+                    wx.DD_DEFAULT_STYLE | wx.DD_DIR_MUST_EXIST)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.userpanel.resume(dlg.GetPath())
+        #end if
+        dlg.Destroy()
+    #end def
+
     #--------------------------------------------------------------------------
     def onQuit(self, e):
         global abort_ID
 
         abort_ID=1
+        self.frame_timer.Stop() # no frame may drain into a destroyed window
         self.Destroy()
         self.Close()
 
@@ -2613,7 +3083,7 @@ class Frame(wx.Frame):
     def create_statusbar(self):
         self.statusbar = ESB.EnhancedStatusBar(self, -1)
         self.statusbar.SetSize((-1, 23))
-        self.statusbar.SetFieldsCount(10)
+        self.statusbar.SetFieldsCount(12)
         self.SetStatusBar(self.statusbar)
 
         self.space_between = 10
@@ -2646,6 +3116,13 @@ class Frame(wx.Frame):
         self.indicator_stable = wx.StaticText(self.statusbar, -1, "-")
         self.width5 = self.width3
 
+        # Predicted time until within tolerance and stable:
+        eta_text = wx.StaticText(self.statusbar, -1, "Time Until Stable:")
+        self.width_eta_text = eta_text.GetRect().width + self.space_between
+
+        self.indicator_eta = wx.StaticText(self.statusbar, -1, "-")
+        self.width_eta = 60
+
         # Measurement Time:
         measurement_number_text = wx.StaticText(self.statusbar, -1, "Time Until Measurement Complete:")
         self.width6 = measurement_number_text.GetRect().width + self.space_between
@@ -2661,7 +3138,8 @@ class Frame(wx.Frame):
         self.width8 = version_label.GetRect().width + self.space_between
 
         # Set widths of each piece of the status bar:
-        self.statusbar.SetStatusWidths([self.width0, 50, self.width2, self.width3, self.width4, self.width5, self.width6, self.width7, -1, self.width8])
+        self.statusbar.SetStatusWidths([self.width0, 50, self.width2, self.width3, self.width4, self.width5,
+                                        self.width_eta_text, self.width_eta, self.width6, self.width7, -1, self.width8])
 
         ### Add the widgets to the status bar:
         # Status:
@@ -2681,6 +3159,10 @@ class Frame(wx.Frame):
         self.statusbar.AddWidget(stableThresh_text, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
         self.statusbar.AddWidget(self.indicator_stable, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
 
+        # Time Until Stable:
+        self.statusbar.AddWidget(eta_text, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
+        self.statusbar.AddWidget(self.indicator_eta, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
+
         # Measurement Time:
         self.statusbar.AddWidget(measurement_number_text, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
         self.statusbar.AddWidget(self.indicator_measurement_number, ESB.ESB_ALIGN_CENTER_HORIZONTAL, ESB.ESB_ALIGN_CENTER_VERTICAL)
@@ -2714,6 +3196,12 @@ class Frame(wx.Frame):
 
         #end elif
 
+        # Time Until Stable:
+        elif string[-3:] == 'eta':
+            self.indicator_eta.SetLabel(string[:-3])
+
+        #end elif
+
         else:
             tol = string[0]
             stable = string[1]
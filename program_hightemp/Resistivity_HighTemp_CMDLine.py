@@ -6,12 +6,27 @@ Created: 2016-02-08
 """
 import os
 import numpy as np
-import minimalmodbus as modbus # For communicating with the cn7500s
-import omegacn7500 # Driver for cn7500s under minimalmodbus, adds a few easy commands
-import visa # pyvisa, essential for communicating with the Keithley
+import instrument_sim # Simulated instruments, enabled with RESISTIVITY_SIM=1
+import instrument_trace # Instrument traffic, RESISTIVITY_RECORD=file / RESISTIVITY_REPLAY=file
+if instrument_trace.REPLAY:
+    modbus = instrument_trace.minimalmodbus
+    omegacn7500 = instrument_trace.omegacn7500
+    visa = instrument_trace.visa
+elif instrument_sim.ENABLED:
+    modbus = instrument_sim.minimalmodbus
+    omegacn7500 = instrument_sim.omegacn7500
+    visa = instrument_sim.visa
+else:
+    import minimalmodbus as modbus # For communicating with the cn7500s
+    import omegacn7500 # Driver for cn7500s under minimalmodbus, adds a few easy commands
+    import visa # pyvisa, essential for communicating with the Keithley
+#end if
+visa = instrument_trace.record_visa(visa)
+omegacn7500 = instrument_trace.record_cn7500(omegacn7500)
 import time
 from datetime import datetime # for getting the current date and time
 import exceptions
+import vdp # van der Pauw solver
 
 #==============================================================================
 version = '1.0 (2016-02-08)'
@@ -625,26 +640,7 @@ class Main:
 
     #--------------------------------------------------------------------------
     def resistivitycalc(self,Alist,Blist):
-        delta = 0.0005 # error limit (0.05%)
-        lim = 1
-        rA = np.average(Alist)
-        rB = np.average(Blist)
-
-        z1 = (2*np.log(2))/(np.pi*(rA + rB))
-
-        # Algorithm taken from http://www.nist.gov/pml/div683/hall_algorithm.cfm
-        while (lim > delta):
-            y = 1/np.exp(np.pi*z1*rA) + 1/np.exp(np.pi*z1*rB)
-
-            z2 = z1 - (1/np.pi)*((1-y)/(rA/np.exp(np.pi*z1*rA) + rB/np.exp(np.pi*z1*rB)))
-
-            lim = abs(z2 - z1)/z2
-
-            z1 = z2
-        #end while
-
-        rho = 1/z1*float(self.thickness)
-        return rho
+        return vdp.resistivity(Alist, Blist, self.thickness)
     #end def
 
     #--------------------------------------------------------------------------
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : batch_reprocess
+Description:
+    Reprocesses every run folder under a directory tree: the sheet
+    resistance and resistivity of each reading are recomputed from the r_A,
+    r_B and thickness columns of Data.csv, and summarized per setpoint into
+    Reprocessed.csv in the run folder. The summaries of all the runs are
+    collected into one table at the top of the tree, where each setpoint is
+    numbered by its block (1, 2, ... in run order); its temperature is the
+    Temp (C) column.
+
+        python batch_reprocess.py <tree> [-j processes] [--force]
+
+Comments:
+    Three Data.csv layouts are recognized from their column header line:
+        runlog     ResistivityGUI v5-v7: R_A, R_B in mOhm, setpoints from
+                   the block index of the run (runlog.read_blocks) or else
+                   one per run of readings at the same temperature
+        indicator  ResistivityGUI v2-v4: r_A, r_B in Ohm, setpoints between
+                   'Start Measurement' and 'Stop Measurement'; v2 and v3
+                   have no thickness column, their resistivity is nan
+        roomtemp   RT_ResistivityGUI: r_A, r_B in Ohm, one measurement
+    Folders are processed by a pool of processes. The size and modification
+    time of each Data.csv are kept with its results in a cache file at the
+    top of the tree, and folders whose Data.csv has not changed are not
+    read again (--force reprocesses everything).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import csv_loader
+import runlog
+import vdp # van der Pauw solver
+
+CACHE_FILE = '.reprocess_cache.json'
+SUMMARY_FILE = 'Reprocessed Summary.csv'
+OUTPUT_FILE = 'Reprocessed.csv'
+DATA_FILES = ('Data.csv', 'Data_Backup.csv') # the backup of a run that did not finish
+CACHE_VERSION = 1 # results of another version are reprocessed
+
+SETPOINT_TOLERANCE = 2.0 # (C) temperature jump that starts a new setpoint (runlog layout)
+
+OUTPUT_HEADERS = ('Temp (C),Thickness (cm),r_A (Ohm),r_B (Ohm),Sheet Resistance (Ohm),'
+                  'Resistivity (Ohm*cm),Resistivity Std Err (Ohm*cm),Readings')
+SUMMARY_HEADERS = 'Folder,Layout,Block,' + OUTPUT_HEADERS # Block: 1, 2, ... in run order
+
+#--------------------------------------------------------------------------
+def layout(columns):
+    names = [c.lower() for c in columns]
+    if 'temp (c)' in names and 'r_a (mohm)' in names:
+        return 'runlog'
+    if 'temperature (c)' in names:
+        return 'indicator'
+    if 'r_a' in names and 'thickness (cm)' in names:
+        return 'roomtemp'
+    raise ValueError('unknown Data.csv columns: %s' % ', '.join(columns))
+#end def
+
+#--------------------------------------------------------------------------
+def field(records, name):
+    ''' Column of the records by name, whatever its case '''
+    for column in records.dtype.names:
+        if column.lower() == name:
+            return records[column]
+    #end for
+    raise KeyError(name)
+#end def
+
+#--------------------------------------------------------------------------
+def setpoints_by_temperature(temp, tolerance=SETPOINT_TOLERANCE):
+    ''' Start, stop index of each run of readings at the same temperature '''
+    if not len(temp):
+        return []
+    breaks = np.flatnonzero(np.abs(np.diff(temp)) > tolerance) + 1
+    edges = np.concatenate([[0], breaks, [len(temp)]])
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+#end def
+
+#--------------------------------------------------------------------------
+def setpoints_by_block(folder, n):
+    ''' Start, stop index of each completed block of the run index, None without one '''
+    complete = [runlog.BLOCK_STATUS.index('complete'), runlog.BLOCK_STATUS.index('ramp')]
+    blocks = runlog.read_blocks(folder)
+    if not len(blocks) or blocks['stop'].max() > n:
+        return None # no index, or not the records of this csv
+    return [(int(b['first']), int(b['stop'])) for b in blocks if b['status'] in complete]
+#end def
+
+#--------------------------------------------------------------------------
+def setpoints_by_indicator(indicators):
+    """
+    Start, stop index of each completed measurement: from a 'Start
+    Measurement' row to the next 'Stop Measurement' row, included. A
+    measurement that left equilibrium is dropped.
+    """
+    blocks = []
+    start = None
+    for k, indicator in enumerate(indicators):
+        if indicator.startswith(b'Start Measurement'):
+            start = k
+        elif indicator.startswith(b'Left Equil'):
+            start = None
+        elif indicator.startswith(b'Stop Measurement') and start is not None:
+            blocks.append((start, k + 1))
+            start = None
+        #end if
+    #end for
+    return blocks
+#end def
+
+#--------------------------------------------------------------------------
+def load(path):
+    """
+    (layout, temp, thickness, rA, rB, setpoints) of a Data.csv, with rA
+    and rB in Ohm and setpoints a list of (start, stop) indexes
+    """
+    header, columns, offset = csv_loader.read_header(path)
+    kind = layout(columns)
+
+    if kind == 'runlog':
+        header, records = csv_loader.load(path)
+        temp = field(records, 'temp (c)')
+        d = field(records, 'thickness (cm)')
+        rA = field(records, 'r_a (mohm)')/1000
+        rB = field(records, 'r_b (mohm)')/1000
+        setpoints = setpoints_by_block(os.path.dirname(path), len(records))
+        if setpoints is None:
+            setpoints = setpoints_by_temperature(temp)
+    elif kind == 'indicator':
+        # v4 runs 'thickness (cm)' into the indicator column name, so the
+        # columns after r_A, r_B are named here
+        names = [c.lower() for c in columns]
+        a = names.index('r_a (mohm)') if 'r_a (mohm)' in names else names.index('r_a')
+        names = ['time (s)', 'temperature (c)'] + ['column %d' % k for k in xrange(2, a)] + ['r_a', 'r_b']
+        if columns[a + 2].lower().startswith('thickness'):
+            names.append('thickness (cm)')
+        names += ['indicator', 'measurement temp']
+        header, records = csv_loader.load(path, names=names, text=['indicator'])
+        temp = records['temperature (c)']
+        rA = records['r_a']
+        rB = records['r_b']
+        if 'thickness (cm)' in names:
+            d = records['thickness (cm)']
+        else:
+            d = np.empty(len(records))
+            d.fill(np.nan)
+        #end if
+        setpoints = setpoints_by_indicator(records['indicator'])
+    else:
+        header, records = csv_loader.load(path)
+        temp = np.empty(len(records))
+        temp.fill(np.nan)
+        d = field(records, 'thickness (cm)')
+        rA = field(records, 'r_a')
+        rB = field(records, 'r_b')
+        setpoints = [(0, len(records))] if len(records) else []
+    #end if
+    return kind, temp, d, rA, rB, setpoints
+#end def
+
+#--------------------------------------------------------------------------
+def summarize(temp, d, rA, rB, setpoints):
+    """
+    One row per setpoint: temp, thickness, rA, rB, sheet resistance and
+    resistivity of the averaged readings, standard error of the resistivity
+    of the single readings, number of readings.
+    """
+    rho = vdp.sheet_resistance(rA, rB)*d # every reading at once
+    summary = []
+    for start, stop in setpoints:
+        n = stop - start
+        if n < 1:
+            continue
+        avg_rA = np.nanmean(rA[start:stop])
+        avg_rB = np.nanmean(rB[start:stop])
+        avg_d = np.nanmean(d[start:stop])
+        rs = vdp.sheet_resistance(avg_rA, avg_rB)
+        stderr = np.nanstd(rho[start:stop])/np.sqrt(max(n - 1, 1))
+        summary.append([float(np.mean(temp[start:stop])), float(avg_d), float(avg_rA), float(avg_rB),
+                        rs, rs*avg_d, float(stderr), n])
+    #end for
+    return summary
+#end def
+
+#--------------------------------------------------------------------------
+def format_row(row):
+    return ','.join(['%.2f' % row[0], '%f' % row[1]] + ['%.9g' % x for x in row[2:7]] + ['%d' % row[7]])
+#end def
+
+#--------------------------------------------------------------------------
+def data_file(folder):
+    for name in DATA_FILES:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    #end for
+    return None
+#end def
+
+#--------------------------------------------------------------------------
+def signature(path):
+    info = os.stat(path)
+    return [CACHE_VERSION, os.path.basename(path), info.st_size, int(info.st_mtime)]
+#end def
+
+#--------------------------------------------------------------------------
+def process_folder(folder):
+    """
+    Reprocess one run folder, writing its Reprocessed.csv. Returns
+    (folder, layout, summary rows, error); runs in the worker processes.
+    """
+    try:
+        kind, temp, d, rA, rB, setpoints = load(data_file(folder))
+        summary = summarize(temp, d, rA, rB, setpoints)
+
+        f = open(os.path.join(folder, OUTPUT_FILE), 'w')
+        f.write(OUTPUT_HEADERS + '\n')
+        for row in summary:
+            f.write(format_row(row) + '\n')
+        #end for
+        f.close()
+        return folder, kind, summary, None
+    except Exception as e:
+        return folder, None, [], '%s: %s' % (type(e).__name__, e)
+    #end try
+#end def
+
+#--------------------------------------------------------------------------
+def find_runs(root):
+    ''' Run folders (with a Data.csv) under root, sorted '''
+    runs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if any(name in filenames for name in DATA_FILES):
+            runs.append(dirpath)
+        dirnames.sort()
+    #end for
+    return sorted(runs)
+#end def
+
+#--------------------------------------------------------------------------
+def load_cache(root):
+    path = os.path.join(root, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        f = open(path)
+        cache = json.load(f)
+        f.close()
+    except ValueError:
+        return {} # unreadable, reprocess everything
+    #end try
+    return cache
+#end def
+
+#--------------------------------------------------------------------------
+def save_cache(root, cache):
+    path = os.path.join(root, CACHE_FILE)
+    f = open(path + '.tmp', 'w')
+    json.dump(cache, f, indent=1, sort_keys=True)
+    f.close()
+    if os.path.exists(path):
+        os.remove(path) # rename does not replace on Windows
+    os.rename(path + '.tmp', path)
+#end def
+
+#--------------------------------------------------------------------------
+def reprocess(root, processes=None, force=False):
+    """
+    Reprocess the run folders under root that changed since the last time
+    and write the summary table of all of them. Returns (processed,
+    skipped, failed) counts.
+    """
+    root = os.path.abspath(root)
+    cache = {} if force else load_cache(root)
+    runs = find_runs(root)
+
+    todo = []
+    for folder in runs:
+        key = os.path.relpath(folder, root)
+        entry = cache.get(key)
+        if entry is None or entry['signature'] != signature(data_file(folder)):
+            todo.append(folder)
+    #end for
+    print '%d run folders, %d to reprocess' % (len(runs), len(todo))
+
+    failed = 0
+    if todo:
+        pool = multiprocessing.Pool(processes)
+        try:
+            for folder, kind, summary, error in pool.imap_unordered(process_folder, todo):
+                key = os.path.relpath(folder, root)
+                if error:
+                    print 'failed: %s (%s)' % (key, error)
+                    cache.pop(key, None)
+                    failed += 1
+                else:
+                    print '%s: %s, %d setpoints' % (key, kind, len(summary))
+                    cache[key] = {'signature': signature(data_file(folder)),
+                                  'layout': kind, 'summary': summary}
+                #end if
+            #end for
+        finally:
+            pool.close()
+            pool.join()
+        #end try
+    #end if
+
+    # folders that are gone drop out of the cache and the table
+    keys = set(os.path.relpath(folder, root) for folder in runs)
+    for key in list(cache.keys()):
+        if key not in keys:
+            del cache[key]
+    #end for
+    save_cache(root, cache)
+
+    f = open(os.path.join(root, SUMMARY_FILE), 'w')
+    f.write(SUMMARY_HEADERS + '\n')
+    for key in sorted(cache):
+        for n, row in enumerate(cache[key]['summary']):
+            f.write('"%s",%s,%d,%s\n' % (key, cache[key]['layout'], n + 1, format_row(row)))
+    #end for
+    f.close()
+
+    return len(todo) - failed, len(runs) - len(todo), failed
+#end def
+
+#==============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reprocess every run folder (with a Data.csv) under a directory.')
+    parser.add_argument('root', help='top of the tree of run folders')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='reprocess folders whose Data.csv has not changed')
+    args = parser.parse_args(argv)
+
+    t0 = time.time()
+    processed, skipped, failed = reprocess(args.root, args.processes, args.force)
+    print '%d reprocessed, %d unchanged, %d failed in %.1f s; summary in %s' % (
+        processed, skipped, failed, time.time() - t0, os.path.join(args.root, SUMMARY_FILE))
+    return 1 if failed else 0
+#end def
+
+if __name__ == '__main__':
+    sys.exit(main())
+#end if
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : bench_hotpaths
+Description:
+    Micro-benchmarks of the code that scales with the size of the data, on
+    synthetic data made here from a fixed seed, so they run offline and give
+    the same inputs every time:
+        - resistivitycalc (vdp.resistivity), one pair per call as the
+          measurement loop calls it, and vdp.sheet_resistance on a batch
+        - the stability fit, RollingRegression as ResistivityGUIv7 runs it
+          and the np.polyfit getStability of v5/v6
+        - the polyfit r-squared helper of InitialCheck
+        - import_Data of the room temperature processing on a 1e6 row file
+        - the draw_plot redraw with 1e5 points (new limits, same limits
+          and the full re-plot of v5/v6)
+        - the csv export of save_files from the run log
+
+    python bench_hotpaths.py                   all of them
+    python bench_hotpaths.py import_data -o before.json
+    python bench_hotpaths.py --scale 0.1       smaller data, quicker
+    python bench_hotpaths.py --compare before.json after.json
+Comments:
+    Every timing is the best and the mean of a few calls; the data is made
+    before and not timed. The polyfit benchmark imports ResistivityGUIv7
+    (wx) with the simulated instruments; it is skipped where wx is missing.
+    The plots are drawn on an Agg canvas of the size of the GUI panels.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import vdp
+import end_header
+from stability import RollingRegression
+from plot_history import PlotHistory
+from live_plot import LivePlot, grow
+from runlog import RunLog
+from bench_sweep import compare, git_revision
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOMTEMP = os.path.join(os.path.dirname(HERE), 'program_roomtemp')
+
+# data sizes, multiplied by --scale
+SIZES = {
+    'vdp_calls': 20000, # resistivitycalc calls
+    'vdp_pairs': 1000000, # pairs of one sheet_resistance call
+    'stability_samples': 100000, # PID samples through the stability fit
+    'iv_points': 100000, # points of the polyfit r-squared fit
+    'import_rows': 1000000, # rows of the room temperature Data.csv
+    'plot_points': 100000, # points in the plot history
+    'run_data': 100000, # Data records of the run log
+    'run_temperature': 500000, # Temperature records of the run log
+}
+
+ORDER = ['resistivitycalc', 'stability', 'polyfit', 'import_data', 'draw_plot', 'save_files']
+
+METRICS = ['best_s', 'mean_s']
+
+#==============================================================================
+# Synthetic data
+
+#--------------------------------------------------------------------------
+def synthetic_pairs(n, seed=0):
+    ''' rA, rB (Ohm) spread over six decades, with ratios up to 100 '''
+    rng = np.random.RandomState(seed)
+    rA = 10**rng.uniform(-3, 3, n)
+    rB = rA*10**rng.uniform(-2, 2, n)
+    return rA, rB
+#end def
+
+#--------------------------------------------------------------------------
+def synthetic_temperatures(n, period=1.0, seed=0, setpoints=(25, 100, 200, 300, 400, 500, 600),
+                           tau=900.0, noise=0.05):
+    """
+    t (s), temp (C) of the PID thermocouple sampled every period seconds
+    through a staircase of setpoints, each approached with time constant tau
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(n)*period
+    step = max(n//len(setpoints), 1)
+    temp = np.empty(n)
+    start = float(setpoints[0])
+    for k in xrange(0, n, step):
+        target = float(setpoints[min(k//step, len(setpoints) - 1)])
+        dt = t[k:k+step] - t[k]
+        temp[k:k+step] = target + (start - target)*np.exp(-dt/tau)
+        start = temp[min(k+step, n) - 1]
+    #end for
+    return t, temp + rng.normal(0, noise, n)
+#end def
+
+#--------------------------------------------------------------------------
+def synthetic_iv(n, resistance=1.0, offset=5e-6, seed=0):
+    ''' I (A), V (V) of a contact check sweep, ohmic with a thermal EMF offset '''
+    rng = np.random.RandomState(seed)
+    current = np.linspace(-0.01, 0.01, n)
+    voltage = resistance*current + offset + rng.normal(0, 20e-9, n)
+    return current, voltage
+#end def
+
+#--------------------------------------------------------------------------
+def write_rt_data(path, n, seed=0, chunk=100000):
+    ''' A Data.csv of RT_ResistivityGUIv1 with n rows '''
+    rng = np.random.RandomState(seed)
+    template = 'End Time: %s \nElapsed Measurement Time: %s Seconds \n \n'
+    f = open(path, 'w')
+    f.write('Start Time: %s\n' % datetime(2026, 1, 1))
+    f.write(end_header.fixed_width(template, (datetime(2026, 1, 2), 86400.0)))
+    f.write('time (s),thickness (cm),t_1234,r_1234,t_3412,r_3412,t_1324,r_1324,t_2413,r_2413,r_A,r_B\n')
+    for start in xrange(0, n, chunk):
+        m = min(chunk, n - start)
+        t = (start + np.arange(m))*10.0
+        rA = 1.0 + rng.normal(0, 1e-4, m)
+        rB = 1.3 + rng.normal(0, 1e-4, m)
+        rows = np.column_stack([t, np.full(m, 0.1),
+                                t + 1, rA, t + 3, rA, t + 5, rB, t + 7, rB, rA, rB])
+        np.savetxt(f, rows, fmt='%.6f', delimiter=',')
+    #end for
+    f.close()
+#end def
+
+#--------------------------------------------------------------------------
+def synthetic_run(folder, n_data, n_temperature, seed=0):
+    ''' A run log with n_data Data and n_temperature Temperature records, closed '''
+    runlog = RunLog(folder, start=datetime(2026, 1, 1))
+    t, temp = synthetic_temperatures(n_temperature, seed=seed)
+    for k in xrange(n_temperature):
+        runlog.append('temperature', t[k], 0.01, temp[k], 600.0, 600.0)
+    #end for
+    rA, rB = synthetic_pairs(n_data, seed)
+    rho = vdp.sheet_resistance(rA, rB)*0.1
+    span = t[-1] if n_temperature else 1.0
+    for k in xrange(n_data):
+        runlog.append('data', span*k/n_data, 300.0, 0.1, rA[k]*1000, rB[k]*1000, rho[k]*1000)
+    #end for
+    runlog.finalize(end=str(datetime(2026, 1, 2)), elapsed=str(span))
+    runlog.close()
+    return runlog
+#end def
+
+#==============================================================================
+# Benchmarks: each returns [(name, n, best (s), mean (s))]
+
+#--------------------------------------------------------------------------
+def timed(function, repeat=3):
+    ''' (best, mean) wall time of repeat calls of function '''
+    times = []
+    for k in xrange(repeat):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    #end for
+    return min(times), sum(times)/len(times)
+#end def
+
+#--------------------------------------------------------------------------
+def bench_resistivitycalc(sizes, work):
+    rA, rB = synthetic_pairs(sizes['vdp_pairs'])
+    m = min(sizes['vdp_calls'], len(rA))
+    def calls():
+        for k in xrange(m):
+            vdp.resistivity([rA[k]], [rB[k]], 0.1)
+    #end def
+    vdp.factor_table() # built once per run, not timed
+    results = [('resistivitycalc, one pair per call', m) + timed(calls)]
+    results.append(('vdp.sheet_resistance, batch', len(rA)) + timed(lambda: vdp.sheet_resistance(rA, rB)))
+    return results
+#end def
+
+#--------------------------------------------------------------------------
+def bench_stability(sizes, work):
+    n = sizes['stability_samples']
+    t, temp = synthetic_temperatures(n)
+    window = 60.0
+
+    def rolling():
+        regression = RollingRegression(window=window)
+        for k in xrange(n):
+            regression.add(t[k], temp[k])
+            if regression.ready():
+                regression.fit()
+        #end for
+    #end def
+
+    # v5/v6: np.polyfit over the samples of the window at every sample
+    m = max(n//10, 1)
+    w = int(window) # samples in the window, one a second
+    def polyfit():
+        for k in xrange(w, w + m):
+            np.polyfit(t[k-w:k], temp[k-w:k], 1)[0]
+    #end def
+    return [('stability, rolling regression', n) + timed(rolling),
+            ('getStability, np.polyfit per sample', m) + timed(polyfit)]
+#end def
+
+#--------------------------------------------------------------------------
+def bench_polyfit(sizes, work):
+    os.environ.setdefault('RESISTIVITY_SIM', '1') # no instruments needed
+    try:
+        import ResistivityGUIv7
+    except ImportError as e:
+        print 'polyfit skipped, ResistivityGUIv7 cannot be imported: %s' % e
+        return []
+    #end try
+    polyfit = ResistivityGUIv7.InitialCheck.__dict__['polyfit'] # self is not used
+    x, y = synthetic_iv(sizes['iv_points'])
+    return [('InitialCheck.polyfit, r-squared', len(x)) + timed(lambda: polyfit(None, x, y, 1))]
+#end def
+
+#--------------------------------------------------------------------------
+def bench_import_data(sizes, work):
+    if ROOMTEMP not in sys.path:
+        sys.path.append(ROOMTEMP)
+    import RT_Resistivity_Processing_v1 as processing
+    n = sizes['import_rows']
+    path = os.path.join(work, 'RT Data.csv')
+    write_rt_data(path, n)
+    return [('import_Data', n) + timed(lambda: processing.import_Data(path))]
+#end def
+
+#--------------------------------------------------------------------------
+def bench_draw_plot(sizes, work):
+    n = sizes['plot_points']
+    t, rho = synthetic_temperatures(n, period=10.0, setpoints=(2.0, 2.5, 3.0, 3.5), noise=0.01)
+    history = PlotHistory()
+    for k in xrange(n):
+        history.append(t[k], rho[k])
+    #end for
+
+    # as ResistivityPanel.init_plot
+    figure = Figure((6, 2), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    subplot = figure.add_subplot(111)
+    subplot.set_ylabel(r"$\rho$ ($m\Omega cm$)", fontsize=8)
+    subplot.set_xlabel("t (s)", fontsize=8)
+    subplot.tick_params(labelsize=8)
+    line, = subplot.plot([], [], color='g', linewidth=1)
+    live = LivePlot(canvas, subplot, [line])
+    ymax = grow(None, history.max, 0.3)
+
+    # as ResistivityPanel.draw_plot, once with the x axis moving every frame
+    growth = [0]
+    def moving():
+        growth[0] += 1
+        xmax = history.last[0] + growth[0]
+        live.update([history.view(0, xmax)], (0, xmax, 0, ymax))
+    #end def
+    xmax = grow(None, history.last[0], 0.2)
+    def still():
+        live.update([history.view(0, xmax)], (0, xmax, 0, ymax))
+    #end def
+
+    # v5/v6: clear the axes and plot every point at every frame
+    legacy = Figure((6, 2), dpi=100)
+    legacy_canvas = FigureCanvasAgg(legacy)
+    legacy_plot = legacy.add_subplot(111)
+    def replot():
+        legacy_plot.clear()
+        legacy_plot.set_ylabel(r"$\rho$ ($m\Omega cm$)", fontsize=8)
+        legacy_plot.set_xlabel("t (s)", fontsize=8)
+        legacy_plot.set_xlim([0, t[-1]])
+        legacy_plot.set_ylim([0, ymax])
+        legacy_plot.plot(t, rho, color='g', linewidth=1)
+        legacy_canvas.draw()
+    #end def
+
+    still() # first draw caches the background
+    return [('draw_plot, new limits', n) + timed(moving, 5),
+            ('draw_plot, same limits', n) + timed(still, 5),
+            ('draw_plot, full re-plot (v5/v6)', n) + timed(replot, 3)]
+#end def
+
+#--------------------------------------------------------------------------
+def bench_save_files(sizes, work):
+    folder = os.path.join(work, 'run')
+    os.makedirs(folder)
+    runlog = synthetic_run(folder, sizes['run_data'], sizes['run_temperature'])
+    return [('save_files, csv export', sizes['run_data'] + sizes['run_temperature'])
+            + timed(runlog.export)]
+#end def
+
+BENCHMARKS = {
+    'resistivitycalc': bench_resistivitycalc,
+    'stability': bench_stability,
+    'polyfit': bench_polyfit,
+    'import_data': bench_import_data,
+    'draw_plot': bench_draw_plot,
+    'save_files': bench_save_files,
+}
+
+#--------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the data size bound code')
+    parser.add_argument('benchmarks', nargs='*', help='among %s, all by default' % ', '.join(ORDER))
+    parser.add_argument('-o', '--output', help='results file (json)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies every data size')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two results files')
+    args = parser.parse_args()
+
+    if args.compare:
+        print compare(args.compare[0], args.compare[1], 'benchmarks', METRICS, [])
+        return
+    #end if
+    names = args.benchmarks or ORDER
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark %s' % name)
+    #end for
+    sizes = dict((key, max(int(n*args.scale), 1)) for key, n in SIZES.items())
+
+    results = {
+        'date': str(datetime.now()),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'benchmarks': {},
+    }
+    print '%-40s %10s %10s %10s %12s' % ('benchmark', 'n', 'best (s)', 'mean (s)', 'per item (us)')
+    work = tempfile.mkdtemp(prefix='bench_hotpaths_')
+    try:
+        for name in names:
+            for label, n, best, mean in BENCHMARKS[name](sizes, work):
+                results['benchmarks'][label] = {'n': n, 'best_s': best, 'mean_s': mean}
+                print '%-40s %10d %10.4f %10.4f %12.3f' % (label, n, best, mean, best/n*1e6)
+            #end for
+        #end for
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    #end try
+
+    if args.output:
+        f = open(args.output, 'w')
+        json.dump(results, f, indent=1, sort_keys=True)
+        f.close()
+        print 'Results written to %s' % args.output
+    #end if
+#end def
+
+#==============================================================================
+if __name__ == '__main__':
+    main()
+#end if
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : bench_sweep
+Description:
+    End-to-end benchmark of a resistivity sweep. Runs the TakeData loop of
+    ResistivityGUIv7 without its window against the simulated instruments
+    (instrument_sim.py) and reports, per scenario:
+        - the wall time of the run and of every setpoint (settling to the
+          setpoint, measuring at it)
+        - the GPIB transactions, Modbus reads and writes, relay actuations
+        - the bytes written to the run folder
+        - the peak memory of the process
+    The results go to a json file; two of them can be compared with
+    --compare to see what a change did.
+
+    python bench_sweep.py                      all scenarios
+    python bench_sweep.py rt_quick stress_100  some of them
+    python bench_sweep.py --sim "gpib_latency=0.01,tau=600" -o before.json
+    python bench_sweep.py --compare before.json after.json
+Comments:
+    Each scenario runs in a process of its own (RESISTIVITY_SIM=1), so the
+    rig counters and the peak memory are those of that run only.
+    The thermal plant runs time_scale times faster than the wall clock, and
+    the settings that follow the plant (stability window, threshold and
+    sampling period, Modbus latency) are scaled with it; the GPIB side
+    (latency, settling of the readings, relays) runs in real time, so the
+    wall time is mostly the measurement code and the bus. Results compare
+    across versions for the same scenario and --sim options.
+    wx is imported with ResistivityGUIv7 and an App is created for the
+    message TakeData sends at the end of a run; no window is opened.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError: # not on Windows
+    resource = None
+#end try
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> measurement temperatures (C), readings per setpoint, plant speed-up
+SCENARIOS = {
+    'rt_quick': dict(description='RT quick check, one setpoint at room temperature',
+                     setpoints=[25], measurement_number=3, time_scale=50.0),
+    'sweep_10': dict(description='10 setpoints from 25 to 600 C',
+                     setpoints=[25, 89, 153, 217, 281, 344, 408, 472, 536, 600],
+                     measurement_number=3, time_scale=100.0),
+    'stress_100': dict(description='100 repeats at room temperature',
+                       setpoints=[25], measurement_number=100, time_scale=50.0),
+}
+ORDER = ['rt_quick', 'sweep_10', 'stress_100']
+
+# reported by --compare, lower is better
+METRICS = ['wall_s', 'mean_setpoint_s', 'gpib_transactions', 'modbus_reads',
+           'bytes_written', 'peak_rss_kb']
+
+#--------------------------------------------------------------------------
+def peak_rss():
+    ''' (kB) high water mark of the resident memory of this process '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024 # bytes there, kB on linux
+    return rss
+#end def
+
+#--------------------------------------------------------------------------
+def sim_options(scenario, extra=''):
+    ''' RESISTIVITY_SIM_OPTIONS of a scenario, extra (key=value,...) last '''
+    scale = scenario['time_scale']
+    options = ['time_scale=%g' % scale, 'modbus_latency=%g' % (0.03/scale), 'seed=1']
+    if extra:
+        options.append(extra)
+    return ','.join(options)
+#end def
+
+#--------------------------------------------------------------------------
+def folder_sizes(folder, skip=('Console.log',)):
+    ''' {path relative to folder: bytes} of every file of a run folder '''
+    sizes = {}
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name in skip:
+                continue
+            path = os.path.join(root, name)
+            sizes[os.path.relpath(path, folder)] = os.path.getsize(path)
+        #end for
+    #end for
+    return sizes
+#end def
+
+#--------------------------------------------------------------------------
+def per_setpoint(marks):
+    """
+    Rows per completed setpoint from the marks of a run, (kind, setpoint,
+    time, rig counters) with kind begin, end or checkpoint: the wall time
+    from the previous checkpoint, the part spent measuring and the bus
+    transactions.
+    """
+    rows = []
+    last = begin = end = None
+    for kind, setpoint, t, stats in marks:
+        if kind == 'begin':
+            begin = (setpoint, t)
+        elif kind == 'end':
+            end = t
+        elif kind == 'checkpoint':
+            if last is not None and begin is not None and end is not None:
+                measure = end - begin[1]
+                rows.append({
+                    'setpoint': begin[0],
+                    'wall_s': round(t - last[0], 3),
+                    'settle_s': round(begin[1] - last[0], 3),
+                    'measure_s': round(measure, 3),
+                    'gpib_transactions': (stats['gpib_writes'] + stats['gpib_queries']
+                                          - last[1]['gpib_writes'] - last[1]['gpib_queries']),
+                    'modbus_reads': stats['modbus_reads'] - last[1]['modbus_reads'],
+                })
+            #end if
+            last = (t, stats)
+            begin = end = None
+        #end if
+    #end for
+    return rows
+#end def
+
+#--------------------------------------------------------------------------
+def run_scenario(name, folder, timing=False):
+    """
+    One scenario in this process, the run folder in folder; the simulated
+    instruments must be enabled (RESISTIVITY_SIM=1) before the call.
+    """
+    scenario = SCENARIOS[name]
+    scale = scenario['time_scale']
+    sys.path.insert(0, HERE)
+    import instrument_sim
+    import ResistivityGUIv7 as gui
+    from runlog import RunLog
+    if not instrument_sim.ENABLED:
+        raise RuntimeError('RESISTIVITY_SIM=1 is needed, the benchmark drives the simulated rig')
+    app = gui.wx.App(False) # for the wx.CallAfter at the end of TakeData
+    baseline = peak_rss()
+    rig = instrument_sim.default_rig()
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    os.chdir(folder)
+    gui.setup_logging_to_file('error_log.log')
+
+    # what the GUI sets before starting a run, the plant side scaled
+    gui.Setup()
+    gui.measureList = list(scenario['setpoints'])
+    gui.measurement_number = scenario['measurement_number']
+    gui.maxLimit = max(gui.measureList) + 100
+    gui.stability_window = 60.0/scale
+    gui.stability_threshold = 0.1/60*scale
+    gui.temp_sample_period = 1.0/scale
+    gui.timing_enabled = timing
+    gui.abort_ID = 0
+    gui.runlog = RunLog('.', start=datetime.now())
+
+    marks = []
+    def mark(kind, setpoint):
+        with rig.lock:
+            stats = dict(rig.stats)
+        marks.append((kind, setpoint, time.time(), stats))
+    #end def
+
+    ###########################################################################
+    class BenchTakeData(gui.TakeData):
+        ''' TakeData marking the setpoints and the measurement blocks '''
+        #----------------------------------------------------------------------
+        def begin_block(self):
+            mark('begin', self.measurementtemp)
+            gui.TakeData.begin_block(self)
+        #end def
+
+        #----------------------------------------------------------------------
+        def end_block(self, status):
+            gui.TakeData.end_block(self, status)
+            mark('end', self.measurementtemp)
+        #end def
+
+        #----------------------------------------------------------------------
+        def save_checkpoint(self, finished=False):
+            gui.TakeData.save_checkpoint(self, finished)
+            if not finished:
+                mark('checkpoint', self.measurementtemp)
+        #end def
+
+    #end class
+    ###########################################################################
+
+    console = open('Console.log', 'w') # the prints of the run
+    stdout = sys.stdout
+    sys.stdout = console
+    try:
+        t0 = time.time()
+        td = BenchTakeData()
+        wall = time.time() - t0
+    finally:
+        sys.stdout = stdout
+        console.close()
+    #end try
+
+    stats = dict(rig.stats)
+    sizes = folder_sizes('.')
+    rows = per_setpoint(marks)
+    result = {
+        'description': scenario['description'],
+        'setpoints': scenario['setpoints'],
+        'measurement_number': scenario['measurement_number'],
+        'sim_options': os.environ.get('RESISTIVITY_SIM_OPTIONS', ''),
+        'error': bool(td.exception_ID),
+        'completed': td.Tnum,
+        'wall_s': round(wall, 3),
+        'mean_setpoint_s': round(sum(r['wall_s'] for r in rows)/len(rows), 3) if rows else None,
+        'gpib_transactions': stats['gpib_writes'] + stats['gpib_queries'],
+        'gpib_saved_by_batching': td.k2700.ctrl.saved() + td.k2400.ctrl.saved() + td.k2182.ctrl.saved(),
+        'temperature_samples': td.sampler.count,
+        'bytes_written': sum(sizes.values()),
+        'files': sizes,
+        'baseline_rss_kb': baseline,
+        'peak_rss_kb': peak_rss(),
+        'per_setpoint': rows,
+    }
+    result.update(stats) # gpib_writes, gpib_queries, modbus_reads, ...
+    return result
+#end def
+
+#--------------------------------------------------------------------------
+def spawn(name, folder, extra='', timing=False):
+    ''' Result of a scenario run in a process of its own '''
+    env = dict(os.environ)
+    env['RESISTIVITY_SIM'] = '1'
+    env['RESISTIVITY_SIM_OPTIONS'] = sim_options(SCENARIOS[name], extra)
+    handle, path = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    command = [sys.executable, os.path.abspath(__file__), '--child', name,
+               '--runs', folder, '--result', path]
+    if timing:
+        command.append('--timing')
+    try:
+        if subprocess.call(command, env=env) != 0:
+            raise RuntimeError('scenario %s failed, see %s' % (name, folder))
+        f = open(path)
+        result = json.load(f)
+        f.close()
+    finally:
+        os.remove(path)
+    #end try
+    return result
+#end def
+
+#--------------------------------------------------------------------------
+def describe(name, result):
+    lines = ['%s: %s%s' % (name, result['description'], ' (ERROR, see error_log.log)' if result['error'] else '')]
+    lines.append('  wall %.1f s, %d GPIB transactions (%d saved by batching), %d Modbus reads, '
+                 '%d bytes written, peak %s kB' % (
+                     result['wall_s'], result['gpib_transactions'], result['gpib_saved_by_batching'],
+                     result['modbus_reads'], result['bytes_written'], result['peak_rss_kb']))
+    for row in result['per_setpoint']:
+        lines.append('  %6.1f C  %8.2f s (settle %.2f s, measure %.2f s)  %5d GPIB  %5d Modbus' % (
+            row['setpoint'], row['wall_s'], row['settle_s'], row['measure_s'],
+            row['gpib_transactions'], row['modbus_reads']))
+    #end for
+    return '\n'.join(lines)
+#end def
+
+#--------------------------------------------------------------------------
+def compare(old_path, new_path, section='scenarios', metrics=METRICS, order=ORDER):
+    ''' Table of the metrics of two result files, new/old per entry of section '''
+    results = []
+    for path in (old_path, new_path):
+        f = open(path)
+        results.append(json.load(f))
+        f.close()
+    #end for
+    old, new = [r[section] for r in results]
+    width = max([12] + [len(n) for n in old])
+    lines = ['%-*s %-22s %14s %14s %8s' % (width, 'name', 'metric', 'old', 'new', 'new/old')]
+    for name in [n for n in order if n in old and n in new] + sorted(
+            n for n in old if n in new and n not in order):
+        for metric in metrics:
+            a, b = old[name].get(metric), new[name].get(metric)
+            if a is None or b is None:
+                continue
+            ratio = '%8.3f' % (float(b)/a) if a else '%8s' % '-'
+            lines.append('%-*s %-22s %14.6g %14.6g %s' % (width, name, metric, a, b, ratio))
+        #end for
+    #end for
+    return '\n'.join(lines)
+#end def
+
+#--------------------------------------------------------------------------
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    #end try
+#end def
+
+#--------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end sweep benchmark on the simulated rig')
+    parser.add_argument('scenarios', nargs='*', help='among %s, all by default' % ', '.join(ORDER))
+    parser.add_argument('-o', '--output', help='results file (json)')
+    parser.add_argument('--sim', default='', help='extra simulator options, key=value,...')
+    parser.add_argument('--runs', help='keep the run folders here')
+    parser.add_argument('--timing', action='store_true', help='time the loop phases as well (timing.py)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two results files')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        print compare(*args.compare)
+        return
+    #end if
+    if args.child:
+        result = run_scenario(args.child, args.runs, args.timing)
+        f = open(args.result, 'w')
+        json.dump(result, f)
+        f.close()
+        return
+    #end if
+
+    names = args.scenarios or ORDER
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error('unknown scenario %s' % name)
+    #end for
+    runs = args.runs or tempfile.mkdtemp(prefix='bench_sweep_')
+    output = args.output or 'bench_sweep %s.json' % datetime.now().strftime('%Y-%m-%d %H.%M.%S')
+
+    results = {
+        'date': str(datetime.now()),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sim': args.sim,
+        'scenarios': {},
+    }
+    try:
+        for name in names:
+            print 'Running %s ...' % name
+            result = spawn(name, os.path.join(os.path.abspath(runs), name), args.sim, args.timing)
+            results['scenarios'][name] = result
+            print describe(name, result)
+        #end for
+    finally:
+        if not args.runs:
+            shutil.rmtree(runs, ignore_errors=True)
+    #end try
+
+    f = open(output, 'w')
+    json.dump(results, f, indent=1, sort_keys=True)
+    f.close()
+    print 'Results written to %s' % output
+#end def
+
+#==============================================================================
+if __name__ == '__main__':
+    main()
+#end if
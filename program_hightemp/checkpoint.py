@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : checkpoint
+Description:
+    Durable checkpoint of a high temperature sweep, written to the run folder
+    after each completed setpoint: the setpoints left, the calc lists, the
+    run log offsets and the measurement settings. A run that died can be
+    resumed from it instead of starting again from room temperature.
+Comments:
+    The file is written to a temporary name, synced and renamed over the old
+    one, so a crash while saving leaves the previous checkpoint intact.
+"""
+import json
+import os
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+#--------------------------------------------------------------------------
+def save(state, folder='.'):
+    path = os.path.join(folder, CHECKPOINT_FILE)
+    tmp = path + '.tmp'
+    f = open(tmp, 'w')
+    json.dump(state, f, indent=1, sort_keys=True)
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    if os.path.exists(path) and os.name == 'nt':
+        os.remove(path) # rename does not replace on Windows
+    os.rename(tmp, path)
+#end def
+
+#--------------------------------------------------------------------------
+def load(folder='.'):
+    ''' The checkpoint of a run folder, None if there is none '''
+    path = os.path.join(folder, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    f = open(path)
+    state = json.load(f)
+    f.close()
+    return state
+#end def
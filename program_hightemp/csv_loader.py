@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : csv_loader
+Description:
+    Loader for the csv files of the GUIs (Data, Status, Temperature,
+    Resistivity). The header block is found from the file itself: the data
+    starts at the first line that begins with a number, the column names are
+    the line before it and anything above is kept as header lines (start
+    time, end time, ...). Columns come back by name, as a numpy structured
+    array, like runlog.read.
+Comments:
+    The file is memory-mapped and parsed in chunks of whole lines. A chunk
+    that is all numbers is parsed in one np.fromstring call; a chunk with
+    anything else ('-' for a missing value, text columns, short rows) is
+    parsed line by line, with nan for what is not a number. The result is
+    allocated once from a count of the lines, so the peak memory is the
+    result plus one chunk.
+"""
+import mmap
+import os
+import warnings
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 24 # (bytes) parsed at a time
+HEAD_SIZE = 1 << 16 # (bytes) searched for the header block
+TEXT_WIDTH = 32 # characters kept of a text column
+
+#--------------------------------------------------------------------------
+def is_number(field):
+    try:
+        float(field)
+    except ValueError:
+        return False
+    return True
+#end def
+
+#--------------------------------------------------------------------------
+def split_line(line):
+    return [field.strip() for field in line.rstrip(b'\r\n').split(b',')]
+#end def
+
+#--------------------------------------------------------------------------
+def text_line(line):
+    ''' Header text as str, the file is read as bytes '''
+    line = line.rstrip(b'\r\n')
+    if isinstance(line, str):
+        return line
+    return line.decode('latin-1')
+#end def
+
+#--------------------------------------------------------------------------
+def read_header(path):
+    """
+    (header lines, column names, offset of the first data line). With no
+    data lines the column names are the last line of the file.
+    """
+    f = open(path, 'rb')
+    head = f.read(HEAD_SIZE)
+    f.close()
+
+    lines = head.splitlines(True)
+    if len(head) == HEAD_SIZE and lines:
+        lines = lines[:-1] # may be cut
+    offset = 0
+    previous = None # (index, offset) of the last non blank line
+    for k, line in enumerate(lines):
+        if is_number(split_line(line)[0]):
+            if previous is None:
+                raise ValueError('%s: no column names before the data' % path)
+            header = [text_line(l) for l in lines[:previous[0]]]
+            return header, [text_line(c) for c in split_line(lines[previous[0]])], offset
+        #end if
+        if line.strip():
+            previous = (k, offset)
+        offset += len(line)
+    #end for
+    if previous is None:
+        raise ValueError('%s: empty file' % path)
+    header = [text_line(l) for l in lines[:previous[0]]]
+    return header, [text_line(c) for c in split_line(lines[previous[0]])], offset
+#end def
+
+#--------------------------------------------------------------------------
+def record_dtype(names, text=()):
+    return np.dtype([(str(name), 'S%d' % TEXT_WIDTH if name in text else '<f8') for name in names])
+#end def
+
+#--------------------------------------------------------------------------
+def parse_lines(buf, dtype):
+    ''' Records of a chunk, one line at a time; nan for what is not a number '''
+    names = dtype.names
+    lines = [line for line in buf.splitlines() if line.strip()]
+    records = np.zeros(len(lines), dtype)
+    for name in names:
+        if records[name].dtype.kind == 'f':
+            records[name] = np.nan
+    #end for
+    numeric = [records[name].dtype.kind == 'f' for name in names]
+    for i, line in enumerate(lines):
+        fields = split_line(line)
+        row = records[i]
+        for k in xrange(min(len(fields), len(names))):
+            if numeric[k]:
+                try:
+                    row[k] = float(fields[k])
+                except ValueError:
+                    pass # nan
+            else:
+                row[k] = fields[k]
+            #end if
+        #end for
+    #end for
+    return records
+#end def
+
+#--------------------------------------------------------------------------
+def parse_chunk(buf, dtype):
+    """
+    Records of a chunk of whole lines: vectorized when every field is a
+    number, line by line otherwise
+    """
+    ncols = len(dtype.names)
+    body = buf.replace(b'\r', b'').rstrip(b'\n')
+    nlines = body.count(b'\n') + 1
+    if all(dtype[k].kind == 'f' for k in xrange(ncols)):
+        text = body.replace(b'\n', b',')
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore') # a short parse is caught below
+                values = np.fromstring(text, dtype=float, sep=',')
+            #end with
+        except ValueError: # newer numpy raises on a short parse
+            values = ()
+        #end try
+        if len(values) == nlines*ncols:
+            return values.reshape(nlines, ncols).view(dtype).ravel()
+    #end if
+    return parse_lines(buf, dtype)
+#end def
+
+#--------------------------------------------------------------------------
+def chunks(mm, start, size, chunk_size=CHUNK_SIZE):
+    ''' (start, stop) offsets of chunks of whole lines '''
+    while start < size:
+        stop = start + chunk_size
+        if stop >= size:
+            stop = size
+        else:
+            cut = mm.rfind(b'\n', start, stop)
+            if cut < 0: # a line longer than a chunk
+                cut = mm.find(b'\n', stop)
+                if cut < 0:
+                    cut = size - 1
+            #end if
+            stop = cut + 1
+        #end if
+        yield start, stop
+        start = stop
+    #end while
+#end def
+
+#--------------------------------------------------------------------------
+def iterate(path, names=None, text=(), chunk_size=CHUNK_SIZE):
+    """
+    Records of the file chunk by chunk, for files too large to load whole.
+    names replaces the column names of the file (same order), text are
+    the columns kept as strings.
+    """
+    header, columns, offset = read_header(path)
+    dtype = record_dtype(names or columns, text)
+    size = os.path.getsize(path)
+    if offset >= size:
+        return
+    f = open(path, 'rb')
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        for start, stop in chunks(mm, offset, size, chunk_size):
+            yield parse_chunk(mm[start:stop], dtype)
+    finally:
+        mm.close()
+        f.close()
+    #end try
+#end def
+
+#--------------------------------------------------------------------------
+def load(path, names=None, text=(), chunk_size=CHUNK_SIZE):
+    """
+    (header lines, records) of a csv file, records a structured array with
+    one field per column. names replaces the column names of the file
+    (same order), text are the columns kept as strings.
+    """
+    header, columns, offset = read_header(path)
+    dtype = record_dtype(names or columns, text)
+    size = os.path.getsize(path)
+    if offset >= size:
+        return header, np.zeros(0, dtype)
+
+    f = open(path, 'rb')
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        # one pass to count the lines, so the records are allocated once
+        spans = list(chunks(mm, offset, size, chunk_size))
+        nlines = sum(mm[start:stop].count(b'\n') for start, stop in spans)
+        if mm[size-1:size] != b'\n':
+            nlines += 1
+        records = np.zeros(nlines, dtype)
+        n = 0
+        for start, stop in spans:
+            block = parse_chunk(mm[start:stop], dtype)
+            records[n:n+len(block)] = block
+            n += len(block)
+        #end for
+    finally:
+        mm.close()
+        f.close()
+    #end try
+    return header, records[:n]
+#end def
+
+#--------------------------------------------------------------------------
+def columns(path, *names, **options):
+    ''' The named columns of a csv file as arrays, in the order asked '''
+    header, records = load(path, **options)
+    return [records[name] for name in names]
+#end def
@@ -0,0 +1,548 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : instrument_trace
+Description:
+    Record and replay of the instrument traffic. Recording wraps the visa
+    and omegacn7500 modules a program uses (real or simulated) and writes
+    every call on the bus to a trace file: the SCPI writes, queries and
+    reads of the Keithleys and every register (or bit) access of the
+    CN7500, with its time, its duration, its response or the error it
+    raised. Replaying stands in for the drivers and serves the recorded
+    responses back, so a run from the rig (a field failure, a slow run)
+    can be played again offline, at full speed or at the recorded pace.
+
+        RESISTIVITY_RECORD=run.trace.gz python ResistivityGUIv7.py
+        RESISTIVITY_REPLAY=run.trace.gz python ResistivityGUIv7.py
+        RESISTIVITY_REPLAY=run.trace.gz RESISTIVITY_REPLAY_SPEED=1 python ...
+
+    python instrument_trace.py run.trace.gz summarizes a trace (--dump
+    lists the events).
+Comments:
+    RESISTIVITY_RECORD=1 names the trace after the start time, in the
+    directory the program starts from. The trace is gzip compressed json,
+    one event per line, flushed every second so the trace of a program
+    that dies is readable up to about its last second:
+        [time (s), duration (s), device, call, arguments, response(, error)]
+    Devices are the GPIB addresses and port:address for the CN7500. The
+    CN7500 is recorded at the level of the driver call the program made
+    (get_pv, set_setpoint, write_register, ...), one entry per call.
+    Times come from a monotonic clock where there is one (time.time()
+    otherwise, kept non-decreasing).
+
+    Replay matches the calls of each device in order: a call gets the
+    first event not yet played with the same call and arguments, so the
+    temperature sampler and the measurement loop may interleave on the
+    CN7500 differently than they did, and may poll it more or less often.
+    A call the trace has run out of gets the last response recorded for
+    it; a call never recorded raises ReplayMismatch. Recorded errors are
+    raised again (VisaIOError, IOError, ValueError).
+    RESISTIVITY_REPLAY_SPEED=0 (default) answers at once, 1 takes the
+    recorded time of each transaction, 2 half of it, ...
+"""
+import atexit
+import collections
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+import types
+import zlib
+from datetime import datetime
+
+#==============================================================================
+RECORD = os.environ.get('RESISTIVITY_RECORD', '')
+REPLAY = os.environ.get('RESISTIVITY_REPLAY', '')
+REPLAY_SPEED = float(os.environ.get('RESISTIVITY_REPLAY_SPEED', '') or 0)
+
+FORMAT = 'instrument trace'
+VERSION = 1
+FLUSH_INTERVAL = 1.0 # (s) between flushes of the trace file
+
+clock = getattr(time, 'monotonic', time.time)
+
+###############################################################################
+class VisaIOError(IOError):
+    ''' A recorded VISA error raised again, stands in for visa.VisaIOError '''
+    pass
+#end class
+###############################################################################
+
+###############################################################################
+class ReplayMismatch(RuntimeError):
+    ''' The program made a call that is not in the trace, never retried as an IOError '''
+    pass
+#end class
+###############################################################################
+
+# recorded error class name -> raised on replay; anything else is an IOError
+ERRORS = {'VisaIOError': VisaIOError, 'IOError': IOError, 'OSError': IOError,
+          'ValueError': ValueError, 'TypeError': TypeError}
+
+#--------------------------------------------------------------------------
+def encode(value):
+    ''' json for what json does not know: numpy scalars, anything else as text '''
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+#end def
+
+#--------------------------------------------------------------------------
+def dumps(value):
+    return json.dumps(value, default=encode, separators=(',', ':'), sort_keys=True)
+#end def
+
+#--------------------------------------------------------------------------
+def parameters(args, kwargs):
+    ''' Arguments of a call as recorded: the positional ones, then the keywords '''
+    params = list(args)
+    if kwargs:
+        params.append(kwargs)
+    return params
+#end def
+
+###############################################################################
+class TraceWriter:
+    ''' Appends the events of a run to a trace file, from any thread '''
+    #--------------------------------------------------------------------------
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'wb')
+        self.lock = threading.Lock()
+        self.start = clock()
+        self.last = 0.0 # latest event time, times never go back
+        self.last_flush = self.start
+        self.events = 0
+        self.write_line({'format': FORMAT, 'version': VERSION, 'date': str(datetime.now()),
+                         'program': os.path.basename(sys.argv[0])})
+        atexit.register(self.close)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def write_line(self, value):
+        self.file.write((dumps(value) + '\n').encode('utf-8'))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def record(self, start, duration, device, call, params, response, error=None):
+        ''' One call that started at start (clock()) '''
+        with self.lock:
+            if self.file.closed:
+                return
+            t = max(start - self.start, self.last)
+            self.last = t
+            event = [round(t, 6), round(duration, 6), device, call, params, response]
+            if error:
+                event.append(error)
+            self.write_line(event)
+            self.events += 1
+            now = clock()
+            if now - self.last_flush > FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush = now
+            #end if
+        #end with
+    #end def
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.close()
+        #end with
+        print 'Instrument trace: %d calls recorded in %s' % (self.events, self.path)
+    #end def
+
+#end class
+###############################################################################
+
+#==============================================================================
+# Recording
+
+_writer = None
+_local = threading.local() # calls in progress on this thread
+
+#--------------------------------------------------------------------------
+def writer():
+    ''' The trace of this program, opened on first use '''
+    global _writer
+    if _writer is None:
+        path = RECORD
+        if path == '1':
+            path = 'Instrument Trace %s.trace.gz' % datetime.now().strftime('%Y-%m-%d %H.%M.%S')
+        _writer = TraceWriter(path)
+    #end if
+    return _writer
+#end def
+
+#--------------------------------------------------------------------------
+def recorded_call(device, call, function, args, kwargs):
+    """
+    function(*args, **kwargs), recorded as call on device. Calls made from
+    inside it (get_pv reading a register) are not recorded again.
+    """
+    if getattr(_local, 'busy', False):
+        return function(*args, **kwargs)
+    trace = writer()
+    _local.busy = True
+    start = clock()
+    try:
+        response = function(*args, **kwargs)
+    except Exception as e:
+        _local.busy = False
+        trace.record(start, clock() - start, device, call, parameters(args, kwargs), None,
+                     [e.__class__.__name__, str(e)])
+        raise
+    #end try
+    _local.busy = False
+    trace.record(start, clock() - start, device, call, parameters(args, kwargs), response)
+    return response
+#end def
+
+###############################################################################
+class RecordingResource:
+    ''' A VISA resource with every method call recorded '''
+    #--------------------------------------------------------------------------
+    def __init__(self, resource, device):
+        self.__dict__['_resource'] = resource
+        self.__dict__['_device'] = device
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        attr = getattr(self._resource, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+        def call(*args, **kwargs):
+            return recorded_call(self._device, name, attr, args, kwargs)
+        return call
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __setattr__(self, name, value):
+        setattr(self._resource, name, value) # timeout, ... of the resource
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class RecordingResourceManager:
+    ''' A VISA resource manager handing out recording resources '''
+    #--------------------------------------------------------------------------
+    def __init__(self, manager):
+        self.manager = manager
+    #end init
+
+    #--------------------------------------------------------------------------
+    def open_resource(self, address, **kwargs):
+        resource = recorded_call(address, 'open_resource', self.manager.open_resource, (address,), kwargs)
+        return RecordingResource(resource, address)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def list_resources(self, *args):
+        return recorded_call('visa', 'list_resources', self.manager.list_resources, args, {})
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+    #end def
+
+#end class
+###############################################################################
+
+#--------------------------------------------------------------------------
+def record_visa(visa):
+    ''' visa, recording its traffic when RESISTIVITY_RECORD is set '''
+    if not RECORD:
+        return visa
+    module = types.ModuleType('visa')
+    module.__dict__.update(visa.__dict__)
+    module.ResourceManager = lambda *args, **kwargs: RecordingResourceManager(
+        visa.ResourceManager(*args, **kwargs))
+    return module
+#end def
+
+#--------------------------------------------------------------------------
+def recorded_method(name, function):
+    def method(self, *args, **kwargs):
+        return recorded_call(self._trace_device, name, lambda *a, **k: function(self, *a, **k), args, kwargs)
+    #end def
+    method.__name__ = name
+    return method
+#end def
+
+#--------------------------------------------------------------------------
+def record_cn7500(omegacn7500):
+    ''' omegacn7500, recording every driver call when RESISTIVITY_RECORD is set '''
+    if not RECORD:
+        return omegacn7500
+    base = omegacn7500.OmegaCN7500
+
+    ###########################################################################
+    class RecordingCN7500(base):
+        ''' The CN7500 driver with its public methods recorded '''
+        #----------------------------------------------------------------------
+        def __init__(self, portname, slaveaddress, *args, **kwargs):
+            self._trace_device = '%s:%s' % (portname, slaveaddress)
+            base.__init__(self, portname, slaveaddress, *args, **kwargs)
+        #end init
+
+    #end class
+    ###########################################################################
+
+    for name in dir(base):
+        attr = getattr(base, name)
+        if not name.startswith('_') and callable(attr):
+            setattr(RecordingCN7500, name, recorded_method(name, attr))
+    #end for
+    module = types.ModuleType('omegacn7500')
+    module.__dict__.update(omegacn7500.__dict__)
+    module.OmegaCN7500 = RecordingCN7500
+    return module
+#end def
+
+#==============================================================================
+# Replay
+
+#--------------------------------------------------------------------------
+def read(path):
+    """
+    (header, events) of a trace file. A file cut short (the program died
+    while recording) gives the events up to the cut.
+    """
+    f = gzip.open(path, 'rb')
+    header = None
+    events = []
+    try:
+        for line in f:
+            value = json.loads(line.decode('utf-8'))
+            if header is None:
+                if not isinstance(value, dict) or value.get('format') != FORMAT:
+                    raise IOError('%s is not an instrument trace' % path)
+                header = value
+            else:
+                events.append(value)
+            #end if
+        #end for
+    except (EOFError, zlib.error, ValueError):
+        pass # cut short: a partial line or a partial gzip block
+    except IOError as e:
+        if header is None or 'CRC' not in str(e):
+            raise
+    finally:
+        f.close()
+    #end try
+    if header is None:
+        raise IOError('%s is empty' % path)
+    return header, events
+#end def
+
+###############################################################################
+class Trace:
+    ''' Recorded responses, served per device in order '''
+    #--------------------------------------------------------------------------
+    def __init__(self, path, speed=0.0):
+        self.path = path
+        self.speed = speed
+        self.header, events = read(path)
+        self.queues = collections.defaultdict(list) # device -> [duration, call, key, response, error]
+        for event in events:
+            t, duration, device, call, params, response = event[:6]
+            error = event[6] if len(event) > 6 else None
+            self.queues[device].append([duration, call, dumps(params), response, error])
+        #end for
+        self.used = dict((device, [False]*len(q)) for device, q in self.queues.items())
+        self.next = dict((device, 0) for device in self.queues) # first event not played
+        self.last = {} # (device, call, key) -> the latest event played
+        self.lock = threading.Lock()
+        self.matched = 0
+        self.repeated = 0
+        atexit.register(self.report)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def find(self, device, call, key):
+        ''' The next event for this call in the queue of device, None if there is none '''
+        queue = self.queues.get(device, [])
+        used = self.used.get(device, [])
+        i = self.next.get(device, 0)
+        for j in xrange(i, len(queue)):
+            event = queue[j]
+            if not used[j] and event[1] == call and event[2] == key:
+                used[j] = True
+                while i < len(queue) and used[i]:
+                    i += 1
+                self.next[device] = i
+                self.last[(device, call, key)] = event
+                self.matched += 1
+                return event
+            #end if
+        #end for
+        event = self.last.get((device, call, key))
+        if event is not None:
+            self.repeated += 1
+        return event
+    #end def
+
+    #--------------------------------------------------------------------------
+    def serve(self, device, call, args, kwargs):
+        ''' The recorded response of a call, or its recorded error raised '''
+        key = dumps(parameters(args, kwargs))
+        with self.lock:
+            event = self.find(device, call, key)
+        #end with
+        if event is None:
+            raise ReplayMismatch('%s %s(%s) is not in the trace %s' % (device, call, key[1:-1], self.path))
+        duration, call, key, response, error = event
+        if self.speed > 0:
+            time.sleep(duration/self.speed)
+        if error:
+            raise ERRORS.get(error[0], IOError)(error[1])
+        return response
+    #end def
+
+    #--------------------------------------------------------------------------
+    def report(self):
+        left = sum(len(u) - sum(u) for u in self.used.values())
+        print 'Instrument replay: %d calls played, %d repeated past the trace, %d recorded not played' % (
+            self.matched, self.repeated, left)
+    #end def
+
+#end class
+###############################################################################
+
+_trace = None
+
+#--------------------------------------------------------------------------
+def trace():
+    ''' The trace replayed by this program, read on first use '''
+    global _trace
+    if _trace is None:
+        _trace = Trace(REPLAY, REPLAY_SPEED)
+    return _trace
+#end def
+
+###############################################################################
+class ReplayResource:
+    ''' A VISA resource answering from the trace '''
+    #--------------------------------------------------------------------------
+    def __init__(self, address):
+        self.resource_name = address
+        self.timeout = 2000
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def call(*args, **kwargs):
+            return trace().serve(self.resource_name, name, args, kwargs)
+        return call
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class ReplayResourceManager:
+    ''' Stand-in for visa.ResourceManager '''
+    #--------------------------------------------------------------------------
+    def __init__(self, *args, **kwargs):
+        trace() # fail at once on a missing trace
+    #end init
+
+    #--------------------------------------------------------------------------
+    def open_resource(self, address, **kwargs):
+        trace().serve(address, 'open_resource', (address,), kwargs)
+        return ReplayResource(address)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def list_resources(self, *args):
+        return tuple(trace().serve('visa', 'list_resources', args, {}))
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class ReplayCN7500:
+    ''' Stand-in for omegacn7500.OmegaCN7500, answering every call from the trace '''
+    #--------------------------------------------------------------------------
+    def __init__(self, portname, slaveaddress):
+        self._device = '%s:%s' % (portname, slaveaddress)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def call(*args, **kwargs):
+            return trace().serve(self._device, name, args, kwargs)
+        return call
+    #end def
+
+#end class
+###############################################################################
+
+# Module stand-ins, used as:  visa = instrument_trace.visa
+visa = types.ModuleType('visa')
+visa.ResourceManager = ReplayResourceManager
+visa.VisaIOError = VisaIOError
+
+minimalmodbus = types.ModuleType('minimalmodbus')
+minimalmodbus.CLOSE_PORT_AFTER_EACH_CALL = True
+
+omegacn7500 = types.ModuleType('omegacn7500')
+omegacn7500.OmegaCN7500 = ReplayCN7500
+
+#==============================================================================
+def summary(path):
+    ''' Calls, errors and bus time per device and call of a trace '''
+    header, events = read(path)
+    stats = collections.OrderedDict() # (device, call) -> [count, errors, time]
+    for event in events:
+        s = stats.setdefault((event[2], event[3]), [0, 0, 0.0])
+        s[0] += 1
+        s[1] += len(event) > 6
+        s[2] += event[1]
+    #end for
+    span = events[-1][0] + events[-1][1] if events else 0.0
+    lines = ['%s, recorded %s by %s: %d calls over %.1f s' % (
+        path, header.get('date', '?'), header.get('program', '?'), len(events), span)]
+    lines.append('%-24s %-20s %8s %8s %10s' % ('device', 'call', 'count', 'errors', 'time (s)'))
+    for (device, call), (count, errors, total) in sorted(stats.items()):
+        lines.append('%-24s %-20s %8d %8d %10.3f' % (device, call, count, errors, total))
+    #end for
+    return '\n'.join(lines)
+#end def
+
+#--------------------------------------------------------------------------
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Summarize an instrument trace')
+    parser.add_argument('trace')
+    parser.add_argument('--dump', action='store_true', help='list every event')
+    args = parser.parse_args()
+    if args.dump:
+        header, events = read(args.trace)
+        for event in events:
+            print dumps(event)
+        #end for
+    else:
+        print summary(args.trace)
+    #end if
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : live_plot
+Description:
+    Blitted live plot for the GUI panels. The lines are created once and
+    updated with set_data; the axes (frame, ticks, labels) are drawn into a
+    cached background that is only redrawn when the axis limits change, so
+    a refresh restores the background, draws the lines and blits the axes
+    area instead of clearing and re-plotting the whole figure.
+Comments:
+    The lines are animated artists, which a normal figure draw leaves out;
+    save() switches that off while printing the figure to a file.
+"""
+
+#--------------------------------------------------------------------------
+def grow(current, needed, headroom):
+    """
+    Auto upper limit for data reaching needed. Kept while the data stays in
+    the upper half of it, otherwise moved to needed plus headroom, so the
+    axes only rescale now and then as the data grows.
+    """
+    if current is None or needed > current or needed < current/2:
+        return needed + abs(needed)*headroom
+    return current
+#end def
+
+###############################################################################
+class LivePlot:
+    ''' Persistent lines on one subplot, blitted onto a cached background '''
+    #--------------------------------------------------------------------------
+    def __init__(self, canvas, subplot, lines):
+        self.canvas = canvas
+        self.subplot = subplot
+        self.lines = lines
+        for line in lines:
+            line.set_animated(True)
+
+        self.background = None
+        self.limits = None
+        self.redraws = 0 # full redraws, for comparing with the number of updates
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def on_draw(self, event):
+        ''' After any full draw (limits, resize): new background, lines on top '''
+        self.background = self.canvas.copy_from_bbox(self.subplot.bbox)
+        self.draw_lines()
+        self.canvas.blit(self.subplot.bbox)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def draw_lines(self):
+        for line in self.lines:
+            self.subplot.draw_artist(line)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def update(self, data, limits):
+        """
+        data: one (x, y) per line, limits: (xmin, xmax, ymin, ymax).
+        Redraws the axes only if the limits changed.
+        """
+        for line, (x, y) in zip(self.lines, data):
+            line.set_data(x, y)
+
+        if limits != self.limits or self.background is None:
+            self.limits = limits
+            self.subplot.set_xlim(limits[0], limits[1])
+            self.subplot.set_ylim(limits[2], limits[3])
+            self.redraws += 1
+            self.canvas.draw() # on_draw caches the background and blits
+            return
+        #end if
+
+        self.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.canvas.blit(self.subplot.bbox)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def save(self, path):
+        for line in self.lines:
+            line.set_animated(False)
+        self.canvas.print_figure(path)
+        for line in self.lines:
+            line.set_animated(True)
+        self.canvas.draw()
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : mpc
+Description:
+    Setpoint planning to reach each measurement temperature sooner. The PID
+    loop (CN7500 and furnace) is modelled from setpoint to temperature as
+    first order with dead time, fitted online from the temperature samples:
+        T[k+1] = a*T[k] + g*SP[k-d] + c
+    i.e. time constant tau = -period/ln(a), gain K = g/(1-a) and dead time
+    d*period. While heating, the planner sets the setpoint past the target
+    (by at most overshoot) and goes back to the target itself when the
+    model predicts that the temperature one dead time ahead is within
+    tolerance/2 of it, so the temperature is not pushed past the target.
+Comments:
+    The dead time is found by fitting every candidate delay and keeping the
+    best one. Until a fit is available (no setpoint step in the memory yet,
+    or a fit outside the sane range) the planner commands the target.
+    The hold value is the target: the integral action of the CN7500 takes
+    out any offset. The loop only heats, so nothing is planned for cooling.
+    The fitted loop is fast compared with the integral action, which the
+    model does not see: a boost winds the integral up. On the simulated rig,
+    5 C of overshoot saved about 100 s on 100 C steps well below heater
+    saturation, and lost as much on steps near it, so planning is off
+    (overshoot 0) unless it has been checked on the furnace.
+"""
+import collections
+import math
+
+import numpy as np
+
+###############################################################################
+class ThermalModel:
+    ''' First order plus dead time model of setpoint -> PID temperature '''
+    #--------------------------------------------------------------------------
+    def __init__(self, period=1.0, memory=3600.0, max_dead_time=120.0, min_samples=300):
+        self.period = period # (s) resampling step of the fit
+        self.memory = memory # (s) samples kept for the fit
+        self.max_dead_time = max_dead_time # (s)
+        self.min_samples = min_samples
+        self.samples = collections.deque() # (t, temp, setpoint)
+
+        self.fitted = False
+        self.a = self.g = self.c = None
+        self.delay = 0 # dead time in periods
+        self.rms = None # rms one step prediction error (C)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def add(self, t, temp, setpoint):
+        self.samples.append((t, temp, setpoint))
+        while t - self.samples[0][0] > self.memory:
+            self.samples.popleft()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def fit(self):
+        ''' Refit from the samples in memory, True if the model is usable '''
+        if len(self.samples) < self.min_samples:
+            return self.fitted
+        t, temp, sp = np.array(self.samples).T
+        if np.ptp(sp) == 0:
+            return self.fitted # no setpoint step to learn from
+        grid = np.arange(t[0], t[-1], self.period)
+        T = np.interp(grid, t, temp)
+        SP = sp[np.searchsorted(t, grid, 'right') - 1] # setpoints are steps
+        n = len(grid)
+
+        best = None
+        for d in range(0, int(self.max_dead_time/self.period) + 1):
+            if n - 1 - d < self.min_samples/2:
+                break
+            X = np.column_stack([T[d:n-1], SP[:n-1-d], np.ones(n-1-d)])
+            y = T[d+1:]
+            coeffs, res, rank, sv = np.linalg.lstsq(X, y, rcond=None)
+            a, g, c = coeffs
+            if rank < 3 or not (0 < a < 1) or not (0.3 < g/(1 - a) < 3):
+                continue # not a stable loop that follows its setpoint
+            rms = math.sqrt(np.mean((X.dot(coeffs) - y)**2))
+            if best is None or rms < best[0]:
+                best = (rms, d, coeffs)
+        #end for
+        if best is None:
+            return self.fitted # keep the last sane model
+
+        rms, d, (a, g, c) = best
+        self.a, self.g, self.c = a, g, c
+        self.delay = d
+        self.rms = rms
+        self.fitted = True
+        return True
+    #end def
+
+    #--------------------------------------------------------------------------
+    def tau(self):
+        return -self.period/math.log(self.a)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def gain(self):
+        return self.g/(1 - self.a)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def dead_time(self):
+        return self.delay*self.period
+    #end def
+
+    #--------------------------------------------------------------------------
+    def predict(self, temp, setpoints):
+        ''' Temperature after applying the setpoints, one per period '''
+        for sp in setpoints:
+            temp = self.a*temp + self.g*sp + self.c
+        return temp
+    #end def
+
+    #--------------------------------------------------------------------------
+    def describe(self):
+        if not self.fitted:
+            return 'thermal model: not fitted'
+        return 'thermal model: tau %.0f s, gain %.3f, dead time %.0f s, rms %.3f C' % (
+            self.tau(), self.gain(), self.dead_time(), self.rms)
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class SetpointPlanner:
+    """
+    Setpoint to command for one measurement temperature: past the target by
+    up to overshoot, then the target once the temperature one dead time
+    ahead is predicted within tolerance/2 of it.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, model, target, tolerance, overshoot, limit, now, setpoint):
+        self.model = model
+        self.target = target
+        self.tolerance = tolerance
+        self.overshoot = overshoot # (C) furthest the setpoint goes past the target
+        self.limit = limit # (C) the setpoint stays tolerance below this
+        self.commands = [(now, setpoint)] # (time, setpoint) in force from that time
+        self.holding = False
+    #end init
+
+    #--------------------------------------------------------------------------
+    def setpoint_at(self, t):
+        sp = self.commands[0][1]
+        for tc, value in self.commands:
+            if tc > t:
+                break
+            sp = value
+        #end for
+        return sp
+    #end def
+
+    #--------------------------------------------------------------------------
+    def command(self, now, temp):
+        ''' Setpoint to command now, given the current temperature '''
+        model = self.model
+        if not model.fitted or self.holding or self.overshoot <= 0:
+            sp = self.target
+        else:
+            # the setpoints of the last dead time still reach the temperature
+            period = model.period
+            ahead = model.predict(temp, [self.setpoint_at(now - model.dead_time() + k*period)
+                                         for k in range(model.delay)])
+            if self.target - ahead <= self.tolerance/2:
+                self.holding = True
+                sp = self.target
+            else:
+                sp = max(min(self.target + self.overshoot, self.limit - self.tolerance), self.target)
+            #end if
+        #end if
+        sp = round(sp, 1) # CN7500 setpoint resolution
+        if sp != self.commands[-1][1]:
+            self.commands.append((now, sp))
+        return sp
+    #end def
+
+#end class
+###############################################################################
@@ -16,8 +16,21 @@ Comments:
     
 """
 
+import os
+import sys
+
 import numpy as np
 
+# csv_loader is in program_hightemp, one folder up
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import csv_loader
+
+# Data.csv columns of ResistivityGUIv4. Its header runs 'thickness (cm)' into
+# the name of the next column, so the rows are named here.
+COLUMNS = ['time (s)', 'Temperature (C)', 't_1234', 'r_1234', 't_3412', 'r_3412',
+           't_1324', 'r_1324', 't_2413', 'r_2413', 'r_A', 'r_B', 'thickness (cm)',
+           'Measurement Start/Stop', 'Measurement Temp']
+
 #--------------------------------------------------------------------------
 def output_file(inFile, outFile):
     data = import_Data(inFile)
@@ -77,42 +90,12 @@ def output_file(inFile, outFile):
 
 #--------------------------------------------------------------------------
 def import_Data(filePath):
+    # the header lines above the column names are skipped whatever their number
+    header, data = csv_loader.load(filePath, names=COLUMNS, text=['Measurement Start/Stop'])
     
-    f = open(filePath)
-    loadData = f.read()
-    f.close()
-    
-    loadDataByLine = loadData.split('\n')
-    numericData = loadDataByLine[6:]
-    #print(numericData)
-    
-    length = len(numericData)
-    temp = [None]*length
-    r_1234 = [None]*length
-    r_3412 = [None]*length
-    r_1324 = [None]*length
-    r_2413 = [None]*length
-    r_A    = [None]*length
-    r_B    = [None]*length
-    d = [None]*length
-    indicator = [None]*length
-    
-    for x in xrange(length):
-        line = numericData[x].split(',')
-        #print(line)
-        
-        temp[x] = float(line[1])
-        r_1234[x] = float(line[3])
-        r_3412[x] = float(line[5])
-        r_1324[x] = float(line[7])
-        r_2413[x] = float(line[9])
-        r_A[x] = float(line[10])
-        r_B[x] = float(line[11])
-        d[x] = float(line[12])
-        indicator[x] = line[13]
-    #end for
-    
-    return temp, r_1234, r_3412, r_1324, r_2413, r_A, r_B, d, indicator
+    return (data['Temperature (C)'], data['r_1234'], data['r_3412'], data['r_1324'],
+            data['r_2413'], data['r_A'], data['r_B'], data['thickness (cm)'],
+            list(data['Measurement Start/Stop']))
             
 #end def
 
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : plot_history
+Description:
+    Bounded history of one plotted series, for the live GUI plots. Points go
+    into a numpy ring buffer (level 0) and into a pyramid of min/max levels:
+    each bucket of level k summarizes FACTOR buckets of level k-1. view()
+    picks the finest level that covers the requested time range within a
+    point budget, so a plot draws at most a few thousand points whatever
+    the zoom or the length of the run.
+Comments:
+    Every level holds at most CAPACITY buckets, so memory is fixed: with the
+    defaults the coarsest level spans about 4 million points (48 days at
+    one point a second). Older points fall out of the plots; the full
+    resolution data is in the run files.
+"""
+import numpy as np
+
+CAPACITY = 4096 # buckets per level
+FACTOR = 4 # level k-1 buckets per level k bucket
+LEVELS = 7
+
+###############################################################################
+class PlotHistory:
+    ''' Ring buffer plus min/max decimation pyramid of a (t, y) series '''
+    #--------------------------------------------------------------------------
+    def __init__(self, capacity=CAPACITY, factor=FACTOR, levels=LEVELS):
+        self.capacity = capacity
+        self.factor = factor
+        # per level: bucket start and end time, min and max, as rings
+        self.t0 = np.zeros((levels, capacity))
+        self.t1 = np.zeros((levels, capacity))
+        self.lo = np.zeros((levels, capacity))
+        self.hi = np.zeros((levels, capacity))
+        self.count = [0]*levels # buckets pushed into each level, ever
+        self.pending = [None]*levels # partial bucket: [n, t0, t1, lo, hi]
+
+        self.last = None # (t, y) of the newest point
+        self.max = float('-inf') # largest y so far
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __len__(self):
+        return self.count[0]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def append(self, t, y):
+        t = float(t)
+        y = float(y)
+        self.last = (t, y)
+        self.max = max(self.max, y)
+        self.push(0, t, t, y, y)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def push(self, level, t0, t1, lo, hi):
+        i = self.count[level] % self.capacity
+        self.t0[level, i] = t0
+        self.t1[level, i] = t1
+        self.lo[level, i] = lo
+        self.hi[level, i] = hi
+        self.count[level] += 1
+
+        up = level + 1
+        if up == len(self.count):
+            return
+        p = self.pending[up]
+        if p is None:
+            self.pending[up] = [1, t0, t1, lo, hi]
+        else:
+            p[0] += 1
+            p[2] = t1
+            p[3] = min(p[3], lo)
+            p[4] = max(p[4], hi)
+        #end if
+        if self.pending[up][0] == self.factor:
+            n, b0, b1, blo, bhi = self.pending[up]
+            self.pending[up] = None
+            self.push(up, b0, b1, blo, bhi)
+        #end if
+    #end def
+
+    #--------------------------------------------------------------------------
+    def level(self, k):
+        ''' (t0, t1, lo, hi) of level k, oldest first '''
+        n = min(self.count[k], self.capacity)
+        idx = np.arange(self.count[k] - n, self.count[k]) % self.capacity
+        return self.t0[k, idx], self.t1[k, idx], self.lo[k, idx], self.hi[k, idx]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def points(self, k, t0, t1, lo, hi):
+        ''' Plottable x, y: raw points on level 0, min then max per bucket above '''
+        if k == 0:
+            return t0, lo
+        x = np.empty(2*len(t0))
+        y = np.empty(2*len(t0))
+        x[0::2] = t0
+        x[1::2] = t1
+        y[0::2] = lo
+        y[1::2] = hi
+        return x, y
+    #end def
+
+    #--------------------------------------------------------------------------
+    def view(self, xmin=None, xmax=None, max_points=2000):
+        ''' x, y arrays for the time range [xmin, xmax] in at most ~max_points '''
+        if self.count[0] == 0:
+            return np.zeros(0), np.zeros(0)
+        if xmin is None:
+            xmin = float('-inf')
+        if xmax is None:
+            xmax = float('inf')
+
+        # finest level that reaches back to xmin with few enough points
+        top = max(k for k in range(len(self.count)) if self.count[k])
+        for k in range(top + 1):
+            t0, t1, lo, hi = self.level(k)
+            covers = self.count[k] <= self.capacity or t0[0] <= xmin
+            a = np.searchsorted(t1, xmin, 'left')
+            b = np.searchsorted(t0, xmax, 'right')
+            n = (b - a)*(1 if k == 0 else 2)
+            if (covers and n <= max_points) or k == top:
+                break
+        #end for
+        xs = [self.points(k, t0[a:b], t1[a:b], lo[a:b], hi[a:b])]
+
+        # the newest points are still in partial buckets: take them from the
+        # finer levels
+        end = t1[b-1] if b > a else xmin
+        for j in range(k - 1, -1, -1):
+            u0, u1, ulo, uhi = self.level(j)
+            c = np.searchsorted(u0, end, 'right')
+            d = np.searchsorted(u0, xmax, 'right')
+            if d > c:
+                xs.append(self.points(j, u0[c:d], u1[c:d], ulo[c:d], uhi[c:d]))
+                end = u1[d-1]
+        #end for
+        return np.concatenate([x for x, y in xs]), np.concatenate([y for x, y in xs])
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : ramp
+Description:
+    rho(T) from a continuous ramp. The readings of a ramp are tagged with the
+    thermocouple temperature, which leads the sample on heating and trails
+    it on cooling, by about the same lag for the same ramp rate. With a
+    heating and a cooling ramp over the same range, the lag is the shift
+    that lines the two curves up best, and what is left between them (a
+    constant offset: drift of the sample or of the contacts during the
+    pair) is split between the two. The corrected readings are averaged in
+    temperature bins.
+Comments:
+    direction is +1 for heating readings and -1 for cooling ones. With only
+    one direction no lag or drift can be told apart from rho(T), and the
+    readings are binned as they are.
+
+    A pair only tells lag and drift apart through the curvature of rho(T):
+    where rho(T) is a line of slope s, shifting the curves by a lag L does
+    the same as an offset 2*s*L, and any lag fits as well as any other.
+    The lag is trusted when the change of slope over the overlap resolves
+    it to better than a bin. Otherwise it is fitted with no drift and the
+    drift is nan: the binned rho(T) is the same either way, but neither
+    number is a measurement of the thermocouple or of the sample.
+"""
+import numpy as np
+
+#--------------------------------------------------------------------------
+def bin_curve(temps, values, width):
+    """
+    (T, value, standard error, n, index) per bin of width (C), sorted by T;
+    T and value are the means of the readings in the bin, index the bin of
+    each reading.
+    """
+    temps = np.asarray(temps, float)
+    values = np.asarray(values, float)
+    keys, index = np.unique(np.floor(temps/width).astype(int), return_inverse=True)
+    n = np.bincount(index)
+    T = np.bincount(index, temps)/n
+    mean = np.bincount(index, values)/n
+    var = np.bincount(index, values**2)/n - mean**2
+    stderr = np.sqrt(np.maximum(var, 0)/np.maximum(n - 1, 1))
+    return T, mean, stderr, n, index
+#end def
+
+#--------------------------------------------------------------------------
+def scan_lag(hT, hv, cT, cv, width, max_lag, step, drift):
+    """
+    (cost, lag, mean difference, overlap grid) of the lag that lines the
+    binned curves up best: with drift, the spread of heating minus cooling,
+    without, its mean square. None if they do not overlap.
+    """
+    best = None
+    for lag in np.arange(-max_lag, max_lag + step/2, step):
+        lo = max(hT[0] - lag, cT[0] + lag)
+        hi = min(hT[-1] - lag, cT[-1] + lag)
+        if hi - lo < 2*width:
+            continue
+        grid = np.arange(lo, hi, width/2)
+        diff = np.interp(grid, hT - lag, hv) - np.interp(grid, cT + lag, cv)
+        cost = np.var(diff) if drift else np.mean(diff**2)
+        if best is None or cost < best[0]:
+            best = (cost, lag, np.mean(diff), grid)
+    #end for
+    return best
+#end def
+
+#--------------------------------------------------------------------------
+def curvature(curves):
+    """
+    Second derivative of rho(T) that the binned curves, each a (T, values)
+    pair, show beyond three standard errors of a quadratic fit; 0 if none.
+    A shift in T leaves the curvature as it is, so it needs no lag.
+    """
+    weights, total = 0.0, 0.0
+    for T, v in curves:
+        if len(T) < 5:
+            continue
+        p, cov = np.polyfit(T, v, 2, cov=True)
+        weights += 1/cov[0, 0]
+        total += p[0]/cov[0, 0]
+    #end for
+    if weights == 0:
+        return 0.0
+    return 2*max(abs(total/weights) - 3/np.sqrt(weights), 0)
+#end def
+
+#--------------------------------------------------------------------------
+def lag_resolution(cost, grid, second):
+    """
+    (C) Standard error of a lag fitted with a free drift: a lag off by dL
+    adds 4*dL**2*var(slope) to the cost, against the noise cost/n, where
+    the slope changes by second (the curvature) per C over the overlap.
+    inf for a line.
+    """
+    n = max(len(grid)//2, 1) # the grid has two points per bin
+    spread = second*np.std(grid)
+    if spread == 0:
+        return np.inf
+    return np.sqrt(cost/n)/(2*spread)
+#end def
+
+#--------------------------------------------------------------------------
+def estimate_lag(heat, cool, width, max_lag=20.0, step=0.05):
+    """
+    (lag, drift) lining up a heating curve and a cooling curve, each a
+    (temps, values) pair: heating readings belong at T - lag, cooling ones
+    at T + lag, and drift is the mean of heating minus cooling after that.
+    When the overlap is too close to a line to resolve the lag to a bin,
+    the lag is fitted with no drift and drift is nan. None if the two do
+    not overlap.
+    """
+    hT, hv = bin_curve(heat[0], heat[1], width)[:2]
+    cT, cv = bin_curve(cool[0], cool[1], width)[:2]
+
+    best = scan_lag(hT, hv, cT, cv, width, max_lag, step, drift=True)
+    if best is None:
+        return None
+    cost, lag, drift, grid = best
+    if lag_resolution(cost, grid, curvature([(hT, hv), (cT, cv)])) <= width:
+        return lag, drift
+
+    lag = scan_lag(hT, hv, cT, cv, width, max_lag, step, drift=False)[1]
+    return lag, np.nan
+#end def
+
+#--------------------------------------------------------------------------
+def correct(temps, values, directions, width, max_lag=20.0):
+    """
+    (temps, values, lag, drift) with the lag and drift of a heating and
+    cooling pair taken out; lag and drift are 0 when there is no pair, and
+    drift is nan (nothing taken out) when the pair cannot tell it apart.
+    """
+    temps = np.asarray(temps, float)
+    values = np.asarray(values, float)
+    directions = np.asarray(directions, float)
+    heating = directions > 0
+    cooling = directions < 0
+
+    lag, drift = 0.0, 0.0
+    if heating.sum() > 1 and cooling.sum() > 1:
+        fit = estimate_lag((temps[heating], values[heating]), (temps[cooling], values[cooling]),
+                           width, max_lag)
+        if fit is not None:
+            lag, drift = fit
+    #end if
+    offset = 0.0 if np.isnan(drift) else drift/2
+    return temps - directions*lag, values - directions*offset, lag, drift
+#end def
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : relay_sequencer
+Description:
+    Declarative channel map of the van der Pauw configurations on the
+    Keithley 2700 matrix card, and a sequencer that moves the card between
+    them with the fewest relay actuations.
+Comments:
+    Rows 117-120 route the k2400 current across a contact pair, rows 125-128
+    route the k2182 across a contact pair. Each transition is sent as one
+    ROUT command (open then close, break before make) and the closed-channel
+    readback is only queried when verify is set.
+    Further samples wired to other rows of the card get their own
+    configurations from sample_configurations() and their own short from
+    sample_short(); short() shorts every sample the sequencer manages.
+"""
+from itertools import permutations
+
+#==============================================================================
+# rows across the contact pairs 1-2, 3-4, 1-3 and 2-4 of the sample
+CURRENT_ROWS = (117, 118, 119, 120) # k2400
+VOLTAGE_ROWS = (125, 126, 127, 128) # k2182
+
+#--------------------------------------------------------------------------
+def sample_configurations(current=CURRENT_ROWS, voltage=VOLTAGE_ROWS):
+    """
+    configuration -> channels closed while measuring it, for a sample whose
+    contact pairs 1-2, 3-4, 1-3 and 2-4 are on the given current and
+    voltage rows
+    """
+    i12, i34, i13, i24 = current
+    v12, v34, v13, v24 = voltage
+    return {
+        '1234': (i12, v34), # I 1-2, V 3-4  (r_A)
+        '3412': (i34, v12), # I 3-4, V 1-2  (r_A)
+        '1324': (i13, v24), # I 1-3, V 2-4  (r_B)
+        '2413': (i24, v13), # I 2-4, V 1-3  (r_B)
+    }
+#end def
+
+CONFIGURATIONS = sample_configurations()
+VDP_ORDER = ['1234', '3412', '1324', '2413']
+
+# every channel the sequencer is allowed to touch
+MANAGED_CHANNELS = CURRENT_ROWS + VOLTAGE_ROWS
+
+#--------------------------------------------------------------------------
+def sample_short(current=CURRENT_ROWS, voltage=VOLTAGE_ROWS):
+    ''' Channels shorting a sample: current through 1-2, every voltage row closed '''
+    return (current[0],) + tuple(voltage)
+#end def
+
+SHORT = sample_short()
+
+#--------------------------------------------------------------------------
+def channel_string(channels):
+    return ', '.join(str(c) for c in sorted(channels))
+#end def
+
+#--------------------------------------------------------------------------
+def parse_closed(text):
+    ''' "(@117,126)" -> set([117, 126]) '''
+    text = str(text).strip().strip('()').replace('@', '')
+    return set(int(c) for c in text.split(',') if c.strip())
+#end def
+
+###############################################################################
+class RelaySequencer:
+    """
+    Keeps a shadow of the matrix card state and sends only the difference
+    between consecutive states.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, k2700, configurations=CONFIGURATIONS, managed=MANAGED_CHANNELS, verify=False,
+                 short=SHORT):
+        self.k2700 = k2700
+        self.configurations = configurations
+        self.managed = set(managed)
+        self.short_channels = tuple(sorted(short)) # every sample shorted
+        self.verify = verify
+
+        self.closed = None # unknown until the first transition
+        self.actuations = 0
+        self.transitions = 0
+    #end init
+
+    #--------------------------------------------------------------------------
+    def channels(self, state):
+        ''' Channels for a configuration name or an explicit channel list '''
+        if state in self.configurations:
+            return set(self.configurations[state])
+        return set(state)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def cost(self, a, b):
+        ''' Relay actuations to go from channel set a to channel set b '''
+        if a is None:
+            return len(self.managed)
+        return len(a ^ b)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def goto(self, state):
+        ''' Move the card to a configuration (or channel list) '''
+        target = self.channels(state)
+        if self.closed is None:
+            to_open = self.managed - target
+            to_close = target
+        else:
+            to_open = self.closed - target
+            to_close = target - self.closed
+        #end if
+
+        if to_open or to_close:
+            self.k2700.switchChannels(channel_string(to_close), channel_string(to_open))
+            self.actuations += len(to_open) + len(to_close)
+            self.transitions += 1
+        #end if
+        self.closed = target
+
+        if self.verify:
+            readback = parse_closed(self.k2700.get_closedChannels()) & self.managed
+            if readback != target:
+                self.closed = None
+                raise IOError('Matrix card closed %s, expected %s' % (channel_string(readback), channel_string(target)))
+            #end if
+        #end if
+    #end def
+
+    #--------------------------------------------------------------------------
+    def short(self):
+        self.goto(self.short_channels)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def order(self, names=VDP_ORDER):
+        """
+        Order of the configurations that needs the fewest actuations from
+        the present card state. Ties keep the given order, so repeated
+        passes alternate direction and start where the last one ended.
+        """
+        best = list(names)
+        best_cost = None
+        for perm in permutations(names):
+            state = self.closed
+            total = 0
+            for name in perm:
+                target = self.channels(name)
+                total += self.cost(state, target)
+                state = target
+            #end for
+            if best_cost is None or total < best_cost:
+                best, best_cost = list(perm), total
+        #end for
+        return best
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : runlog
+Description:
+    Append-only binary run log. Each stream (data, status, temperature,
+    resistivity) goes to its own file of fixed-size numpy records behind a
+    fixed-size text header, buffered in memory and written out in chunks.
+    export() writes the CSV files the programs used to write directly, in
+    the same layouts.
+Comments:
+    File layout: HEADER_SIZE bytes of JSON (magic, stream, dtype, start
+    time, ...) padded with spaces, then the records back to back. A record
+    that was only partly written when the program died is ignored on load.
+    Values are stored in the units of the CSV columns (mOhm, mOhm*cm, C/min).
+    Missing values (stability before there is any) are stored as nan.
+    finalize() records the end of the run by rewriting the headers in place,
+    so ending a run does not depend on its length; the data csv of a
+    finalized log is exported as Data.csv with the end time lines filled in.
+    The blocks stream indexes the data records by setpoint as the run goes:
+    for each block of readings, its setpoint, first and stop record, byte
+    offset in Data.bin, start and end time, and status (BLOCK_STATUS).
+    read_block() uses it to map the readings at one setpoint straight from
+    Data.bin.
+
+    python runlog.py [folder] exports the CSV files of a run folder.
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import end_header
+
+MAGIC = 'RUNLOG'
+VERSION = 1
+HEADER_SIZE = 1024
+
+#==============================================================================
+# stream -> record layout
+STREAMS = {
+    'data': np.dtype([('time', '<f8'), ('temp', '<f8'), ('thickness', '<f8'),
+                      ('r_A', '<f8'), ('r_B', '<f8'), ('resistivity', '<f8')]),
+    'status': np.dtype([('time', '<f8'), ('thickness', '<f4'), ('temperature', '<f4'),
+                        ('setpoint', '<f4'), ('r_A', '<f8'), ('r_B', '<f8'), ('resistivity', '<f8')]),
+    'temperature': np.dtype([('time', '<f8'), ('stability', '<f4'), ('temperature', '<f4'),
+                             ('setpoint', '<f4'), ('measurementtemp', '<f4')]),
+    'resistivity': np.dtype([('time', '<f8'), ('temp', '<f8'), ('resistivity', '<f8')]),
+    'blocks': np.dtype([('setpoint', '<f8'), ('first', '<i8'), ('stop', '<i8'), ('offset', '<i8'),
+                        ('start', '<f8'), ('end', '<f8'), ('status', '<i4')]),
+}
+
+# status of a block in the blocks stream
+BLOCK_STATUS = ('open', 'complete', 'aborted', 'ramp')
+
+# stream -> (binary file, csv file, 'Start Time' line, csv headers, row formats)
+EXPORTS = {
+    'data': ('Data.bin', 'Data_Backup.csv', True,
+             'time (s), temp (C), thickness (cm), R_A (mOhm), R_B (mOhm), resistivity (mOhm*cm)\n',
+             ['%.6f', '%.6f', '%.6f', '%.6f', '%.6f', '%.6f']),
+    'status': ('Status.bin', 'Status.csv', True,
+               'time (s), thickness (cm), temperature (C), setpoint (C), R_A (mOhm), R_B (mOhm), resistivity (mOhm*cm)\n',
+               ['%.1f', '%.4f', '%.2f', '%.2f', '%.2f', '%.2f', '%.3f']),
+    'temperature': ('Temperature.bin', 'Temperature.csv', False,
+                    'time (s), stability (C/min), temperature (C), setpoint (C), measurementtemp (C)\n',
+                    ['%.1f', '%.4f', '%.2f', '%.2f', '%.2f']),
+    'resistivity': ('Resistivity.bin', 'Resistivity.csv', True,
+                    'time (s), temp (C),resistivity (mOhm*cm)\n',
+                    ['%.1f', '%.6f', '%.6f']),
+    'blocks': ('Blocks.bin', 'Blocks.csv', False,
+               'setpoint (C), first row, stop row, byte offset, start (s), end (s), status\n',
+               ['%.2f', '%d', '%d', '%d', '%.1f', '%.1f', '%d']),
+}
+
+# stream -> (csv file once the log is finalized, end lines after the start time)
+FINAL_EXPORTS = {
+    'data': ('Data.csv', 'end time: %s \nelapsed measurement time: %s seconds \n \n'),
+}
+
+#--------------------------------------------------------------------------
+def write_header(f, meta):
+    ''' Write meta as the fixed-size header at the start of an open file '''
+    text = json.dumps(meta, sort_keys=True)
+    if len(text) > HEADER_SIZE - 1:
+        raise ValueError('Run log header too long (%d bytes)' % len(text))
+    f.seek(0)
+    f.write((text + ' '*(HEADER_SIZE - 1 - len(text)) + '\n').encode('ascii'))
+#end def
+
+#--------------------------------------------------------------------------
+def read_header(path):
+    f = open(path, 'rb')
+    text = f.read(HEADER_SIZE)
+    f.close()
+    meta = json.loads(text.decode('ascii'))
+    if meta.get('magic') != MAGIC:
+        raise IOError('%s is not a run log' % path)
+    return meta
+#end def
+
+#--------------------------------------------------------------------------
+def read(path, mmap=True):
+    """
+    (meta, records) of a run log file. With mmap the records are a
+    read-only memory map, so only the parts used are read from disk.
+    """
+    meta = read_header(path)
+    dtype = np.dtype([(str(name), str(fmt)) for name, fmt in meta['dtype']])
+    n = (os.path.getsize(path) - HEADER_SIZE)//dtype.itemsize
+    if n <= 0:
+        return meta, np.zeros(0, dtype)
+    if mmap:
+        return meta, np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n,))
+    f = open(path, 'rb')
+    f.seek(HEADER_SIZE)
+    records = np.fromfile(f, dtype=dtype, count=n)
+    f.close()
+    return meta, records
+#end def
+
+###############################################################################
+class RecordWriter:
+    """
+    Appends records of one dtype to a file, holding up to chunk records in
+    memory. Writes out when the chunk is full or flush_interval seconds
+    have passed since the last write. With keep, an existing file is
+    reopened and cut back to its first keep records (None: all whole ones).
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, path, dtype, meta=None, chunk=256, flush_interval=10.0, reopen=False, keep=None):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.buffer = np.zeros(chunk, self.dtype)
+        self.n = 0 # records in the buffer
+        self.written = 0 # records in the file
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+
+        if reopen:
+            self.meta = read_header(path)
+            records = (os.path.getsize(path) - HEADER_SIZE)//self.dtype.itemsize
+            if keep is not None:
+                # offsets() syncs before the checkpoint is saved, so the
+                # file holds at least keep records; min() only guards a
+                # file cut short by something other than this program
+                records = min(records, keep)
+            self.file = open(path, 'r+b')
+            self.file.truncate(HEADER_SIZE + records*self.dtype.itemsize)
+            self.file.seek(0, os.SEEK_END)
+            self.written = records
+            return
+        #end if
+        self.meta = dict(meta or {})
+        self.meta.update(magic=MAGIC, version=VERSION,
+                         dtype=[(name, self.dtype[name].str) for name in self.dtype.names])
+        self.file = open(path, 'wb')
+        write_header(self.file, self.meta)
+        self.file.flush()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def update_meta(self, **meta):
+        ''' Rewrite the header in place with more fields '''
+        self.meta.update(meta)
+        write_header(self.file, self.meta)
+        self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def append(self, *values):
+        self.buffer[self.n] = values
+        self.n += 1
+        if self.n == len(self.buffer) or time.time() - self.last_flush > self.flush_interval:
+            self.flush()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        if self.file.closed:
+            return
+        if self.n:
+            self.file.write(self.buffer[:self.n].tobytes())
+            self.written += self.n
+            self.n = 0
+        #end if
+        self.file.flush()
+        self.last_flush = time.time()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def sync(self):
+        ''' Flush, then have the OS put the records on disk '''
+        if self.file.closed:
+            return
+        self.flush()
+        os.fsync(self.file.fileno())
+    #end def
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class RunLog:
+    """
+    One RecordWriter per stream, in the run folder. With resume, the files
+    of an earlier run are reopened and cut back to the record counts given
+    per stream (streams not given keep all their records). streams limits
+    the log to some of the streams. begin_block and end_block index the
+    data records of each setpoint in the blocks stream.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, folder='.', start=None, resume=None, streams=None, **options):
+        self.folder = os.path.abspath(folder) # the GUI changes directory per run
+        self.start = str(start or '')
+        self.writers = {}
+        self.block = None # (setpoint, first record, start time) of the open block
+        if resume is not None:
+            self.start = read_header(os.path.join(self.folder, EXPORTS['data'][0])).get('start', '')
+        for stream in streams or STREAMS:
+            path = os.path.join(self.folder, EXPORTS[stream][0])
+            if resume is not None and os.path.exists(path):
+                self.writers[stream] = RecordWriter(path, STREAMS[stream], reopen=True,
+                                                    keep=resume.get(stream), **options)
+            else:
+                self.writers[stream] = RecordWriter(path, STREAMS[stream],
+                                                    dict(stream=stream, start=self.start), **options)
+        #end for
+    #end init
+
+    #--------------------------------------------------------------------------
+    def append(self, stream, *values):
+        self.writers[stream].append(*values)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def count(self, stream):
+        ''' Records appended to a stream, written out or not '''
+        return self.writers[stream].written + self.writers[stream].n
+    #end def
+
+    #--------------------------------------------------------------------------
+    def begin_block(self, setpoint, t):
+        ''' The data records from now on are the readings at setpoint '''
+        self.block = (setpoint, self.count('data'), t)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def end_block(self, t, status='complete'):
+        ''' Index the data records since begin_block, written out at once '''
+        if self.block is None:
+            return
+        setpoint, first, start = self.block
+        self.writers['blocks'].append(setpoint, first, self.count('data'),
+                                      HEADER_SIZE + first*self.writers['data'].dtype.itemsize,
+                                      start, t, BLOCK_STATUS.index(status))
+        self.writers['blocks'].flush()
+        self.block = None
+    #end def
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def offsets(self):
+        """
+        Records written so far per stream, synced to disk so a checkpoint
+        holding these counts never points past the end of a file after a
+        power cut.
+        """
+        for writer in self.writers.values():
+            writer.sync()
+        return dict((stream, writer.written) for stream, writer in self.writers.items())
+    #end def
+
+    #--------------------------------------------------------------------------
+    def finalize(self, **meta):
+        ''' End of run metadata (end time, elapsed time, ...) into every header '''
+        for writer in self.writers.values():
+            writer.flush()
+            writer.update_meta(**meta)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def export(self, streams=None):
+        ''' Write the CSV files, from what has been written so far '''
+        self.flush()
+        export(self.folder, streams or self.writers.keys())
+    #end def
+
+#end class
+###############################################################################
+
+#--------------------------------------------------------------------------
+def read_blocks(folder='.'):
+    ''' The block index of a run folder, empty for runs without one '''
+    path = os.path.join(folder, EXPORTS['blocks'][0])
+    if not os.path.exists(path):
+        return np.zeros(0, STREAMS['blocks'])
+    return read(path, mmap=False)[1]
+#end def
+
+#--------------------------------------------------------------------------
+def read_block(folder, setpoint, tolerance=0.5, status=('complete', 'ramp')):
+    """
+    The data records of every block at setpoint (within tolerance, C) with
+    one of the given statuses, a list of memory-mapped arrays in run order.
+    Only the index and those records are read from disk.
+    """
+    blocks = read_blocks(folder)
+    codes = [BLOCK_STATUS.index(name) for name in status]
+    path = os.path.join(folder, EXPORTS['data'][0])
+    dtype = STREAMS['data']
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+
+    segments = []
+    for block in blocks:
+        if abs(block['setpoint'] - setpoint) > tolerance or block['status'] not in codes:
+            continue
+        n = int(block['stop'] - block['first'])
+        if n <= 0 or block['offset'] + n*dtype.itemsize > size:
+            continue
+        segments.append(np.memmap(path, dtype=dtype, mode='r', offset=int(block['offset']), shape=(n,)))
+    #end for
+    return segments
+#end def
+
+#--------------------------------------------------------------------------
+def export_stream(folder, stream):
+    ''' Write the CSV file of one stream from its binary file '''
+    binfile, csvfile, start_line, headers, formats = EXPORTS[stream]
+    meta, records = read(os.path.join(folder, binfile), mmap=False)
+
+    columns = []
+    for name, fmt in zip(records.dtype.names, formats):
+        col = np.char.mod(fmt, records[name].astype(float))
+        col[np.isnan(records[name])] = '-'
+        columns.append(col)
+    #end for
+
+    if stream in FINAL_EXPORTS:
+        if 'end' in meta:
+            csvfile = FINAL_EXPORTS[stream][0]
+        end_lines = end_header.fixed_width(FINAL_EXPORTS[stream][1],
+                                           (meta.get('end', ''), meta.get('elapsed', '')))
+    else:
+        end_lines = ''
+    #end if
+
+    f = open(os.path.join(folder, csvfile), 'w')
+    if start_line:
+        f.write('Start Time: ' + meta.get('start', '') + '\n')
+    f.write(end_lines)
+    f.write(headers)
+    if len(records):
+        rows = columns[0]
+        for col in columns[1:]:
+            rows = np.char.add(np.char.add(rows, ','), col)
+        f.write('\n'.join(rows) + '\n')
+    #end if
+    f.close()
+#end def
+
+#--------------------------------------------------------------------------
+def export(folder='.', streams=None):
+    for stream in streams or STREAMS:
+        if os.path.exists(os.path.join(folder, EXPORTS[stream][0])):
+            export_stream(folder, stream)
+    #end for
+#end def
+
+if __name__ == '__main__':
+    export(sys.argv[1] if len(sys.argv) > 1 else '.')
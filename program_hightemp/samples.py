@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : samples
+Description:
+    Samples mounted together in the furnace. Each sample has its own rows
+    on the matrix card, its own thickness and its own Data and Resistivity
+    records, while the temperature control and the stability wait are
+    shared, so every sample is measured in turn once a setpoint is stable.
+Comments:
+    The first sample is the one on the standard rows (117-120, 125-128);
+    its records are the run folder, with the Status and Temperature ones.
+    The records of any further sample go in a sub folder named after it.
+    Configurations are keyed (sample name, configuration) so the relay
+    sequencer can hold the channels of every sample at once.
+"""
+import os
+
+from relay_sequencer import CURRENT_ROWS, VOLTAGE_ROWS, sample_configurations, sample_short
+from runlog import RunLog
+
+# records kept per sample, the others are shared by the run
+SAMPLE_STREAMS = ('data', 'resistivity', 'blocks')
+
+###############################################################################
+class Sample:
+    ''' Channel map, thickness and records of one sample '''
+    #--------------------------------------------------------------------------
+    def __init__(self, name, thickness, current=CURRENT_ROWS, voltage=VOLTAGE_ROWS):
+        self.name = name
+        self.thickness = thickness # (cm)
+        self.current = tuple(current)
+        self.voltage = tuple(voltage)
+        self.configurations = dict(((name, config), channels) for config, channels
+                                   in sample_configurations(current, voltage).items())
+        self.runlog = None
+        self.ramp_points = [] # (time, temp, resistivity, direction) of the ramp readings
+        self.ramp_meta = {}
+        self.clear()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def key(self, config):
+        return (self.name, config)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def channels(self):
+        return self.current + self.voltage
+    #end def
+
+    #--------------------------------------------------------------------------
+    def short(self):
+        return sample_short(self.current, self.voltage)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def clear(self):
+        ''' Readings of a new setpoint '''
+        self.timecalclist = []
+        self.tempcalclist = []
+        self.rAcalclist = []
+        self.rBcalclist = []
+    #end def
+
+    #--------------------------------------------------------------------------
+    def calclists(self):
+        return [list(self.timecalclist), list(self.tempcalclist),
+                list(self.rAcalclist), list(self.rBcalclist)]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def restore(self, calclists):
+        self.timecalclist, self.tempcalclist, self.rAcalclist, self.rBcalclist = [
+            list(c) for c in calclists]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def open_log(self, folder, start=None, resume=None):
+        ''' Data, Resistivity and block index records in a sub folder of the run folder '''
+        folder = os.path.join(folder, self.name)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self.runlog = RunLog(folder, start=start, resume=resume, streams=SAMPLE_STREAMS)
+        return self.runlog
+    #end def
+
+    #--------------------------------------------------------------------------
+    def settings(self):
+        return dict(name=self.name, thickness=self.thickness,
+                    current=list(self.current), voltage=list(self.voltage))
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : scpi_batch
+Description:
+    Batching wrapper for a visa resource (the ctrl attribute of the Keithley
+    drivers). Inside a batch() block, writes are queued and sent as one
+    semicolon-joined compound command at the next query, at an explicit
+    flush() or at the end of the block, saving a full GPIB transaction per
+    queued command.
+Comments:
+    Outside a batch() block every write goes straight to the instrument, so
+    code that relies on a write taking effect before a sleep is unchanged.
+    Queued headers are made absolute (leading ':') so they do not pick up
+    the path of the previous command in the compound message.
+"""
+from contextlib import contextmanager
+
+###############################################################################
+class BatchingResource:
+    ''' Wraps a visa resource, joining queued writes into compound commands '''
+    #--------------------------------------------------------------------------
+    def __init__(self, resource, max_length=200):
+        self.resource = resource
+        self.max_length = max_length # longest compound message to send (chars)
+        self.queue = []
+        self.depth = 0
+
+        self.commands = 0 # commands asked for
+        self.transactions = 0 # bus transactions actually made
+        self.on_error = [] # called when a bus transaction fails
+    #end init
+
+    #--------------------------------------------------------------------------
+    def send(self, method, message):
+        try:
+            return method(message)
+        except Exception:
+            for callback in self.on_error:
+                callback()
+            raise
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        # timeout, resource_name, close(), ... of the wrapped resource
+        return getattr(self.resource, name)
+    #end def
+
+    #--------------------------------------------------------------------------
+    @contextmanager
+    def batch(self):
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.flush()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def join(self, commands):
+        out = []
+        for c in commands:
+            c = c.strip()
+            if not c.startswith(':') and not c.startswith('*'):
+                c = ':' + c
+            out.append(c)
+        return ';'.join(out)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write(self, message):
+        self.commands += 1
+        if self.depth == 0:
+            self.flush()
+            self.transactions += 1
+            return self.send(self.resource.write, message)
+        #end if
+        if self.queue and len(self.join(self.queue + [message])) > self.max_length:
+            self.flush()
+        self.queue.append(message)
+        return len(message)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        ''' Send any queued writes as one compound command '''
+        if self.queue:
+            message = self.join(self.queue)
+            self.queue = []
+            self.transactions += 1
+            self.send(self.resource.write, message)
+        #end if
+    #end def
+
+    #--------------------------------------------------------------------------
+    def query(self, message):
+        ''' Queries carry the queued writes with them '''
+        self.commands += 1
+        if self.queue and len(self.join(self.queue + [message])) <= self.max_length:
+            message = self.join(self.queue + [message])
+            self.queue = []
+        else:
+            self.flush()
+        #end if
+        self.transactions += 1
+        return self.send(self.resource.query, message)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read(self):
+        self.flush()
+        return self.resource.read()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def saved(self):
+        ''' GPIB transactions saved by batching so far '''
+        return self.commands - self.transactions
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : settling
+Description:
+    Adaptive settle detection for the k2182. Instead of sleeping a fixed delay
+    after every relay change and current reversal, the voltmeter is polled at
+    a short interval and a reading is accepted once successive values agree
+    within a band set by the noise of the active range and the reading's
+    gain accuracy. The time each range needed to
+    settle is learned during the run; the old fixed delay is only an upper
+    bound.
+Comments:
+    The clock argument can be any object with time() and sleep(), the time
+    module by default.
+"""
+import math
+import time
+
+#==============================================================================
+# k2182 voltage ranges (V) and their typical rms noise at 5 NPLC (V)
+RANGES = [0.01, 0.1, 1.0, 10.0, 100.0]
+RANGE_NOISE = {0.01: 15e-9, 0.1: 30e-9, 1.0: 150e-9, 10.0: 1.5e-6, 100.0: 15e-6}
+
+#--------------------------------------------------------------------------
+def voltage_range(v):
+    ''' Smallest k2182 range that holds v (20% over-range allowed) '''
+    for r in RANGES:
+        if abs(v) <= 1.2*r:
+            return r
+    return RANGES[-1]
+#end def
+
+###############################################################################
+class SettleDetector:
+    """
+    Polls a reading function until successive values agree within a noise
+    band, and keeps a per-range table of learned settle times.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, poll=0.05, window=3, noise_factor=5.0, rel_tol=2e-5, clock=time):
+        self.poll = poll # (s) time between polls
+        self.window = window # successive readings that must agree
+        self.noise_factor = noise_factor # band = noise_factor*rms noise
+        self.rel_tol = rel_tol # or this fraction of the reading, if larger
+        self.clock = clock
+
+        self.noise = dict(RANGE_NOISE) # rms noise estimate per range (V)
+        self.table = {} # learned settle time per range (s)
+        self.timeouts = 0
+    #end init
+
+    #--------------------------------------------------------------------------
+    def band(self, r, v):
+        return max(self.noise_factor*self.noise[r], self.rel_tol*abs(v))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def read(self, fetch, limit):
+        """
+        Return a settled reading from fetch(), the mean of the accepted
+        window. limit (s) is the fixed delay this replaces; if the readings
+        have not settled by then the latest window is used anyway.
+        """
+        start = self.clock.time()
+        readings = []
+        times = []
+
+        # skip straight to the part of the wait this range usually needs
+        times.append(0.0)
+        first = float(fetch())
+        readings.append(first)
+        r = voltage_range(first)
+        if r in self.table:
+            self.clock.sleep(min(0.8*self.table[r], limit))
+            readings = []
+            times = []
+        #end if
+
+        while True:
+            times.append(self.clock.time() - start)
+            readings.append(float(fetch()))
+            recent = readings[-self.window:]
+            elapsed = self.clock.time() - start
+
+            if len(recent) == self.window:
+                r = voltage_range(recent[-1])
+                if max(recent) - min(recent) <= self.band(r, recent[-1]):
+                    # settled when the first reading of the window started
+                    self.learn(r, times[-self.window], recent)
+                    break
+                #end if
+            #end if
+            if elapsed >= limit:
+                self.timeouts += 1
+                break
+            #end if
+            self.clock.sleep(self.poll)
+        #end while
+
+        return sum(recent)/len(recent)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def learn(self, r, settle_time, recent):
+        ''' Update the settle time table and noise estimate for range r '''
+        if r in self.table:
+            self.table[r] = 0.7*self.table[r] + 0.3*settle_time
+        else:
+            self.table[r] = settle_time
+
+        mean = sum(recent)/len(recent)
+        rms = math.sqrt(sum((v - mean)**2 for v in recent)/(len(recent) - 1))
+        # never trust the band to shrink below the instrument noise floor
+        self.noise[r] = max(0.8*self.noise[r] + 0.2*rms, RANGE_NOISE[r])
+    #end def
+
+    #--------------------------------------------------------------------------
+    def summary(self):
+        lines = ['range (V)\tsettle time (s)\tnoise (V)']
+        for r in sorted(self.table):
+            lines.append('%g\t%.3f\t%.3g' % (r, self.table[r], self.noise[r]))
+        lines.append('timeouts: %d' % self.timeouts)
+        return '\n'.join(lines)
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : stability
+Description:
+    Stability of the PID temperature: a least squares line through the
+    samples of the last window seconds, kept as running sums so adding a
+    sample and dropping the old ones is O(1). The slope comes with a 95%
+    confidence interval, which is only shown: stability is judged on the
+    slope alone, as the reading noise can keep the interval of a settled
+    run above the threshold. eta() estimates how long until the
+    temperature is within tolerance of the setpoint and stable.
+Comments:
+    The sums are taken about a reference time that is moved to the oldest
+    sample whenever the sums are rebuilt (once per window of samples), so
+    long runs do not lose precision to large times.
+    eta() assumes a first order approach to the setpoint,
+    T(t) = Tset + (T - Tset)*exp(-t/tau), with tau = (Tset - T)/slope. The
+    fitted slope lags the true one by about half a window, which is added.
+"""
+import collections
+import math
+
+# two-sided 95% Student t quantiles for 1..30 degrees of freedom
+T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+#--------------------------------------------------------------------------
+def t95(df):
+    if df <= len(T95):
+        return T95[df-1]
+    return 1.96 + 2.4/df
+#end def
+
+###############################################################################
+class RollingRegression:
+    ''' Linear fit of y(t) over a sliding time window, from running sums '''
+    #--------------------------------------------------------------------------
+    def __init__(self, window=60.0, min_samples=3):
+        self.window = window # (s)
+        self.min_samples = min_samples
+        self.reset()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def reset(self):
+        self.samples = collections.deque()
+        self.t0 = None # reference time of the sums
+        self.dropped = 0 # samples dropped since the sums were rebuilt
+        self.n = 0
+        self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+    #end def
+
+    #--------------------------------------------------------------------------
+    def accumulate(self, t, y, sign):
+        x = t - self.t0
+        self.n += sign
+        self.st += sign*x
+        self.sy += sign*y
+        self.stt += sign*x*x
+        self.sty += sign*x*y
+        self.syy += sign*y*y
+    #end def
+
+    #--------------------------------------------------------------------------
+    def rebuild(self):
+        samples = self.samples
+        self.reset()
+        self.samples = samples
+        if samples:
+            self.t0 = samples[0][0]
+        for t, y in samples:
+            self.accumulate(t, y, 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def add(self, t, y):
+        if self.t0 is None:
+            self.t0 = t
+        self.samples.append((t, y))
+        self.accumulate(t, y, 1)
+
+        while t - self.samples[0][0] > self.window:
+            t_old, y_old = self.samples.popleft()
+            self.accumulate(t_old, y_old, -1)
+            self.dropped += 1
+        #end while
+        if self.dropped > len(self.samples):
+            self.rebuild()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def span(self):
+        if not self.samples:
+            return 0.0
+        return self.samples[-1][0] - self.samples[0][0]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def ready(self):
+        ''' Enough samples over at least half a window for a slope '''
+        return self.n >= self.min_samples and self.span() >= self.window/2
+    #end def
+
+    #--------------------------------------------------------------------------
+    def fit(self):
+        """
+        (slope, half width of its 95% confidence interval, latest fitted y),
+        None if there are fewer than two distinct times.
+        """
+        n = self.n
+        sxx = self.stt - self.st*self.st/n if n else 0.0
+        if n < 2 or sxx <= 0:
+            return None
+        sxy = self.sty - self.st*self.sy/n
+        syy = self.syy - self.sy*self.sy/n
+        slope = sxy/sxx
+
+        half_width = float('inf')
+        if n > 2:
+            s2 = max(syy - slope*sxy, 0.0)/(n - 2)
+            half_width = t95(n - 2)*math.sqrt(s2/sxx)
+        #end if
+        t = self.samples[-1][0] - self.t0
+        y = self.sy/n + slope*(t - self.st/n)
+        return slope, half_width, y
+    #end def
+
+    #--------------------------------------------------------------------------
+    def stable(self, threshold):
+        ''' True when the slope is within +-threshold '''
+        if not self.ready():
+            return False
+        slope, half_width, y = self.fit()
+        return abs(slope) < threshold
+    #end def
+
+    #--------------------------------------------------------------------------
+    def eta(self, setpoint, tolerance, threshold):
+        """
+        Seconds until the temperature is within tolerance of setpoint and
+        the slope within threshold, 0 if both are met, None if the
+        temperature is not approaching the setpoint.
+        """
+        if not self.ready():
+            return None
+        slope, half_width, y = self.fit()
+        error = y - setpoint
+        if abs(error) < tolerance and abs(slope) < threshold:
+            return 0.0
+        if slope*error >= 0:
+            return None
+        tau = -error/slope
+
+        t_tol = 0.0
+        if abs(error) >= tolerance:
+            t_tol = tau*math.log(abs(error)/tolerance)
+        t_stable = 0.0
+        if abs(slope) >= threshold:
+            t_stable = tau*math.log(abs(slope)/threshold) + self.window/2
+        return max(t_tol, t_stable)
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : state_cache
+Description:
+    Shadow copy of instrument settings (range, level, output, function,
+    channel, NPLC, ...) kept by a driver so that writes which would not
+    change anything are skipped.
+Comments:
+    Any write that fails, on the cache or on the wrapped resource, clears
+    the whole shadow so the next write of every setting goes out again.
+    Code that talks to ctrl directly must call invalidate() afterwards.
+"""
+
+###############################################################################
+class StateCache:
+    ''' Skips writes of a setting to the value the instrument already has '''
+    #--------------------------------------------------------------------------
+    def __init__(self, ctrl):
+        self.ctrl = ctrl
+        self.state = {}
+        self.hits = 0 # writes skipped
+        self.misses = 0 # writes sent
+
+        # the batching wrapper reports errors from queued writes here
+        if hasattr(ctrl, 'on_error'):
+            ctrl.on_error.append(self.invalidate)
+    #end init
+
+    #--------------------------------------------------------------------------
+    def write(self, key, value, command):
+        if key in self.state and self.state[key] == value:
+            self.hits += 1
+            return
+        #end if
+        self.misses += 1
+        try:
+            self.ctrl.write(command)
+        except Exception:
+            self.invalidate()
+            raise
+        #end try
+        self.state[key] = value
+    #end def
+
+    #--------------------------------------------------------------------------
+    def invalidate(self, *keys):
+        ''' Forget the given settings, or all of them '''
+        if keys:
+            for key in keys:
+                self.state.pop(key, None)
+        else:
+            self.state.clear()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def summary(self):
+        return 'hits: %d, misses: %d' % (self.hits, self.misses)
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : telemetry
+Description:
+    Latest-value store between the measurement thread and the GUI. The
+    measurement thread puts (topic, value) without waiting on anything; the
+    GUI drains the store at a fixed frame rate and sends one pubsub message
+    per topic that changed since the last frame, with its latest value.
+    Series meant for the plots are queued in full instead, so no plotted
+    point is lost to coalescing.
+Comments:
+    No lock: a put is one dict store of a (sequence, value) tuple and a
+    sample is one deque append, both atomic under the GIL, and drain only
+    takes a copy of the dict. A value put while a frame is being drained is
+    picked up on the next frame.
+    Topics that carry different things in one message name (the status bar
+    gets status strings and [tol, stable] lists) are kept apart with key.
+"""
+import collections
+import itertools
+
+FRAME_RATE = 10 # frames per second
+
+###############################################################################
+class Telemetry:
+    ''' Coalescing topic -> latest value store, plus queued plot samples '''
+    #--------------------------------------------------------------------------
+    def __init__(self):
+        self.counter = itertools.count(1)
+        self.values = {} # key -> (sequence, topic, value)
+        self.seen = 0 # highest sequence drained
+        self.samples = collections.deque() # (series, t, y)
+
+        self.puts = 0
+        self.sent = 0
+    #end init
+
+    #--------------------------------------------------------------------------
+    def put(self, topic, value, key=None):
+        self.values[key or topic] = (next(self.counter), topic, value)
+        self.puts += 1
+    #end def
+
+    #--------------------------------------------------------------------------
+    def sample(self, series, t, y):
+        self.samples.append((series, t, y))
+    #end def
+
+    #--------------------------------------------------------------------------
+    def drain(self):
+        """
+        (changed, samples): the (topic, value) pairs put since the last
+        drain, latest per key and in the order they were put, and the
+        queued plot samples
+        """
+        entries = sorted(e for e in list(self.values.values()) if e[0] > self.seen)
+        if entries:
+            self.seen = entries[-1][0]
+        changed = [(topic, value) for n, topic, value in entries]
+        self.sent += len(changed)
+
+        samples = []
+        while self.samples:
+            samples.append(self.samples.popleft())
+        return changed, samples
+    #end def
+
+    #--------------------------------------------------------------------------
+    def summary(self):
+        return '%d telemetry updates, %d sent to the GUI' % (self.puts, self.sent)
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : temperature_sampler
+Description:
+    Background thread that polls the CN7500 at a fixed cadence into a
+    timestamped ring buffer, so the measurement thread never waits on Modbus
+    for a temperature. Readers ask for the latest sample, for the samples
+    since one they already have, or for the temperature interpolated at any
+    time inside the buffer.
+Comments:
+    The serial port is shared with the measurement thread (set_setpoint),
+    so the heater is wrapped in a LockedInstrument and every call on it,
+    from either thread, holds the same lock.
+    Times are time.time() values (absolute); callers subtract their own
+    start time.
+    A read that fails is counted and skipped, so a CN7500 that stops
+    answering shows up only as a buffer that stops growing: readers check
+    stale() and temperature_at raises IOError rather than extrapolating
+    over the gap.
+"""
+import threading
+import time
+
+import numpy as np
+
+###############################################################################
+class LockedInstrument:
+    ''' Proxy that serializes every method call on an instrument '''
+    #--------------------------------------------------------------------------
+    def __init__(self, instrument, lock=None):
+        self.instrument = instrument
+        self.lock = lock or threading.RLock()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        attr = getattr(self.instrument, name)
+        if not callable(attr):
+            return attr
+        def locked(*args, **kwargs):
+            with self.lock:
+                return attr(*args, **kwargs)
+        return locked
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class TemperatureSampler(threading.Thread):
+    """
+    Polls heater.get_pv() and heater.get_setpoint() every period seconds.
+    Holds the last size samples.
+    """
+    # the newest sample stands for the temperature now for this many periods
+    STALE_PERIODS = 5
+
+    #--------------------------------------------------------------------------
+    def __init__(self, heater, period=1.0, size=4096, clock=time):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.heater = heater
+        self.period = period
+        self.size = size
+        self.clock = clock
+
+        self.times = np.zeros(size)
+        self.temps = np.zeros(size)
+        self.setpoints = np.zeros(size)
+        self.count = 0 # samples taken since start, the index of the next one
+
+        self.errors = 0
+        self.last_error = None
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+    #end init
+
+    #--------------------------------------------------------------------------
+    def run(self):
+        next_time = self.clock.time()
+        while not self.stopped.is_set():
+            try:
+                t0 = self.clock.time()
+                pv = float(self.heater.get_pv())
+                t = (t0 + self.clock.time())/2 # middle of the Modbus read
+                sp = float(self.heater.get_setpoint())
+            except (IOError, ValueError) as e:
+                # a dropped Modbus frame costs one sample, not the run
+                self.errors += 1
+                self.last_error = e
+            else:
+                self.append(t, pv, sp)
+            #end try
+
+            next_time += self.period
+            wait = next_time - self.clock.time()
+            if wait < 0:
+                next_time = self.clock.time() # fell behind, do not burst
+            elif self.clock is time:
+                self.stopped.wait(wait) # returns at once on stop()
+            else:
+                self.clock.sleep(wait)
+            #end if
+        #end while
+    #end def
+
+    #--------------------------------------------------------------------------
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join(5*self.period + 1)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def append(self, t, pv, sp):
+        with self.condition:
+            i = self.count % self.size
+            self.times[i] = t
+            self.temps[i] = pv
+            self.setpoints[i] = sp
+            self.count += 1
+            self.condition.notify_all()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def ordered(self, first=0):
+        ''' (times, temps, setpoints) from sample index first on, oldest first '''
+        with self.condition:
+            first = max(first, self.count - self.size)
+            idx = np.arange(first, self.count) % self.size
+            return self.times[idx], self.temps[idx], self.setpoints[idx]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def wait_next(self, index, timeout=None):
+        """
+        Block until sample number index exists (or timeout) and return the
+        index after the newest sample.
+        """
+        if timeout is None:
+            timeout = 5*self.period
+        with self.condition:
+            if self.count <= index:
+                self.condition.wait(timeout)
+            return self.count
+    #end def
+
+    #--------------------------------------------------------------------------
+    def latest(self):
+        ''' (time, temp, setpoint) of the newest sample, None if there is none '''
+        with self.condition:
+            if self.count == 0:
+                return None
+            i = (self.count - 1) % self.size
+            return self.times[i], self.temps[i], self.setpoints[i]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def age(self):
+        ''' Seconds since the newest sample, inf if there is none '''
+        sample = self.latest()
+        if sample is None:
+            return float('inf')
+        return self.clock.time() - sample[0]
+    #end def
+
+    #--------------------------------------------------------------------------
+    def stale(self):
+        ''' True when the newest sample is too old or the thread has died '''
+        return not self.is_alive() or self.age() > self.STALE_PERIODS*self.period
+    #end def
+
+    #--------------------------------------------------------------------------
+    def since(self, index):
+        """
+        Samples from index on, as a list of (time, temp, setpoint), and the
+        index to pass next time.
+        """
+        with self.condition:
+            times, temps, setpoints = self.ordered(index)
+            return zip(times, temps, setpoints), self.count
+    #end def
+
+    #--------------------------------------------------------------------------
+    def temperature_at(self, t, wait=True):
+        """
+        Temperature interpolated at time t. With wait, blocks (up to two
+        periods past t) for a sample at or after t so the value is bracketed.
+        Raises IOError when no sample lies within STALE_PERIODS periods on
+        either side of t.
+        """
+        if wait:
+            deadline = max(self.clock.time(), t) + 2*self.period
+            with self.condition:
+                while (self.count == 0 or self.times[(self.count - 1) % self.size] < t) \
+                        and self.clock.time() < deadline and self.is_alive():
+                    self.condition.wait(self.period)
+            #end with
+        #end if
+        times, temps, setpoints = self.ordered()
+        gap = self.STALE_PERIODS*self.period
+        i = np.searchsorted(times, t)
+        if len(times) == 0 or t > times[-1] + gap or t < times[0] - gap \
+                or 0 < i < len(times) and times[i] - times[i-1] > gap:
+            raise IOError('No temperature from the PID near t = %.1f s: %s' % (t, self.last_error))
+        #end if
+        return float(np.interp(t, times, temps))
+    #end def
+
+#end class
+###############################################################################
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : timing
+Description:
+    Where the time of a run goes. A Timer times named phases (methods of the
+    measurement loop, instrument calls) and keeps, per name, the count, the
+    total, the maximum and a histogram of the durations, plus the latest
+    events for a timeline. At the end of a run it writes a summary table,
+    the histograms and a trace-event file (chrome://tracing, Perfetto).
+Comments:
+    A disabled Timer wraps nothing: wrap() and proxy() hand back what they
+    were given and phase() a shared no-op context, so instrumented code runs
+    as it would without it.
+    The histogram bins are a quarter decade wide, from 1 us to 10000 s; the
+    percentiles of the summary are read from them (upper bin edge, at most
+    the longest duration).
+    Phases from several threads (the temperature sampler) are recorded
+    under a lock, with the thread on each event.
+"""
+import collections
+import json
+import math
+import threading
+import time
+
+TRACE_EVENTS = 200000 # latest events kept for the timeline
+BINS_PER_DECADE = 4
+MIN_DECADE = -6 # 1 us
+MAX_DECADE = 4 # 10000 s
+NBINS = (MAX_DECADE - MIN_DECADE)*BINS_PER_DECADE
+
+#--------------------------------------------------------------------------
+def bin_index(duration):
+    if duration <= 0:
+        return 0
+    k = int(math.floor((math.log10(duration) - MIN_DECADE)*BINS_PER_DECADE))
+    return min(max(k, 0), NBINS - 1)
+#end def
+
+#--------------------------------------------------------------------------
+def bin_edges(k):
+    ''' (low, high) of bin k, in seconds '''
+    return (10**(MIN_DECADE + float(k)/BINS_PER_DECADE),
+            10**(MIN_DECADE + float(k + 1)/BINS_PER_DECADE))
+#end def
+
+###############################################################################
+class NullPhase:
+    ''' The phase of a disabled Timer '''
+    #--------------------------------------------------------------------------
+    def __enter__(self):
+        return self
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __exit__(self, *exc):
+        return False
+    #end def
+
+#end class
+###############################################################################
+
+NULL_PHASE = NullPhase()
+
+###############################################################################
+class Phase:
+    ''' Times a with block '''
+    #--------------------------------------------------------------------------
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __enter__(self):
+        self.start = self.timer.clock()
+        return self
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __exit__(self, *exc):
+        self.timer.record(self.name, self.start, self.timer.clock())
+        return False
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class TimedProxy:
+    ''' Times every method call on an object, as prefix.method '''
+    #--------------------------------------------------------------------------
+    def __init__(self, obj, timer, prefix):
+        self.__dict__['_obj'] = obj
+        self.__dict__['_timer'] = timer
+        self.__dict__['_prefix'] = prefix
+    #end init
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+        return self._timer.wrap(attr, self._prefix + '.' + name, detail=True)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def __setattr__(self, name, value):
+        setattr(self._obj, name, value) # timeout, ... of the wrapped resource
+    #end def
+
+#end class
+###############################################################################
+
+###############################################################################
+class Timer:
+    """
+    Per name duration statistics and a timeline of the latest events.
+    Disabled, it wraps nothing and records nothing.
+    """
+    #--------------------------------------------------------------------------
+    def __init__(self, enabled=False, clock=time.time, max_events=TRACE_EVENTS):
+        self.enabled = enabled
+        self.clock = clock
+        self.origin = clock()
+        self.lock = threading.Lock()
+        self.stats = {} # name -> [count, total, max, bin counts]
+        self.events = collections.deque(maxlen=max_events) # (name, start, duration, thread, detail)
+        self.threads = {} # thread id -> name
+        self.replaced = [] # (object, attribute, original) to put back
+    #end init
+
+    #--------------------------------------------------------------------------
+    def record(self, name, start, end, detail=None):
+        duration = end - start
+        thread = threading.current_thread()
+        with self.lock:
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = [0, 0.0, 0.0, [0]*NBINS]
+            s[0] += 1
+            s[1] += duration
+            if duration > s[2]:
+                s[2] = duration
+            s[3][bin_index(duration)] += 1
+            self.events.append((name, start, duration, thread.ident, detail))
+            self.threads[thread.ident] = thread.name
+        #end with
+    #end def
+
+    #--------------------------------------------------------------------------
+    def phase(self, name):
+        ''' Context manager timing a with block '''
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def wrap(self, function, name, detail=False):
+        ''' function, timed as name; with detail a string first argument goes in the trace '''
+        if not self.enabled:
+            return function
+        def timed(*args, **kwargs):
+            start = self.clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                text = None
+                if detail and args and isinstance(args[0], basestring):
+                    text = args[0][:60]
+                self.record(name, start, self.clock(), text)
+            #end try
+        #end def
+        return timed
+    #end def
+
+    #--------------------------------------------------------------------------
+    def instrument(self, obj, names, prefix=''):
+        ''' Replace the methods names of obj by timed ones, until restore() '''
+        if not self.enabled:
+            return
+        for name in names:
+            original = getattr(obj, name)
+            self.replaced.append((obj, name, obj.__dict__.get(name)))
+            setattr(obj, name, self.wrap(original, prefix + name))
+        #end for
+    #end def
+
+    #--------------------------------------------------------------------------
+    def proxy(self, obj, prefix):
+        ''' obj with every method call timed as prefix.method '''
+        if not self.enabled:
+            return obj
+        return TimedProxy(obj, self, prefix)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def replace(self, obj, name, value):
+        ''' Set an attribute until restore(), when enabled '''
+        if not self.enabled:
+            return
+        self.replaced.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def restore(self):
+        ''' Put back what instrument() and replace() changed, last first '''
+        while self.replaced:
+            obj, name, original = self.replaced.pop()
+            if original is None:
+                delattr(obj, name) # the class method shows again
+            else:
+                setattr(obj, name, original)
+        #end while
+    #end def
+
+    #--------------------------------------------------------------------------
+    def percentile(self, bins, q):
+        ''' Upper edge of the bin holding the q quantile '''
+        target = q*sum(bins)
+        total = 0
+        for k, n in enumerate(bins):
+            total += n
+            if total >= target and n:
+                return bin_edges(k)[1]
+        #end for
+        return 0.0
+    #end def
+
+    #--------------------------------------------------------------------------
+    def rows(self):
+        ''' (name, count, total, mean, p50, p95, max) by total time, longest first '''
+        with self.lock:
+            stats = [(name, s[0], s[1], s[2], list(s[3])) for name, s in self.stats.items()]
+        #end with
+        rows = []
+        for name, count, total, longest, bins in stats:
+            rows.append((name, count, total, total/count, min(self.percentile(bins, 0.5), longest),
+                         min(self.percentile(bins, 0.95), longest), longest))
+        #end for
+        rows.sort(key=lambda row: -row[2])
+        return rows
+    #end def
+
+    #--------------------------------------------------------------------------
+    def summary(self):
+        lines = ['%-36s %8s %10s %10s %10s %10s %10s' % (
+            'phase', 'count', 'total (s)', 'mean (ms)', 'p50 (ms)', 'p95 (ms)', 'max (ms)')]
+        for name, count, total, mean, p50, p95, longest in self.rows():
+            lines.append('%-36s %8d %10.2f %10.2f %10.2f %10.2f %10.2f' % (
+                name, count, total, mean*1000, p50*1000, p95*1000, longest*1000))
+        #end for
+        return '\n'.join(lines)
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write_log(self, path, histogram_path):
+        ''' Summary table and the histograms (non empty bins), as csv '''
+        f = open(path, 'w')
+        f.write('phase,count,total (s),mean (ms),p50 (ms),p95 (ms),max (ms)\n')
+        for name, count, total, mean, p50, p95, longest in self.rows():
+            f.write('%s,%d,%.4f,%.4f,%.4f,%.4f,%.4f\n' % (
+                name, count, total, mean*1000, p50*1000, p95*1000, longest*1000))
+        #end for
+        f.close()
+
+        with self.lock:
+            stats = sorted((name, list(s[3])) for name, s in self.stats.items())
+        #end with
+        f = open(histogram_path, 'w')
+        f.write('phase,from (ms),to (ms),count\n')
+        for name, bins in stats:
+            for k, n in enumerate(bins):
+                if n:
+                    low, high = bin_edges(k)
+                    f.write('%s,%.4g,%.4g,%d\n' % (name, low*1000, high*1000, n))
+            #end for
+        #end for
+        f.close()
+    #end def
+
+    #--------------------------------------------------------------------------
+    def write_trace(self, path):
+        ''' The events kept, in the trace event format (times in us) '''
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+        #end with
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}}
+                 for tid, name in threads.items()]
+        for name, start, duration, tid, detail in events:
+            event = {'name': name, 'ph': 'X', 'pid': 1, 'tid': tid,
+                     'ts': round((start - self.origin)*1e6, 1), 'dur': round(duration*1e6, 1)}
+            if detail:
+                event['args'] = {'command': detail}
+            trace.append(event)
+        #end for
+        f = open(path, 'w')
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        f.close()
+    #end def
+
+#end class
+###############################################################################
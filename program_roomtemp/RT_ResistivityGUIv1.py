@@ -25,7 +25,16 @@ import pylab
 import numpy as np
 import matplotlib.pyplot as plt
 import serial # for communicating with Lakeshore magnet power supply
-import visa # pyvisa, essential for communicating with the Keithley
+import instrument_sim # Simulated instruments, enabled with RESISTIVITY_SIM=1
+import instrument_trace # Instrument traffic, RESISTIVITY_RECORD=file / RESISTIVITY_REPLAY=file
+if instrument_trace.REPLAY:
+    visa = instrument_trace.visa
+elif instrument_sim.ENABLED:
+    visa = instrument_sim.visa
+else:
+    import visa # pyvisa, essential for communicating with the Keithley
+#end if
+visa = instrument_trace.record_visa(visa)
 from threading import Thread # For threading the processes going on behind the GUI
 import time
 from datetime import datetime # for getting the current date and time
@@ -33,6 +42,8 @@ from datetime import datetime # for getting the current date and time
 import exceptions
 import sys
 from logging_utils import setup_logging_to_file, log_exception
+import end_header
+from relay_sequencer import RelaySequencer, VDP_ORDER
 
 # for a fancy status bar:
 import EnhancedStatusBar as ESB
@@ -52,6 +63,9 @@ Global Variables:
 # Naming a data file:
 dataFile = 'Data_Backup.csv'
 finaldataFile = 'Data.csv'
+# end of run lines, reserved after the start time and filled in at the end
+endTemplate = 'End Time: %s \nElapsed Measurement Time: %s Seconds \n \n'
+endOffset = 0
 
 thickness = '0.1' #placeholder for sample thickness in cm
 
@@ -109,6 +123,17 @@ class Keithley_2700:
         self.ctrl.write("ROUTe:OPEN:ALL")
     #end def
     
+    #--------------------------------------------------------------------------
+    def switchChannels(self, close, open):
+        ''' Open then close channels in a single ROUT transaction '''
+        commands = []
+        if open:
+            commands.append(":ROUT:MULT:OPEN (@ %s)" %open)
+        if close:
+            commands.append(":ROUT:MULT:CLOS (@ %s)" %close)
+        self.ctrl.write(";".join(commands))
+    #end def
+
     #--------------------------------------------------------------------------
     def get_closedChannels(self):
         return self.ctrl.query(":ROUT:MULT:CLOS?")
@@ -558,6 +583,8 @@ class TakeData:
         self.k2182 = k2182
         
         self.delay = 1 # time for the keithley to take a steady measurement
+
+        self.relays = RelaySequencer(self.k2700)
         
         self.current = current
         self.thickness = float(thickness)
@@ -612,6 +639,12 @@ class TakeData:
         #end else
         self.measurement = 'OFF'
         self.updateGUI(stamp='Measurement', data=self.measurement)
+        # leave the card shorted, however the run ended
+        try:
+            self.relays.short()
+        except IOError:
+            print 'IOError: could not short the matrix card'
+        #end try
         self.save_files()
         
         self.k2400.turn_source_off()
@@ -629,14 +662,7 @@ class TakeData:
         
     #--------------------------------------------------------------------------
     def begin_measurement(self):
-  
-        
-        
-        # short the matrix card
-        self.k2700.closeChannels('117, 125, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        time.sleep(self.delay)
-        
+
         ### RESISTIVITY MEASUREMENTS ###
         self.Resistivity_Measurement()
         
@@ -650,38 +676,22 @@ class TakeData:
     
     #--------------------------------------------------------------------------
     def Resistivity_Measurement(self):
-        ### r_A: 
-        # r_12,34
-        print('measure r_12,34')
-        self.k2700.openChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_1234, self.t_1234 = self.delta_method()
-        #self.r_1234 = abs(self.r_1234)
-        self.k2700.closeChannels('125, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.updateGUI(stamp="Time R_1234", data=self.t_1234)
-        self.updateGUI(stamp="R_1234", data=self.r_1234*1000)
-        print "t_r1234: %.2f s\tr1234: %f Ohm" % (self.t_1234, self.r_1234)
-        
-        time.sleep(self.delay)
-        
-        # r_34,12
-        print('measure r_34,12')
-        self.k2700.closeChannels('118')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_3412, self.t_3412 = self.delta_method()
-        #self.r_3412 = abs(self.r_3412)
-        self.k2700.closeChannels('117, 126, 127, 128')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('118')
-        print(self.k2700.get_closedChannels())
-        self.updateGUI(stamp="Time R_3412", data=self.t_3412)
-        self.updateGUI(stamp="R_3412", data=self.r_3412*1000)
-        print "t_r3412: %.2f s\tr3412: %f Ohm" % (self.t_3412, self.r_3412)
-        
-        time.sleep(self.delay)
+        # Each configuration is measured in the order that needs the fewest
+        # relay actuations from the present card state
+        r = {}
+        t = {}
+        for config in self.relays.order(VDP_ORDER):
+            print('measure r_%s,%s' % (config[:2], config[2:]))
+            self.relays.goto(config)
+            r[config], t[config] = self.delta_method()
+            self.updateGUI(stamp="Time R_%s" % config, data=t[config])
+            self.updateGUI(stamp="R_%s" % config, data=r[config]*1000)
+            print "t_r%s: %.2f s\tr%s: %f Ohm" % (config, t[config], config, r[config])
+        #end for
+        self.relays.short() # between passes the sample sits shorted
+
+        self.r_1234, self.r_3412, self.r_1324, self.r_2413 = [r[c] for c in VDP_ORDER]
+        self.t_1234, self.t_3412, self.t_1324, self.t_2413 = [t[c] for c in VDP_ORDER]
         
         # Calculate r_A
         self.r_A = (self.r_1234 + self.r_3412)/2
@@ -690,41 +700,6 @@ class TakeData:
         self.updateGUI(stamp="R_A", data=self.r_A)
         print "t_rA: %.2f s\trA: %f Ohm" % (self.t_A, self.r_A)
         
-        ### r_B:
-        # r_13,24
-        print('measure r_13,24')
-        self.k2700.closeChannels('119')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.r_1324, self.t_1324 = self.delta_method()
-        #self.r_1324 = abs(self.r_1324)
-        self.k2700.closeChannels('117, 125, 126, 127')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('119')
-        print(self.k2700.get_closedChannels())
-        self.updateGUI(stamp="Time R_1324", data=self.t_1324)
-        self.updateGUI(stamp="R_1324", data=self.r_1324*1000)
-        print "t_r1324: %.2f s\tr1324: %f Ohm" % (self.t_1324, self.r_1324)
-        
-        time.sleep(self.delay)
-        
-        # r_24,13
-        print('measure r_24,13')
-        self.k2700.closeChannels('120')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('117, 125, 126, 128')
-        print(self.k2700.get_closedChannels())
-        self.r_2413, self.t_2413 = self.delta_method()
-        #self.r_2413 = abs(self.r_2413)
-        self.k2700.closeChannels('117, 125, 126')
-        print(self.k2700.get_closedChannels())
-        self.k2700.openChannels('120')
-        print(self.k2700.get_closedChannels())
-        self.updateGUI(stamp="Time R_2413", data=self.t_2413)
-        self.updateGUI(stamp="R_2413", data=self.r_2413*1000)
-        print "t_r2413: %.2f s\tr2413: %f Ohm" % (self.t_2413, self.r_2413)
-        
         # Calculate r_B
         self.r_B = (self.r_1324 + self.r_2413)/2
         self.t_B = time.time()-self.start
@@ -811,6 +786,7 @@ class TakeData:
         
         global dataFile
         global finaldataFile
+        global endTemplate, endOffset
         global myfile
         
         stop = time.time()
@@ -819,20 +795,8 @@ class TakeData:
         
         myfile.close() # Close the file
         
-        myfile = open(dataFile, 'r') # Opens the file for Reading
-        contents = myfile.readlines() # Reads the lines of the file into python set
-        myfile.close()
-        
-        # Adds elapsed measurement time to the read file list
-        endStr = 'End Time: %s \nElapsed Measurement Time: %s Seconds \n \n' % (str(end), str(totalTime))
-        contents.insert(1, endStr) # Specify which line and what value to insert
-        # NOTE: First line is line 0
-        
-        # Writes the elapsed measurement time to the final file
-        myfinalfile = open(finaldataFile,'w')
-        contents = "".join(contents)
-        myfinalfile.write(contents)
-        myfinalfile.close()
+        # Fill in the elapsed measurement time and rename to the final file
+        end_header.finalize(dataFile, finaldataFile, endOffset, endTemplate, (end, totalTime))
         
         inFile = filePath + '/Data.csv'
         outFile = filePath + '/Final Data.csv'
@@ -1008,6 +972,7 @@ class UserPanel(wx.Panel):
         global k2700, k2400, k2182
         global dataFile
         global finaldataFile
+        global endOffset
         global myfile
         global r_A_list, t_A_list, r_B_list, t_B_list
         global r_1234_list, r_3412_list, r_1324_list, r_2413_list
@@ -1025,6 +990,7 @@ class UserPanel(wx.Panel):
                 myfile = open(dataFile, 'w') # opens file for writing/overwriting
                 begin = datetime.now() # Current date and time
                 myfile.write('Start Time: ' + str(begin) + '\n')
+                endOffset = end_header.reserve(myfile, endTemplate)
                 
                 resistances1 = 't_1234,r_1234,t_3412,r_3412,t_1324,r_1324,t_2413,r_2413'
                 headers = ( 'time (s),thickness (cm),%s,' % (resistances1) + 'r_A,r_B' )
@@ -14,6 +14,8 @@ Comments:
 """
 
 import numpy as np
+import vdp # van der Pauw solver
+import csv_loader
 
 #--------------------------------------------------------------------------
 def output_file(inFile, outFile):
@@ -24,11 +26,10 @@ def output_file(inFile, outFile):
     data = import_Data(inFile)
     
     avg_d = np.average(data[0])
-    avg_B = np.average(data[1])
-    avg_r1234 = np.average(data[2])
-    avg_r3412 = np.average(data[3])
-    avg_r1324 = np.average(data[4])
-    avg_r2413 = np.average(data[5])
+    avg_r1234 = np.average(data[1])
+    avg_r3412 = np.average(data[2])
+    avg_r1324 = np.average(data[3])
+    avg_r2413 = np.average(data[4])
     
     avg_rA = (avg_r1234 + avg_r3412)/2
     avg_rB = (avg_r1324 + avg_r2413)/2
@@ -53,64 +54,19 @@ def output_file(inFile, outFile):
 
 #--------------------------------------------------------------------------
 def import_Data(filePath):
+    # columns by name, whatever the header lines above them
+    header, data = csv_loader.load(filePath)
     
-    f = open(filePath)
-    loadData = f.read()
-    f.close()
-    
-    loadDataByLine = loadData.split('\n')
-    numericData = loadDataByLine[5:]
-    
-    length = len(numericData)-1
-    d      = [None]*length
-    r_1234 = [None]*length
-    r_3412 = [None]*length
-    r_1324 = [None]*length
-    r_2413 = [None]*length
-    r_A    = [None]*length
-    r_B    = [None]*length
-    
-    for x in xrange(length):
-        line = numericData[x].split(',')
-        d[x] = float(line[1])
-        r_1234[x] = float(line[3])
-        r_3412[x] = float(line[5])
-        r_1324[x] = float(line[7])
-        r_2413[x] = float(line[9])
-        r_A[x] = float(line[10])
-        r_B[x] = float(line[11])
-
-    #end for
-    
-    return d,r_1234, r_3412, r_1324, r_2413, r_A, r_B
+    return (data['thickness (cm)'], data['r_1234'], data['r_3412'], data['r_1324'],
+            data['r_2413'], data['r_A'], data['r_B'])
             
 #end def
 
 
 #--------------------------------------------------------------------------
 def calculate_sheet_resistance(rA, rB):
-    delta = 0.0005 # error limit (0.05%)
-    
-    z1 = (2*np.log(2))/(np.pi*(rA + rB))
-
-    condition = 'not met'
-    
-    # Algorithm taken from http://www.nist.gov/pml/div683/hall_algorithm.cfm
-    while condition == 'not met':
-        y = 1/np.exp(np.pi*z1*rA) + 1/np.exp(np.pi*z1*rB)
-        
-        z2 = z1 - (1/np.pi)*((1-y)/(rA/np.exp(np.pi*z1*rA) + rB/np.exp(np.pi*z1*rB)))
-        
-        lim = abs(z2 - z1)/z2
-        
-        if lim < delta:
-            condition = 'met'
-        else:
-            z1 = z2
-            
-    #end while
-    
-    return 1/z2
+    # accepts numpy arrays of rA, rB as well
+    return vdp.sheet_resistance(rA, rB)
     
 #end def    
     
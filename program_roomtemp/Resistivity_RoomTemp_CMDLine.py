@@ -6,10 +6,17 @@ Created: 2016-02-09
 """
 import os
 import numpy as np
-import visa # pyvisa, essential for communicating with the Keithley
+import instrument_trace # Instrument traffic, RESISTIVITY_RECORD=file / RESISTIVITY_REPLAY=file
+if instrument_trace.REPLAY:
+    visa = instrument_trace.visa
+else:
+    import visa # pyvisa, essential for communicating with the Keithley
+#end if
+visa = instrument_trace.record_visa(visa)
 import time
 from datetime import datetime # for getting the current date and time
 import exceptions
+import vdp # van der Pauw solver
 
 #==============================================================================
 version = '1.0 (2016-02-09)'
@@ -422,26 +429,7 @@ class Main:
 
     #--------------------------------------------------------------------------
     def resistivitycalc(self,Alist,Blist):
-        delta = 0.0005 # error limit (0.05%)
-        lim = 1
-        rA = np.average(Alist)
-        rB = np.average(Blist)
-
-        z1 = (2*np.log(2))/(np.pi*(rA + rB))
-
-        # Algorithm taken from http://www.nist.gov/pml/div683/hall_algorithm.cfm
-        while (lim > delta):
-            y = 1/np.exp(np.pi*z1*rA) + 1/np.exp(np.pi*z1*rB)
-
-            z2 = z1 - (1/np.pi)*((1-y)/(rA/np.exp(np.pi*z1*rA) + rB/np.exp(np.pi*z1*rB)))
-
-            lim = abs(z2 - z1)/z2
-
-            z1 = z2
-        #end while
-
-        rho = 1/z1*float(self.thickness)
-        return rho
+        return vdp.resistivity(Alist, Blist, self.thickness)
     #end def
 
     #--------------------------------------------------------------------------
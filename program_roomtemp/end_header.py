@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Created: 2026-10-18
+
+@author: Toberer Lab
+
+__Title__ : end_header
+Description:
+    Constant-time finalizing of a data file. The end time and elapsed time
+    lines are reserved as fixed-width placeholders right after the start
+    time when the file is opened, overwritten in place when the run ends,
+    and the backup is then renamed to the final file name, instead of
+    reading the whole backup back and writing a copy with the lines added.
+Comments:
+    Every %s field of the template is padded (or cut) to FIELD_WIDTH
+    characters, so the reserved text and the final text have the same
+    length and the same number of lines as the old inserted text.
+"""
+import os
+
+FIELD_WIDTH = 32
+
+#--------------------------------------------------------------------------
+def fixed_width(template, values, width=FIELD_WIDTH):
+    return template % tuple(str(v)[:width].ljust(width) for v in values)
+#end def
+
+#--------------------------------------------------------------------------
+def reserve(f, template):
+    ''' Write the blank placeholder into an open file, return its offset '''
+    offset = f.tell()
+    f.write(fixed_width(template, ('',)*template.count('%s')))
+    f.flush()
+    return offset
+#end def
+
+#--------------------------------------------------------------------------
+def finalize(path, final_path, offset, template, values):
+    ''' Fill in the placeholder of a closed file and rename it '''
+    f = open(path, 'r+')
+    f.seek(offset)
+    f.write(fixed_width(template, values))
+    f.close()
+    if os.path.exists(final_path):
+        os.remove(final_path) # rename does not replace on Windows
+    os.rename(path, final_path)
+#end def